@@ -0,0 +1,106 @@
+"""
+Backtest Result Cache for Hummingbot Gateway
+On-disk, size-bounded LRU store of backtest results keyed by a canonical hash of their inputs
+"""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Optional
+
+from warm_pool import parse_memory
+
+
+def backtest_cache_key(config: dict, start_date: str, end_date: str, image_version: Optional[str]) -> str:
+    """Canonical hash of everything that determines a backtest result"""
+    canonical = json.dumps(
+        {'config': config, 'start_date': start_date, 'end_date': end_date, 'image': image_version},
+        sort_keys=True,
+        separators=(',', ':'),
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class BacktestResultCache:
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.path = path or os.getenv(
+            'BACKTEST_CACHE_DIR',
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'backtest_cache'),
+        )
+        self.max_bytes = max_bytes if max_bytes is not None else parse_memory(os.getenv('BACKTEST_CACHE_MAX_BYTES', '256m'))
+        # key -> size in bytes, least recently used first
+        self.entries: 'OrderedDict[str, int]' = OrderedDict()
+        self.total_bytes = 0
+        self.counters = {'hits': 0, 'misses': 0, 'coalesced': 0, 'stores': 0, 'evictions': 0}
+        self.load()
+
+    def load(self):
+        """Rebuild the LRU order from file modification times"""
+        os.makedirs(self.path, exist_ok=True)
+        files = []
+        for name in os.listdir(self.path):
+            if not name.endswith('.json'):
+                continue
+            stat = os.stat(os.path.join(self.path, name))
+            files.append((stat.st_mtime, name[:-len('.json')], stat.st_size))
+        for _, key, size in sorted(files):
+            self.entries[key] = size
+            self.total_bytes += size
+        self.evict()
+
+    def file_path(self, key: str) -> str:
+        return os.path.join(self.path, f'{key}.json')
+
+    def get(self, key: str) -> Optional[dict]:
+        if key not in self.entries:
+            self.counters['misses'] += 1
+            return None
+        try:
+            with open(self.file_path(key), 'r') as f:
+                result = json.load(f)
+            os.utime(self.file_path(key))
+        except (OSError, json.JSONDecodeError):
+            self.discard(key)
+            self.counters['misses'] += 1
+            return None
+        self.entries.move_to_end(key)
+        self.counters['hits'] += 1
+        return result
+
+    def put(self, key: str, result: dict):
+        data = json.dumps(result, separators=(',', ':')).encode()
+        if len(data) > self.max_bytes:
+            return
+        tmp_path = f'{self.file_path(key)}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, self.file_path(key))
+        self.total_bytes += len(data) - self.entries.pop(key, 0)
+        self.entries[key] = len(data)
+        self.counters['stores'] += 1
+        self.evict()
+
+    def discard(self, key: str):
+        self.total_bytes -= self.entries.pop(key, 0)
+        try:
+            os.remove(self.file_path(key))
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        while self.total_bytes > self.max_bytes and self.entries:
+            key = next(iter(self.entries))
+            self.discard(key)
+            self.counters['evictions'] += 1
+
+    def metrics(self) -> dict:
+        lookups = self.counters['hits'] + self.counters['misses']
+        return {
+            'entries': len(self.entries),
+            'bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+            'hit_ratio': self.counters['hits'] / lookups if lookups else 0.0,
+            **self.counters,
+        }
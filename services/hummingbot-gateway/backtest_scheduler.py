@@ -0,0 +1,433 @@
+"""
+Backtest Scheduler for Hummingbot Gateway
+Queues backtest jobs and admits them within a CPU/memory budget, fairly across owners
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field, replace
+from typing import TYPE_CHECKING, Deque, Dict, List, Optional, Set
+
+from backtest_cache import BacktestResultCache, backtest_cache_key
+from container_index import BACKTEST_PREFIX, ContainerState
+from market_data_store import MarketDataStore, backtest_series, fetcher_from_env, parse_date_ms
+from warm_pool import parse_memory
+
+if TYPE_CHECKING:
+    from docker_manager import DockerManager
+
+TERMINAL_STATUSES = frozenset({'completed', 'failed', 'cancelled'})
+
+# Written by the in-container bridge when the backtest finishes
+RESULT_PATH = '/hummingbot/data/backtest_result.json'
+
+
+@dataclass
+class BacktestJob:
+    id: str
+    bot_id: str
+    owner_id: str
+    config: dict
+    start_date: str
+    end_date: str
+    priority: int
+    cpus: float
+    memory: int
+    status: str = 'queued'
+    container_name: Optional[str] = None
+    container_id: Optional[str] = None
+    exit_code: Optional[int] = None
+    error: Optional[str] = None
+    cache_key: Optional[str] = None
+    cached: bool = False
+    result: Optional[dict] = None
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    # Callers get a request job that follows a run; identical requests follow the same run
+    run: Optional['BacktestJob'] = field(default=None, repr=False)
+    requests: List['BacktestJob'] = field(default_factory=list, repr=False)
+
+    @property
+    def wait_time(self) -> float:
+        return (self.started_at or time.time()) - self.submitted_at
+
+    def to_dict(self) -> dict:
+        if self.status in TERMINAL_STATUSES:
+            progress = 1.0
+        elif self.status == 'queued':
+            progress = 0.0
+        else:
+            # The container does not report intermediate progress
+            progress = None
+        return {
+            'job_id': self.id,
+            'bot_id': self.bot_id,
+            'owner_id': self.owner_id,
+            'status': self.status,
+            'progress': progress,
+            'priority': self.priority,
+            'start_date': self.start_date,
+            'end_date': self.end_date,
+            'container_id': self.container_id,
+            'exit_code': self.exit_code,
+            'error': self.error,
+            'cached': self.cached,
+            'result': self.result,
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'wait_time': self.wait_time,
+        }
+
+
+class BacktestQueueFull(Exception):
+    pass
+
+
+class BacktestScheduler:
+    def __init__(self, docker_manager: 'DockerManager', cache: Optional[BacktestResultCache] = None):
+        self.docker_manager = docker_manager
+        self.cache = cache or BacktestResultCache()
+        self.max_cpus = float(os.getenv('BACKTEST_MAX_CPUS', str(max(1, (os.cpu_count() or 2) // 2))))
+        self.max_memory = parse_memory(os.getenv('BACKTEST_MAX_MEMORY', '4g'))
+        self.job_cpus = float(os.getenv('BACKTEST_JOB_CPUS', '1'))
+        self.job_memory = os.getenv('BACKTEST_JOB_MEMORY', '2g')
+        self.max_queue = int(os.getenv('BACKTEST_MAX_QUEUE', '1000'))
+        self.max_runtime = float(os.getenv('BACKTEST_MAX_RUNTIME', '3600'))
+        self.history_size = int(os.getenv('BACKTEST_JOB_HISTORY', '500'))
+
+        self.jobs: 'OrderedDict[str, BacktestJob]' = OrderedDict()
+        self.queues: Dict[str, Deque[BacktestJob]] = {}
+        self.running: Dict[str, BacktestJob] = {}
+        self.by_container: Dict[str, BacktestJob] = {}
+        # Identical requests share one run: cache key -> run producing the result
+        self.inflight: Dict[str, BacktestJob] = {}
+        self.wait_times: Deque[float] = deque(maxlen=1000)
+        self.counters = {'submitted': 0, 'rejected': 0, 'completed': 0, 'failed': 0, 'cancelled': 0}
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        # Jobs being prefilled and created; each launches on its own so a slow one does not hold up the rest
+        self.launches: Set[asyncio.Task] = set()
+
+        # Shared history store that backtest containers mount read-only (disabled without MARKET_DATA_DIR)
+        market_data_dir = os.getenv('MARKET_DATA_DIR')
+        self.market_data = MarketDataStore(market_data_dir) if market_data_dir else None
+        self.market_data_fetcher = fetcher_from_env() if market_data_dir else None
+        self.market_data_trades = os.getenv('MARKET_DATA_TRADES', 'false').lower() == 'true'
+        self.market_data_lock = asyncio.Lock()
+
+        self.docker_manager.index.add_listener(self.on_container_status)
+
+    def start(self):
+        self.task = asyncio.get_running_loop().create_task(self.dispatch_loop())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+        for task in self.launches:
+            task.cancel()
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    def submit(
+        self,
+        bot_id: str,
+        config: dict,
+        start_date: str,
+        end_date: str,
+        owner_id: Optional[str] = None,
+        priority: int = 0,
+        cpus: Optional[float] = None,
+        memory: Optional[int] = None,
+    ) -> BacktestJob:
+        """Queue a backtest job, or answer from the result cache / an identical in-flight run"""
+        cache_key = backtest_cache_key(config, start_date, end_date, self.docker_manager.image_version)
+        job = BacktestJob(
+            id=uuid.uuid4().hex,
+            bot_id=bot_id,
+            owner_id=owner_id or bot_id,
+            config=config,
+            start_date=start_date,
+            end_date=end_date,
+            priority=priority,
+            cpus=cpus or self.job_cpus,
+            memory=memory or parse_memory(self.job_memory),
+            cache_key=cache_key,
+        )
+        run = self.inflight.get(cache_key)
+        if run is not None:
+            self.cache.counters['coalesced'] += 1
+            self.jobs[job.id] = job
+            self.follow(job, run)
+            self.trim_history()
+            print(f'Backtest Scheduler: Job {job.id} for bot {bot_id} shares in-flight run {run.id}', flush=True)
+            return job
+
+        cached_result = self.cache.get(cache_key)
+
+        if cached_result is None and self.queue_depth >= self.max_queue:
+            self.counters['rejected'] += 1
+            raise BacktestQueueFull(f'Backtest queue is full ({self.max_queue} jobs)')
+
+        self.jobs[job.id] = job
+        if cached_result is not None:
+            job.cached = True
+            job.result = cached_result
+            job.started_at = job.submitted_at
+            self.finish(job, 'completed')
+            self.trim_history()
+            return job
+
+        # The run is scheduled under the first requester's owner and outlives any one requester
+        run = replace(job, id=uuid.uuid4().hex, run=None, requests=[])
+        self.inflight[cache_key] = run
+        self.queues.setdefault(run.owner_id, deque()).append(run)
+        self.follow(job, run)
+        self.counters['submitted'] += 1
+        self.trim_history()
+        self.wakeup.set()
+        print(f'Backtest Scheduler: Queued job {job.id} for bot {bot_id} (owner {job.owner_id}, depth {self.queue_depth})', flush=True)
+        return job
+
+    def follow(self, job: BacktestJob, run: BacktestJob):
+        job.run = run
+        run.requests.append(job)
+        self.sync(run)
+
+    def sync(self, run: BacktestJob):
+        """Mirror a run's state onto the jobs that requested it"""
+        for job in run.requests:
+            job.status = run.status
+            job.container_name = run.container_name
+            job.container_id = run.container_id
+            job.exit_code = run.exit_code
+            job.error = run.error
+            job.result = run.result
+            job.started_at = max(run.started_at, job.submitted_at) if run.started_at else None
+            job.finished_at = run.finished_at
+
+    def get(self, job_id: str) -> Optional[BacktestJob]:
+        return self.jobs.get(job_id)
+
+    async def cancel(self, job_id: str) -> Optional[BacktestJob]:
+        """Cancel a queued or running job; its run stops once no other job follows it"""
+        job = self.jobs.get(job_id)
+        if job is None or job.status in TERMINAL_STATUSES:
+            return job
+
+        run = job.run
+        run.requests.remove(job)
+        job.status = 'cancelled'
+        job.finished_at = time.time()
+        if run.requests:
+            print(f'Backtest Scheduler: Job {job.id} cancelled, run {run.id} continues for {len(run.requests)} other job(s)', flush=True)
+            return job
+
+        if run.status == 'queued':
+            self.queues[run.owner_id].remove(run)
+            if not self.queues[run.owner_id]:
+                del self.queues[run.owner_id]
+            self.finish(run, 'cancelled')
+            return job
+
+        self.finish(run, 'cancelled')
+        if run.container_id:
+            await self.remove_container(run.container_id)
+        return job
+
+    def used_capacity(self) -> tuple:
+        return (
+            sum(job.cpus for job in self.running.values()),
+            sum(job.memory for job in self.running.values()),
+        )
+
+    def next_job(self) -> Optional[BacktestJob]:
+        """Highest priority first, then the owner with the fewest running jobs, then oldest"""
+        running_by_owner: Dict[str, int] = {}
+        for job in self.running.values():
+            running_by_owner[job.owner_id] = running_by_owner.get(job.owner_id, 0) + 1
+        heads = [queue[0] for queue in self.queues.values() if queue]
+        if not heads:
+            return None
+        return min(heads, key=lambda job: (-job.priority, running_by_owner.get(job.owner_id, 0), job.submitted_at))
+
+    async def dispatch_loop(self):
+        while True:
+            try:
+                await self.dispatch()
+                self.expire_overdue()
+            except Exception as e:
+                print(f'Backtest Scheduler: Dispatch error: {e}', flush=True)
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), 5)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+
+    async def dispatch(self):
+        """Start queued jobs while they fit in the backtest budget"""
+        while True:
+            job = self.next_job()
+            if job is None:
+                return
+            used_cpus, used_memory = self.used_capacity()
+            fits = used_cpus + job.cpus <= self.max_cpus and used_memory + job.memory <= self.max_memory
+            # A job larger than the whole budget still runs, alone
+            if not fits and self.running:
+                return
+
+            queue = self.queues[job.owner_id]
+            queue.popleft()
+            if not queue:
+                del self.queues[job.owner_id]
+            self.admit(job)
+            task = asyncio.get_running_loop().create_task(self.launch(job))
+            self.launches.add(task)
+            task.add_done_callback(self.launches.discard)
+
+    def admit(self, job: BacktestJob):
+        """Count the job against the budget before its launch yields, so dispatch never overcommits"""
+        job.status = 'starting'
+        job.started_at = time.time()
+        job.container_name = f'{BACKTEST_PREFIX}{job.bot_id}_{job.id[:12]}'
+        self.wait_times.append(job.wait_time)
+        self.running[job.id] = job
+        self.by_container[job.container_name] = job
+        self.sync(job)
+
+    async def launch(self, job: BacktestJob):
+        try:
+            await self.prefill_market_data(job)
+            if job.status in TERMINAL_STATUSES:
+                return
+            job.container_id = await self.docker_manager.run_backtest(
+                job.bot_id,
+                job.config,
+                job.start_date,
+                job.end_date,
+                container_name=job.container_name,
+                cpus=job.cpus,
+                mem_limit=str(job.memory),
+                auto_remove=False,
+            )
+        except Exception as e:
+            if job.status not in TERMINAL_STATUSES:
+                self.finish(job, 'failed', error=str(e))
+            return
+        if job.status == 'starting':
+            job.status = 'running'
+            self.sync(job)
+        elif job.status in TERMINAL_STATUSES:
+            # Cancelled or expired while starting: the container was created after cancel() had nothing to remove
+            await self.remove_container(job.container_id)
+
+    async def prefill_market_data(self, job: BacktestJob):
+        """Fill missing history for the job's markets so its container only reads the shared store"""
+        if self.market_data is None:
+            return
+        datasets = [('candles', '1m')] + ([('trades', None)] if self.market_data_trades else [])
+        try:
+            start_ms, end_ms = parse_date_ms(job.start_date), parse_date_ms(job.end_date)
+            # One writer at a time; the store is append-only and readers never block
+            async with self.market_data_lock:
+                for exchange, pair in backtest_series(job.config):
+                    for kind, interval in datasets:
+                        added = await asyncio.to_thread(
+                            self.market_data.ensure_range,
+                            self.market_data_fetcher, exchange, pair, start_ms, end_ms, kind, interval,
+                        )
+                        if added:
+                            print(f'Backtest Scheduler: Stored {added} new {kind} rows for {exchange} {pair}', flush=True)
+        except Exception as e:
+            print(f'Backtest Scheduler: Market data prefill failed for job {job.id}: {e}', flush=True)
+
+    def on_container_status(self, state: ContainerState, status: str, metadata: dict):
+        """Complete jobs when their container exits"""
+        if state.kind != 'backtest' or status == 'running':
+            return
+        job = self.by_container.get(state.name)
+        if job is None or job.status in TERMINAL_STATUSES or job.status == 'collecting':
+            return
+        job.status = 'collecting'
+        job.exit_code = state.exit_code
+        self.sync(job)
+        asyncio.get_running_loop().create_task(self.collect(job, state.id, metadata.get('error')))
+
+    async def collect(self, job: BacktestJob, container_id: str, error: Optional[str]):
+        """Read the result out of the exited container, cache it and remove the container"""
+        try:
+            if job.exit_code == 0:
+                try:
+                    job.result = json.loads(await self.docker_manager.get_file(container_id, RESULT_PATH))
+                except Exception as e:
+                    print(f'Backtest Scheduler: No result collected for job {job.id}: {e}', flush=True)
+                if job.result is not None and job.cache_key:
+                    self.cache.put(job.cache_key, job.result)
+            if job.status == 'collecting':
+                if job.exit_code == 0:
+                    self.finish(job, 'completed')
+                else:
+                    self.finish(job, 'failed', error=error)
+        finally:
+            await self.remove_container(container_id)
+
+    async def remove_container(self, container_id: str):
+        try:
+            await self.docker_manager._call('remove', self.docker_manager.client.api.remove_container, container_id, force=True)
+        except Exception as e:
+            print(f'Backtest Scheduler: Failed to remove backtest container {container_id[:12]}: {e}', flush=True)
+
+    def expire_overdue(self):
+        now = time.time()
+        for job in list(self.running.values()):
+            if job.started_at and now - job.started_at > self.max_runtime:
+                self.finish(job, 'failed', error=f'Backtest exceeded {self.max_runtime:.0f}s')
+                if job.container_id:
+                    asyncio.get_running_loop().create_task(self.remove_container(job.container_id))
+
+    def finish(self, job: BacktestJob, status: str, error: Optional[str] = None):
+        job.status = status
+        job.error = error or job.error
+        job.finished_at = time.time()
+        self.counters[status] += 1
+        self.running.pop(job.id, None)
+        if job.cache_key and self.inflight.get(job.cache_key) is job:
+            del self.inflight[job.cache_key]
+        if job.container_name:
+            self.by_container.pop(job.container_name, None)
+        self.sync(job)
+        print(f'Backtest Scheduler: Job {job.id} {status}' + (f': {error}' if error else ''), flush=True)
+        self.wakeup.set()
+
+    def trim_history(self):
+        """Forget the oldest finished jobs beyond the history size"""
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in TERMINAL_STATUSES]
+        for job_id in finished[:max(0, len(finished) - self.history_size)]:
+            del self.jobs[job_id]
+
+    def metrics(self) -> dict:
+        used_cpus, used_memory = self.used_capacity()
+        wait_times = sorted(self.wait_times)
+        queued_waits = [job.wait_time for queue in self.queues.values() for job in queue]
+        return {
+            'queue_depth': self.queue_depth,
+            'running': len(self.running),
+            'owners_waiting': len(self.queues),
+            'cpus_used': used_cpus,
+            'cpus_max': self.max_cpus,
+            'memory_used': used_memory,
+            'memory_max': self.max_memory,
+            'wait_time_avg': sum(wait_times) / len(wait_times) if wait_times else 0.0,
+            'wait_time_p50': wait_times[len(wait_times) // 2] if wait_times else 0.0,
+            'wait_time_max': wait_times[-1] if wait_times else 0.0,
+            'oldest_queued_wait': max(queued_waits) if queued_waits else 0.0,
+            **self.counters,
+            'cache': self.cache.metrics(),
+        }
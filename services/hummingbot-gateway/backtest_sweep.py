@@ -0,0 +1,138 @@
+"""
+Parameter Sweeps for Hummingbot Gateway
+Runs a grid of backtests as a few multi-worker backtest jobs and ranks the results
+"""
+
+import itertools
+import json
+import math
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from backtest_scheduler import TERMINAL_STATUSES, BacktestScheduler
+from warm_pool import parse_memory
+
+
+class SweepTooLarge(Exception):
+    pass
+
+
+def expand_grid(grid: Dict[str, List[Any]]) -> List[dict]:
+    """All combinations of the grid values, in a stable order"""
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def rank_key(rank_by: str):
+    """Sort key for result rows: descending by the metric, ascending for '-metric'; rows without it last"""
+    metric = rank_by.lstrip('-')
+    sign = 1 if rank_by.startswith('-') else -1
+
+    def key(row: dict):
+        value = row.get(metric)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return (0, sign * value)
+        return (1, 0)
+    return key
+
+
+@dataclass
+class Sweep:
+    id: str
+    bot_id: str
+    points: int
+    rank_by: str
+    job_ids: List[str]
+    submitted_at: float = field(default_factory=time.time)
+
+
+class SweepManager:
+    def __init__(self, scheduler: BacktestScheduler):
+        self.scheduler = scheduler
+        self.max_points = int(os.getenv('SWEEP_MAX_POINTS', '500'))
+        self.max_containers = int(os.getenv('SWEEP_MAX_CONTAINERS', '1'))
+        self.workers_per_container = int(os.getenv('SWEEP_WORKERS_PER_CONTAINER', str(os.cpu_count() or 2)))
+        self.worker_memory = parse_memory(os.getenv('SWEEP_WORKER_MEMORY', '1g'))
+        self.sweeps: Dict[str, Sweep] = {}
+
+    async def submit(
+        self,
+        bot_id: str,
+        config: dict,
+        grid: Dict[str, List[Any]],
+        start_date: str,
+        end_date: str,
+        rank_by: str = 'net_quote',
+        owner_id: Optional[str] = None,
+        priority: int = 0,
+    ) -> Sweep:
+        """Split the grid over at most SWEEP_MAX_CONTAINERS backtest jobs; rank_by '-metric' ranks ascending"""
+        points = expand_grid(grid)
+        if not points:
+            raise SweepTooLarge('Sweep grid is empty')
+        if len(points) > self.max_points:
+            raise SweepTooLarge(f'Sweep has {len(points)} points, the limit is {self.max_points}')
+
+        containers = min(self.max_containers, math.ceil(len(points) / self.workers_per_container)) or 1
+        chunks = [points[index::containers] for index in range(containers)]
+        job_ids = []
+        try:
+            for chunk in chunks:
+                workers = min(self.workers_per_container, len(chunk))
+                job = self.scheduler.submit(
+                    bot_id,
+                    {**config, 'sweep': json.dumps(chunk, sort_keys=True), 'sweep_workers': workers},
+                    start_date,
+                    end_date,
+                    owner_id=owner_id,
+                    priority=priority,
+                    cpus=workers,
+                    memory=workers * self.worker_memory,
+                )
+                job_ids.append(job.id)
+        except Exception:
+            # A sweep is all or nothing: don't leave the chunks already queued running for nobody
+            for job_id in job_ids:
+                await self.scheduler.cancel(job_id)
+            raise
+
+        sweep = Sweep(id=uuid.uuid4().hex, bot_id=bot_id, points=len(points), rank_by=rank_by, job_ids=job_ids)
+        self.sweeps[sweep.id] = sweep
+        # Sweeps outlive their jobs only as long as the scheduler keeps job history
+        while len(self.sweeps) > self.scheduler.history_size:
+            del self.sweeps[next(iter(self.sweeps))]
+        print(f'Backtest Sweep: {sweep.id} split {len(points)} points over {len(job_ids)} job(s)', flush=True)
+        return sweep
+
+    def get(self, sweep_id: str) -> Optional[Sweep]:
+        return self.sweeps.get(sweep_id)
+
+    def to_dict(self, sweep: Sweep) -> dict:
+        """Sweep status plus the ranked results table of every finished point"""
+        jobs = [self.scheduler.get(job_id) for job_id in sweep.job_ids]
+        statuses = [job.status if job else 'expired' for job in jobs]
+        rows = []
+        for job in jobs:
+            if job is None or not job.result:
+                continue
+            for point in job.result.get('points', []):
+                rows.append({'params': point.get('params'), 'exit_code': point.get('exit_code'), **(point.get('result') or {})})
+        rows.sort(key=rank_key(sweep.rank_by))
+
+        if all(status in TERMINAL_STATUSES or status == 'expired' for status in statuses):
+            status = 'completed' if all(status == 'completed' for status in statuses) else 'failed'
+        else:
+            status = 'running' if any(status != 'queued' for status in statuses) else 'queued'
+        return {
+            'sweep_id': sweep.id,
+            'bot_id': sweep.bot_id,
+            'status': status,
+            'points': sweep.points,
+            'completed_points': len(rows),
+            'rank_by': sweep.rank_by,
+            'job_ids': sweep.job_ids,
+            'results': [{'rank': rank + 1, **row} for rank, row in enumerate(rows)],
+        }
@@ -0,0 +1,201 @@
+"""
+Gateway Cluster Check for Hummingbot Gateway
+Runs several gateway nodes against the mini broker and stand-in Docker backends, and checks bot ownership across joins and failures
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from typing import Dict, List
+
+import paho.mqtt.client as mqtt
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+GATEWAY_DIR = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+
+from mini_broker import MiniBroker  # noqa: E402
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def get_json(url: str) -> dict:
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return json.loads(response.read())
+
+
+class Node:
+    def __init__(self, node_id: str, broker_port: int, lease_ttl: float, log_dir: str):
+        self.node_id = node_id
+        self.port = free_port()
+        self.broker_port = broker_port
+        self.lease_ttl = lease_ttl
+        self.log_path = os.path.join(log_dir, f'{node_id}.log')
+        self.state_path = os.path.join(log_dir, f'{node_id}.db')
+        self.process = None
+
+    def start(self):
+        env = {
+            **os.environ,
+            'GATEWAY_CLUSTER': 'true',
+            'GATEWAY_NODE_ID': self.node_id,
+            'CLUSTER_HEARTBEAT_INTERVAL': str(self.lease_ttl / 4),
+            'CLUSTER_LEASE_TTL': str(self.lease_ttl),
+            'CLUSTER_DOCKER_SCOPE': 'node',
+            'DOCKER_BACKEND': 'fake',
+            'GATEWAY_STATE_DB': self.state_path,
+            'FAKE_DOCKER_MEM_TOTAL': str(1024 ** 4),
+            'MQTT_BROKER_URL': '127.0.0.1',
+            'MQTT_PORT': str(self.broker_port),
+        }
+        log = open(self.log_path, 'w')
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1', '--port', str(self.port), '--log-level', 'warning'],
+            cwd=GATEWAY_DIR,
+            env=env,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def cluster(self) -> dict:
+        return get_json(f'http://127.0.0.1:{self.port}/cluster')
+
+    def running_bots(self) -> List[str]:
+        result = get_json(f'http://127.0.0.1:{self.port}/containers?kind=bot&status=running&limit=1000')
+        return [container['bot_id'] for container in result['containers']]
+
+    def kill(self):
+        self.process.send_signal(signal.SIGKILL)
+        self.process.wait()
+
+    def terminate(self):
+        self.process.send_signal(signal.SIGTERM)
+        self.process.wait(timeout=30)
+
+
+def wait_for(predicate, timeout: float, interval: float = 0.25) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if predicate():
+                return True
+        except Exception:
+            pass
+        time.sleep(interval)
+    return False
+
+
+def placement(nodes: List[Node]) -> Dict[str, List[str]]:
+    """bot_id -> nodes running it"""
+    running: Dict[str, List[str]] = {}
+    for node in nodes:
+        if node.alive():
+            for bot_id in node.running_bots():
+                running.setdefault(bot_id, []).append(node.node_id)
+    return running
+
+
+def exactly_once(nodes: List[Node], bots: List[str]) -> bool:
+    running = placement(nodes)
+    return all(len(running.get(bot_id, [])) == 1 for bot_id in bots) and set(running) <= set(bots)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[-1])
+    parser.add_argument('--nodes', type=int, default=3)
+    parser.add_argument('--bots', type=int, default=30)
+    parser.add_argument('--lease-ttl', type=float, default=2.0, help='Node lease in seconds; failover takes about twice that')
+    parser.add_argument('--log-dir', default=os.path.join(tempfile.gettempdir(), 'gateway_cluster_check'))
+    args = parser.parse_args()
+    os.makedirs(args.log_dir, exist_ok=True)
+
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    broker = MiniBroker('127.0.0.1', 0)
+    asyncio.run_coroutine_threadsafe(broker.start(), loop).result()
+
+    nodes = [Node(f'node-{index}', broker.port, args.lease_ttl, args.log_dir) for index in range(args.nodes)]
+    for node in nodes:
+        node.start()
+    client = mqtt.Client(client_id='cluster-check')
+    client.connect('127.0.0.1', broker.port)
+    client.loop_start()
+
+    bots = [f'bot{index:03d}' for index in range(args.bots)]
+    failures = []
+    timeout = args.lease_ttl * 6 + 10
+
+    def check(name: str, ok: bool):
+        print(f"{'PASS' if ok else 'FAIL'} {name}", flush=True)
+        if not ok:
+            failures.append(name)
+
+    try:
+        check('all nodes see each other', wait_for(
+            lambda: all(len(node.cluster()['members']) == len(nodes) for node in nodes), timeout,
+        ))
+
+        started = time.monotonic()
+        for bot_id in bots:
+            config = {'strategy_type': 'v2', 'controllers': {'controllers': []}}
+            client.publish(f'hbot/{bot_id}/start', json.dumps({'config': config}), qos=1)
+        check('every bot runs on exactly one node', wait_for(lambda: exactly_once(nodes, bots), timeout))
+        print(f'  started {len(bots)} bots in {time.monotonic() - started:.2f}s: '
+              f'{ {node.node_id: len(node.running_bots()) for node in nodes} }', flush=True)
+
+        victim = nodes[0]
+        lost = [bot_id for bot_id, owners in placement(nodes).items() if victim.node_id in owners]
+        started = time.monotonic()
+        victim.kill()
+        check(f'bots of killed {victim.node_id} fail over', wait_for(lambda: exactly_once(nodes, bots), timeout))
+        print(f'  {len(lost)} bots failed over in {time.monotonic() - started:.2f}s', flush=True)
+
+        stopped = bots[:len(bots) // 3]
+        for bot_id in stopped:
+            client.publish(f'hbot/{bot_id}/stop', json.dumps({}), qos=1)
+        remaining = [bot_id for bot_id in bots if bot_id not in stopped]
+        check('stops reach the new owners', wait_for(lambda: exactly_once(nodes, remaining), timeout))
+
+        if len(nodes) > 2:
+            leaving = nodes[1]
+            started = time.monotonic()
+            leaving.terminate()
+            check(f'bots of stopped {leaving.node_id} are handed over', wait_for(lambda: exactly_once(nodes, remaining), timeout))
+            print(f'  handover took {time.monotonic() - started:.2f}s', flush=True)
+
+        joiner = Node(f'node-{len(nodes)}', broker.port, args.lease_ttl, args.log_dir)
+        joiner.start()
+        nodes.append(joiner)
+        check('a joining node is admitted', wait_for(lambda: joiner.cluster()['healthy'], timeout))
+        for bot_id in stopped:
+            client.publish(f'hbot/{bot_id}/start', json.dumps({'config': {'strategy_type': 'v2'}}), qos=1)
+        check('restarted bots land once, existing bots stay put', wait_for(lambda: exactly_once(nodes, bots), timeout))
+    finally:
+        client.loop_stop()
+        for node in nodes:
+            if node.alive():
+                node.kill()
+        asyncio.run_coroutine_threadsafe(broker.stop(), loop).result()
+
+    print(f'{len(failures)} failure(s); node logs in {args.log_dir}', flush=True)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
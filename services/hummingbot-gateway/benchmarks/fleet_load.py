@@ -0,0 +1,543 @@
+"""
+Fleet Load Test for Hummingbot Gateway
+Drives one gateway with simulated bot bridges over the mini broker and the fake Docker backend, and reports command latency, publish throughput, event-loop lag and memory per bot
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Callable, Dict, List, Optional, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+GATEWAY_DIR = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+sys.path.insert(0, GATEWAY_DIR)
+
+from cluster_check import free_port, get_json  # noqa: E402
+from log_pipeline import LogPipeline  # noqa: E402
+from mqtt_transport import MQTTTransport  # noqa: E402
+from payload_codec import encode  # noqa: E402
+
+DEFAULT_FIXTURE = os.path.join(GATEWAY_DIR, 'fixtures', 'hummingbot_output.log')
+# Results compared in --baseline mode: (path, True when higher is better)
+REGRESSION_KEYS = (
+    ('storms.start.p99_ms', False),
+    ('storms.config.p99_ms', False),
+    ('storms.stop.p99_ms', False),
+    ('throughput.fleet_published_per_sec', True),
+    ('throughput.gateway_received_per_sec', True),
+    ('gateway.loop_lag_p99_ms', False),
+    ('gateway.rss_per_bot_kb', False),
+)
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def histogram_quantile(before: Dict[str, float], after: Dict[str, float], name: str, q: float) -> Optional[float]:
+    """Quantile of a Prometheus histogram over the observations made between two scrapes, interpolated in its bucket"""
+    buckets = []
+    for key, value in after.items():
+        if key.startswith(f'{name}_bucket{{le="'):
+            bound = key[len(name) + 12:-2]
+            buckets.append((float('inf') if bound == '+Inf' else float(bound), value - before.get(key, 0)))
+    buckets.sort()
+    total = buckets[-1][1] if buckets else 0
+    if not total:
+        return None
+    rank, lower, below = q * total, 0.0, 0
+    for bound, cumulative in buckets:
+        if cumulative >= rank:
+            if bound == float('inf'):
+                return lower
+            return lower + (bound - lower) * (rank - below) / max(cumulative - below, 1)
+        lower, below = bound, cumulative
+    return lower
+
+
+def family_total(scrape: Dict[str, float], name: str) -> float:
+    return sum(value for key, value in scrape.items() if key == name or key.startswith(f'{name}{{'))
+
+
+def rss(pid: int) -> int:
+    """Resident set size in bytes (Linux)"""
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def get_text(url: str) -> str:
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return response.read().decode()
+
+
+class Gateway:
+    """main.py under uvicorn with the fake Docker backend and its own state DB"""
+
+    def __init__(self, broker_port: int, work_dir: str, encoding: str):
+        self.port = free_port()
+        self.broker_port = broker_port
+        self.work_dir = work_dir
+        self.encoding = encoding
+        self.process: Optional[subprocess.Popen] = None
+
+    def start(self):
+        env = {
+            **os.environ,
+            'DOCKER_BACKEND': 'fake',
+            'FAKE_DOCKER_MEM_TOTAL': str(1024 ** 4),
+            'GATEWAY_STATE_DB': os.path.join(self.work_dir, 'gateway_state.db'),
+            'MQTT_BROKER_URL': '127.0.0.1',
+            'MQTT_PORT': str(self.broker_port),
+            'MQTT_PAYLOAD_ENCODING': self.encoding,
+        }
+        log = open(os.path.join(self.work_dir, 'gateway.log'), 'w')
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1', '--port', str(self.port), '--log-level', 'warning'],
+            cwd=GATEWAY_DIR,
+            env=env,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+
+    def get(self, path: str) -> dict:
+        return get_json(f'http://127.0.0.1:{self.port}{path}')
+
+    def scrape(self) -> Dict[str, float]:
+        samples = {}
+        for line in get_text(f'http://127.0.0.1:{self.port}/metrics').splitlines():
+            if line and not line.startswith('#'):
+                key, _, value = line.rpartition(' ')
+                samples[key] = float(value)
+        return samples
+
+    def rss(self) -> int:
+        return rss(self.process.pid)
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.send_signal(signal.SIGTERM)
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+class FleetStats:
+    def __init__(self):
+        self.published = 0
+        self.dropped = 0
+        self.bytes = 0
+        self.config_acks = 0
+
+    def on_done(self, size: int) -> Callable[[asyncio.Future], None]:
+        def done(future: asyncio.Future):
+            if future.result():
+                self.published += 1
+                self.bytes += size
+            else:
+                self.dropped += 1
+        return done
+
+
+class SimulatedBridge:
+    """A bot container's bridge as the broker sees it: metrics, logs and trade batches while its bot runs, config acks"""
+
+    def __init__(self, bot_id: str, loop: asyncio.AbstractEventLoop, args: argparse.Namespace, lines: List[dict], stats: FleetStats):
+        self.bot_id = bot_id
+        self.args = args
+        self.lines = lines
+        self.stats = stats
+        self.running = asyncio.Event()
+        self.trade_id = 0
+        self.transport = MQTTTransport(loop, f'hummingbot_bridge_{bot_id}', on_connect=lambda: None, on_message=self.on_message)
+        self.transport.subscribe(f'hbot/{bot_id}/config/update', 1)
+
+    def publish(self, topic: str, payload: dict, qos: int = 0):
+        topic, data = encode(topic, payload, self.args.encoding)
+        self.transport.publish_nowait(topic, data, qos=qos).add_done_callback(self.stats.on_done(len(data)))
+
+    def on_message(self, topic: str, payload: bytes):
+        self.stats.config_acks += 1
+        self.publish(f'hbot/{self.bot_id}/config/applied', {'ok': True, 'timestamp': time.time(), 'latency_ms': 1.0}, qos=1)
+
+    def metrics(self) -> dict:
+        return {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime()) + '.000000',
+            'balance': {'total': 10000 + random.random() * 500, 'available': 8000.0, 'locked': 2000.0},
+            'pnl': {'total': random.uniform(-50, 50), 'total_pct': random.uniform(-1, 1), 'realized': 10.0, 'unrealized': 1.0},
+            'orders': {'active': random.randint(0, 8), 'filled_24h': 120, 'cancelled_24h': 400, 'volume_24h': 150000.0},
+        }
+
+    def trades(self) -> dict:
+        rows = []
+        for _ in range(self.args.trades_per_batch):
+            self.trade_id += 1
+            ts = int(time.time() * 1000)
+            rows.append({
+                'uid': f'{self.bot_id}:{self.trade_id}:{ts}', 'id': self.trade_id, 'market': 'binance', 'symbol': 'BTC-USDT',
+                'base': 'BTC', 'quote': 'USDT', 'order_type': 'LIMIT', 'trade_type': random.choice(('BUY', 'SELL')),
+                'price': 67000 + random.random() * 100, 'amount': 0.01, 'ts': ts,
+            })
+        return {'batch_id': f'{self.bot_id}:{rows[0]["id"]}-{rows[-1]["id"]}', 'bot_id': self.bot_id, 'count': len(rows), 'trades': rows}
+
+    async def run(self):
+        """Emit traffic on independent, randomly phased schedules while the bot is running"""
+        log_interval = 1 / self.args.log_rate if self.args.log_rate > 0 else float('inf')
+        now = time.monotonic()
+        due = {
+            'metrics': now + random.uniform(0, self.args.metrics_interval),
+            'log': now + random.uniform(0, min(log_interval, 60)),
+            'trades': now + random.uniform(0, self.args.trade_interval),
+        }
+        while True:
+            await self.running.wait()
+            kind = min(due, key=due.get)
+            delay = due[kind] - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                if not self.running.is_set():
+                    continue
+            if kind == 'metrics':
+                self.publish(f'hbot/{self.bot_id}/metrics', self.metrics())
+                due[kind] += self.args.metrics_interval
+            elif kind == 'log':
+                line = dict(random.choice(self.lines))
+                self.publish(f"hbot/{self.bot_id}/logs/{line['level']}", line)
+                due[kind] += log_interval
+            else:
+                self.publish(f'hbot/{self.bot_id}/trades', self.trades(), qos=1)
+                due[kind] += self.args.trade_interval
+            # After a pause the schedules resume from now instead of bursting to catch up
+            due[kind] = max(due[kind], time.monotonic() - 1)
+
+
+class CommandDriver:
+    """Publishes command storms like the dashboard would and times them until the gateway reports the outcome"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, bridges: Dict[str, SimulatedBridge]):
+        self.bridges = bridges
+        # bot_id -> (storm kind, expected status, sent at)
+        self.pending: Dict[str, Tuple[str, str, float]] = {}
+        self.latencies: Dict[str, List[float]] = {}
+        self.failures: Dict[str, int] = {}
+        self.settled = asyncio.Event()
+        self.transport = MQTTTransport(loop, 'fleet_load_driver', on_connect=lambda: None, on_message=self.on_status)
+        self.transport.subscribe('hbot/+/status', 1)
+
+    def on_status(self, topic: str, payload: bytes):
+        bot_id = topic.split('/')[1]
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+        status = message.get('status')
+        bridge = self.bridges.get(bot_id)
+        if bridge is not None:
+            # The simulated container only talks while its bot runs
+            if status == 'running':
+                bridge.running.set()
+            elif status in ('stopped', 'error', 'rejected'):
+                bridge.running.clear()
+        pending = self.pending.get(bot_id)
+        if pending is None:
+            return
+        kind, expected, sent_at = pending
+        if status == expected and (kind != 'config' or 'config_change' in message):
+            self.latencies.setdefault(kind, []).append(time.perf_counter() - sent_at)
+        elif status in ('error', 'rejected'):
+            self.failures[kind] = self.failures.get(kind, 0) + 1
+        else:
+            return
+        del self.pending[bot_id]
+        if not self.pending:
+            self.settled.set()
+
+    async def storm(self, kind: str, command: str, expected: str, payloads: Dict[str, dict], rate: float, timeout: float) -> dict:
+        """Send one command per bot, all at once or at rate per second, and wait for every outcome"""
+        self.latencies[kind], self.failures[kind] = [], 0
+        self.settled.clear()
+        started = time.perf_counter()
+        for index, (bot_id, payload) in enumerate(payloads.items()):
+            if rate > 0:
+                delay = started + index / rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            self.pending[bot_id] = (kind, expected, time.perf_counter())
+            self.transport.publish_nowait(f'hbot/{bot_id}/{command}', json.dumps(payload), qos=1)
+        try:
+            await asyncio.wait_for(self.settled.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        duration = time.perf_counter() - started
+        timed_out = len(self.pending)
+        self.pending.clear()
+        latencies = self.latencies[kind]
+        return {
+            'commands': len(payloads),
+            'completed': len(latencies),
+            'failed': self.failures[kind],
+            'timed_out': timed_out,
+            'duration_s': round(duration, 3),
+            'per_sec': round(len(latencies) / duration, 1) if duration else None,
+            'p50_ms': round(percentile(latencies, 0.5) * 1000, 2) if latencies else None,
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+            'max_ms': round(max(latencies) * 1000, 2) if latencies else None,
+        }
+
+
+async def watch_lag(samples: List[float], interval: float = 0.1):
+    """Event loop lag of the load driver itself; when it is high the driver, not the gateway, is the bottleneck"""
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - started - interval)
+
+
+def bot_config(bot_id: str, version: int = 0, restart: bool = False) -> dict:
+    config = {
+        'strategy_type': 'v2',
+        'controllers': {'controllers': [{'id': f'{bot_id}_mm', 'controller_name': 'pmm_simple', 'order_amount': 10 + version}]},
+    }
+    if restart:
+        # Not live-applicable, so the gateway restarts the container
+        config['exchange'] = f'binance_{version}'
+    return config
+
+
+async def wait_until(predicate: Callable[[], bool], timeout: float, interval: float = 0.1) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if predicate():
+                return True
+        except Exception:
+            pass
+        await asyncio.sleep(interval)
+    return False
+
+
+async def run_load(args: argparse.Namespace, work_dir: str) -> dict:
+    loop = asyncio.get_running_loop()
+    broker_port = free_port()
+    broker = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, 'mini_broker.py'), '--port', str(broker_port)],
+        stdout=open(os.path.join(work_dir, 'broker.log'), 'w'),
+        stderr=subprocess.STDOUT,
+    )
+    gateway = Gateway(broker_port, work_dir, args.encoding)
+    driver_lag: List[float] = []
+    lag_task = loop.create_task(watch_lag(driver_lag))
+    bridges: Dict[str, SimulatedBridge] = {}
+    try:
+        def broker_up() -> bool:
+            with socket.create_connection(('127.0.0.1', broker_port), timeout=1):
+                return True
+        if not await wait_until(broker_up, 10):
+            raise RuntimeError('Mini broker did not come up')
+        os.environ.update({'MQTT_BROKER_URL': '127.0.0.1', 'MQTT_PORT': str(broker_port)})
+
+        gateway.start()
+        ready = await wait_until(
+            lambda: gateway.get('/health')['mqtt_connected'] and gateway.get('/startup')['reconciliation']['status'] in ('done', 'skipped'),
+            args.timeout,
+        )
+        if not ready:
+            raise RuntimeError('Gateway did not become ready')
+
+        pipeline = LogPipeline.default()
+        with open(args.fixture, 'r', encoding='utf-8') as f:
+            lines = [record for record in map(pipeline.process, f) if record is not None]
+        stats = FleetStats()
+        bot_ids = [f'load{index:05d}' for index in range(args.bots)]
+        for bot_id in bot_ids:
+            bridges[bot_id] = SimulatedBridge(bot_id, loop, args, lines, stats)
+        driver = CommandDriver(loop, bridges)
+        driver.transport.start()
+        for bridge in bridges.values():
+            bridge.transport.start()
+        driver_rss_before = rss(os.getpid())
+        if not await wait_until(lambda: all(bridge.transport.is_connected() for bridge in bridges.values()) and driver.transport.is_connected(), args.timeout):
+            raise RuntimeError('Simulated bridges could not all connect')
+        traffic = [loop.create_task(bridge.run()) for bridge in bridges.values()]
+        await asyncio.sleep(1)
+        gateway_rss_idle = gateway.rss()
+        driver_rss_fleet = rss(os.getpid())
+
+        storms = {}
+        storms['start'] = await driver.storm(
+            'start', 'start', 'running', {bot_id: {'config': bot_config(bot_id)} for bot_id in bot_ids}, args.storm_rate, args.timeout,
+        )
+
+        # Steady state: every running bot's bridge is publishing
+        scrape_before = await loop.run_in_executor(None, gateway.scrape)
+        published_before, bytes_before, started = stats.published, stats.bytes, time.perf_counter()
+        await asyncio.sleep(args.duration)
+        elapsed = time.perf_counter() - started
+        scrape_after = await loop.run_in_executor(None, gateway.scrape)
+        published, sent_bytes = stats.published - published_before, stats.bytes - bytes_before
+        gateway_rss_loaded = gateway.rss()
+
+        restarts = set(random.Random(1).sample(bot_ids, int(len(bot_ids) * args.config_restart_ratio)))
+        storms['config'] = await driver.storm(
+            'config', 'config/update', 'running',
+            {bot_id: {**bot_config(bot_id, 1, bot_id in restarts), 'remote_reload': True} for bot_id in bot_ids},
+            args.storm_rate, args.timeout,
+        )
+        storms['stop'] = await driver.storm('stop', 'stop', 'stopped', {bot_id: {} for bot_id in bot_ids}, args.storm_rate, args.timeout)
+        scrape_end = await loop.run_in_executor(None, gateway.scrape)
+
+        for task in traffic:
+            task.cancel()
+        lag_p99 = histogram_quantile(scrape_before, scrape_after, 'gateway_event_loop_lag_seconds', 0.99)
+        lag_p99_storms = histogram_quantile({}, scrape_end, 'gateway_event_loop_lag_seconds', 0.99)
+        received = family_total(scrape_after, 'gateway_mqtt_messages_received_total') - family_total(scrape_before, 'gateway_mqtt_messages_received_total')
+        return {
+            'config': {
+                'bots': args.bots, 'duration_s': args.duration, 'encoding': args.encoding, 'log_rate': args.log_rate,
+                'metrics_interval_s': args.metrics_interval, 'trade_interval_s': args.trade_interval, 'storm_rate': args.storm_rate,
+            },
+            'storms': storms,
+            'throughput': {
+                'fleet_published_per_sec': round(published / elapsed, 1),
+                'fleet_bytes_per_sec': round(sent_bytes / elapsed, 1),
+                'fleet_dropped': stats.dropped,
+                'gateway_received_per_sec': round(received / elapsed, 1),
+                'gateway_dropped': family_total(scrape_end, 'gateway_mqtt_dropped_total'),
+                'config_acks': stats.config_acks,
+            },
+            'gateway': {
+                'loop_lag_p99_ms': round(lag_p99 * 1000, 3) if lag_p99 is not None else None,
+                'loop_lag_p99_whole_run_ms': round(lag_p99_storms * 1000, 3) if lag_p99_storms is not None else None,
+                'rss_idle_mb': round(gateway_rss_idle / 2 ** 20, 1),
+                'rss_loaded_mb': round(gateway_rss_loaded / 2 ** 20, 1),
+                'rss_per_bot_kb': round((gateway_rss_loaded - gateway_rss_idle) / 1024 / args.bots, 1),
+                'tasks': scrape_after.get('gateway_asyncio_tasks'),
+            },
+            'driver': {
+                'loop_lag_p99_ms': round(percentile(driver_lag, 0.99) * 1000, 3) if driver_lag else None,
+                'rss_per_bridge_kb': round((driver_rss_fleet - driver_rss_before) / 1024 / args.bots, 1),
+            },
+        }
+    finally:
+        lag_task.cancel()
+        await asyncio.gather(*(bridge.transport.stop() for bridge in bridges.values()), return_exceptions=True)
+        gateway.stop()
+        broker.kill()
+        broker.wait()
+
+
+def lookup(results: dict, path: str):
+    for key in path.split('.'):
+        results = (results or {}).get(key)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Regressions beyond tolerance; latencies also get 2ms of absolute slack so sub-millisecond noise doesn't fail runs"""
+    regressions = []
+    for path, higher_is_better in REGRESSION_KEYS:
+        current, previous = lookup(results, path), lookup(baseline, path)
+        if current is None or previous is None:
+            continue
+        if higher_is_better:
+            limit = previous * (1 - tolerance)
+            failed = current < limit
+        else:
+            limit = previous * (1 + tolerance) + (2 if path.endswith('_ms') else 0)
+            failed = current > limit
+        if failed:
+            regressions.append(f'{path}: {current} vs baseline {previous} (limit {limit:.2f})')
+    return regressions
+
+
+def report(results: dict):
+    config = results['config']
+    print(f"{config['bots']} bots, {config['duration_s']:g}s steady state, {config['encoding']} payloads")
+    for kind, storm in results['storms'].items():
+        print(
+            f"  {kind:<6} storm: {storm['completed']}/{storm['commands']} ok in {storm['duration_s']:.2f}s "
+            f"({storm['per_sec']}/s)  p50 {storm['p50_ms']}ms  p99 {storm['p99_ms']}ms  max {storm['max_ms']}ms"
+            f"{'  failed ' + str(storm['failed']) if storm['failed'] else ''}{'  timed out ' + str(storm['timed_out']) if storm['timed_out'] else ''}"
+        )
+    throughput, gateway, driver = results['throughput'], results['gateway'], results['driver']
+    print(
+        f"  publish: fleet {throughput['fleet_published_per_sec']}/s ({throughput['fleet_bytes_per_sec'] / 1024:.0f} KiB/s, "
+        f"{throughput['fleet_dropped']} dropped), gateway ingest {throughput['gateway_received_per_sec']}/s"
+    )
+    print(
+        f"  gateway: loop lag p99 {gateway['loop_lag_p99_ms']}ms steady / {gateway['loop_lag_p99_whole_run_ms']}ms whole run, "
+        f"RSS {gateway['rss_idle_mb']} -> {gateway['rss_loaded_mb']} MiB ({gateway['rss_per_bot_kb']} KiB/bot)"
+    )
+    print(f"  driver:  loop lag p99 {driver['loop_lag_p99_ms']}ms, {driver['rss_per_bridge_kb']} KiB/simulated bridge")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[-1])
+    parser.add_argument('--bots', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=20, help='Seconds of steady traffic between the start and config storms')
+    parser.add_argument('--log-rate', type=float, default=2, help='Log lines per second per bot')
+    parser.add_argument('--metrics-interval', type=float, default=10, help='Seconds between metrics per bot, like the bridge default')
+    parser.add_argument('--trade-interval', type=float, default=30, help='Seconds between trade batches per bot')
+    parser.add_argument('--trades-per-batch', type=int, default=5)
+    parser.add_argument('--encoding', choices=('json', 'msgpack'), default='json')
+    parser.add_argument('--storm-rate', type=float, default=0, help='Commands per second in a storm; 0 sends them all at once')
+    parser.add_argument('--config-restart-ratio', type=float, default=0.2, help='Share of config updates that need a restart')
+    parser.add_argument('--timeout', type=float, default=120, help='Seconds to wait for startup and for each storm')
+    parser.add_argument('--fixture', default=DEFAULT_FIXTURE, help='Recorded Hummingbot stdout the log lines are drawn from')
+    parser.add_argument('--work-dir', default=os.path.join(tempfile.gettempdir(), 'gateway_fleet_load'))
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    parser.add_argument('--save', help='Write the results to this file, e.g. to use as a baseline')
+    parser.add_argument('--baseline', help='Compare with saved results and exit 1 on a regression')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Relative change allowed against the baseline')
+    parser.add_argument('--verbose', action='store_true', help='Show the simulated clients\' connection logs')
+    args = parser.parse_args()
+    os.makedirs(args.work_dir, exist_ok=True)
+    for name in ('gateway_state.db', 'gateway_state.db-wal', 'gateway_state.db-shm'):
+        if os.path.exists(os.path.join(args.work_dir, name)):
+            os.remove(os.path.join(args.work_dir, name))
+
+    # Hundreds of simulated clients each log their connection attempts
+    stdout = sys.stdout
+    if not args.verbose:
+        sys.stdout = open(os.devnull, 'w')
+    try:
+        results = asyncio.run(run_load(args, args.work_dir))
+    finally:
+        sys.stdout = stdout
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        report(results)
+        print(f'  logs in {args.work_dir}')
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            sys.exit(1)
+        print(f'No regressions against {args.baseline} (tolerance {args.tolerance:.0%})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Log Pipeline Benchmark for Hummingbot Gateway
+Replays recorded Hummingbot output through the bridge's log pipeline and the per-line code it replaced
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from log_pipeline import LogPipeline  # noqa: E402
+
+DEFAULT_FIXTURE = os.path.join(os.path.dirname(HERE), 'fixtures', 'hummingbot_output.log')
+
+
+def legacy_process(line):
+    """The bridge's previous publish_log/run_bot line handling, kept as the baseline"""
+    level = 'info'
+    line_lower = line.lower()
+    if 'error' in line_lower: level = 'error'
+    elif 'warning' in line_lower: level = 'warning'
+
+    import re
+    ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+    clean_message = ansi_escape.sub('', line).strip()
+    if not clean_message: return None
+    if any(c in clean_message for c in '█╗╝╚═║╔╝'):
+        return None
+    if 'Broken pipe' in clean_message and 'yes' in clean_message:
+        return None
+    if '/bin/bash:' in clean_message:
+        return None
+    try:
+        if clean_message.startswith('{') and clean_message.endswith('}'):
+            data = json.loads(clean_message)
+            if isinstance(data, dict):
+                msg = data.get('message', '').strip()
+                if msg:
+                    clean_message = msg
+                if 'level' in data:
+                    level = data['level'].lower()
+    except:
+        pass
+    if not clean_message or len(clean_message) < 2: return None
+    return {'level': level, 'message': clean_message, 'timestamp': datetime.utcnow().isoformat()}
+
+
+def measure(name, process, lines, rounds):
+    """Lines per second, plus memory blocks still allocated per published record"""
+    total = len(lines) * rounds
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for line in lines:
+            process(line)
+    elapsed = time.perf_counter() - started
+
+    # Keep every record alive so the block delta is what each published line costs
+    gc.collect()
+    before = sys.getallocatedblocks()
+    kept = [process(line) for line in lines]
+    blocks = sys.getallocatedblocks() - before
+    published = sum(record is not None for record in kept)
+    return {
+        'name': name,
+        'lines': total,
+        'lines_per_sec': total / elapsed,
+        'published': published,
+        'blocks_per_line': blocks / len(lines),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[-1])
+    parser.add_argument('--fixture', default=DEFAULT_FIXTURE, help='Recorded Hummingbot stdout, one line per line')
+    parser.add_argument('--rounds', type=int, default=2000, help='Times the recording is replayed')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    with open(args.fixture, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+
+    pipeline = LogPipeline.default()
+    results = [
+        measure('legacy', legacy_process, lines, args.rounds),
+        measure('pipeline', pipeline.process, lines, args.rounds),
+    ]
+    # Both must publish the same lines for the comparison to mean anything
+    assert results[0]['published'] == results[1]['published'], results
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f'{len(lines)} recorded lines x {args.rounds} rounds')
+    for result in results:
+        print(
+            f"{result['name']:>9}: {result['lines_per_sec']:>10,.0f} lines/sec  "
+            f"{result['blocks_per_line']:5.1f} blocks/line  ({result['published']} of {len(lines)} published)"
+        )
+    print(f"  speedup: {results[1]['lines_per_sec'] / results[0]['lines_per_sec']:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,331 @@
+"""
+Mini MQTT Broker for Hummingbot Gateway
+Single-process MQTT 3.1.1 broker (QoS 0/1, retained messages, wills, wildcards) for running gateway nodes locally
+"""
+
+import argparse
+import asyncio
+import struct
+from typing import Dict, List, Optional, Tuple
+
+CONNECT, CONNACK, PUBLISH, PUBACK = 1, 2, 3, 4
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK = 8, 9, 10, 11
+PINGREQ, PINGRESP, DISCONNECT = 12, 13, 14
+
+
+def encode_length(length: int) -> bytes:
+    encoded = bytearray()
+    while True:
+        byte, length = length % 128, length // 128
+        encoded.append(byte | 0x80 if length else byte)
+        if not length:
+            return bytes(encoded)
+
+
+def encode_string(value: str) -> bytes:
+    data = value.encode()
+    return struct.pack('!H', len(data)) + data
+
+
+def packet(packet_type: int, flags: int, body: bytes) -> bytes:
+    return bytes([(packet_type << 4) | flags]) + encode_length(len(body)) + body
+
+
+def publish_packet(topic: str, payload: bytes, qos: int, retain: bool, packet_id: int = 0) -> bytes:
+    body = encode_string(topic) + (struct.pack('!H', packet_id) if qos else b'') + payload
+    return packet(PUBLISH, (qos << 1) | int(retain), body)
+
+
+class Reader:
+    def __init__(self, data: bytes):
+        self.data, self.offset = data, 0
+
+    def u8(self) -> int:
+        self.offset += 1
+        return self.data[self.offset - 1]
+
+    def u16(self) -> int:
+        self.offset += 2
+        return struct.unpack_from('!H', self.data, self.offset - 2)[0]
+
+    def binary(self) -> bytes:
+        length = self.u16()
+        self.offset += length
+        return self.data[self.offset - length:self.offset]
+
+    def string(self) -> str:
+        return self.binary().decode()
+
+    def rest(self) -> bytes:
+        return self.data[self.offset:]
+
+
+class SubscriptionTree:
+    """Topic filters as a trie, so routing a publish costs the topic depth rather than the subscription count"""
+
+    def __init__(self):
+        self.children: Dict[str, 'SubscriptionTree'] = {}
+        self.subscribers: Dict['Session', int] = {}
+
+    def add(self, topic_filter: str, session: 'Session', qos: int):
+        node = self
+        for level in topic_filter.split('/'):
+            node = node.children.setdefault(level, SubscriptionTree())
+        node.subscribers[session] = qos
+
+    def remove(self, topic_filter: str, session: 'Session'):
+        node = self
+        for level in topic_filter.split('/'):
+            node = node.children.get(level)
+            if node is None:
+                return
+        node.subscribers.pop(session, None)
+
+    def match(self, levels: List[str], matches: Dict['Session', int], depth: int = 0):
+        """Collect subscribers with their highest granted QoS; wildcards skip $-topics at the first level"""
+        wildcard_ok = depth > 0 or not levels[0].startswith('$')
+        if '#' in self.children and wildcard_ok:
+            self.merge(self.children['#'].subscribers, matches)
+        if depth == len(levels):
+            self.merge(self.subscribers, matches)
+            return
+        exact = self.children.get(levels[depth])
+        if exact is not None:
+            exact.match(levels, matches, depth + 1)
+        if '+' in self.children and wildcard_ok:
+            self.children['+'].match(levels, matches, depth + 1)
+
+    @staticmethod
+    def merge(subscribers: Dict['Session', int], matches: Dict['Session', int]):
+        for session, qos in subscribers.items():
+            matches[session] = max(qos, matches.get(session, 0))
+
+
+def filter_matches(topic_filter: str, topic: str) -> bool:
+    filter_levels, levels = topic_filter.split('/'), topic.split('/')
+    if levels[0].startswith('$') and filter_levels[0] in ('+', '#'):
+        return False
+    for index, level in enumerate(filter_levels):
+        if level == '#':
+            return True
+        if index >= len(levels) or (level != '+' and level != levels[index]):
+            return False
+    return len(filter_levels) == len(levels)
+
+
+class Session:
+    def __init__(self, broker: 'MiniBroker', reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.broker = broker
+        self.reader = reader
+        self.writer = writer
+        self.client_id = ''
+        self.keepalive = 0
+        self.will: Optional[Tuple[str, bytes, int, bool]] = None
+        self.filters: Dict[str, int] = {}
+        self.next_packet_id = 0
+        self.outbox: asyncio.Queue = asyncio.Queue()
+        self.closed = False
+
+    def send(self, data: bytes):
+        if not self.closed:
+            self.outbox.put_nowait(data)
+
+    def deliver(self, topic: str, payload: bytes, qos: int, retain: bool = False):
+        packet_id = 0
+        if qos:
+            # Delivery acks are not tracked: clients are local and sessions are always clean
+            self.next_packet_id = self.next_packet_id % 65535 + 1
+            packet_id = self.next_packet_id
+        self.send(publish_packet(topic, payload, qos, retain, packet_id))
+
+    async def write_loop(self):
+        while True:
+            data = await self.outbox.get()
+            if data is None:
+                break
+            self.writer.write(data)
+            if self.outbox.empty():
+                await self.writer.drain()
+
+    async def read_packet(self) -> Tuple[int, int, bytes]:
+        header = (await self.reader.readexactly(1))[0]
+        length, multiplier = 0, 1
+        while True:
+            byte = (await self.reader.readexactly(1))[0]
+            length += (byte & 0x7F) * multiplier
+            multiplier *= 128
+            if not byte & 0x80:
+                break
+        body = await self.reader.readexactly(length) if length else b''
+        return header >> 4, header & 0x0F, body
+
+    async def run(self):
+        writer_task = asyncio.get_running_loop().create_task(self.write_loop())
+        clean = False
+        try:
+            packet_type, _, body = await asyncio.wait_for(self.read_packet(), 10)
+            if packet_type != CONNECT:
+                return
+            self.connect(Reader(body))
+            while True:
+                timeout = self.keepalive * 1.5 if self.keepalive else None
+                packet_type, flags, body = await asyncio.wait_for(self.read_packet(), timeout)
+                if packet_type == PUBLISH:
+                    self.on_publish(flags, Reader(body))
+                elif packet_type == SUBSCRIBE:
+                    self.on_subscribe(Reader(body))
+                elif packet_type == UNSUBSCRIBE:
+                    self.on_unsubscribe(Reader(body))
+                elif packet_type == PINGREQ:
+                    self.send(packet(PINGRESP, 0, b''))
+                elif packet_type == DISCONNECT:
+                    clean = True
+                    return
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            self.close(publish_will=not clean)
+            self.outbox.put_nowait(None)
+            try:
+                await writer_task
+                self.writer.close()
+            except Exception:
+                pass
+
+    def connect(self, reader: Reader):
+        reader.string()  # protocol name
+        reader.u8()  # protocol level
+        flags = reader.u8()
+        self.keepalive = reader.u16()
+        self.client_id = reader.string() or f'anonymous-{id(self)}'
+        if flags & 0x04:
+            topic, message = reader.string(), reader.binary()
+            self.will = (topic, message, (flags >> 3) & 0x03, bool(flags & 0x20))
+        self.broker.register(self)
+        self.send(packet(CONNACK, 0, b'\x00\x00'))
+
+    def on_publish(self, flags: int, reader: Reader):
+        qos, retain = (flags >> 1) & 0x03, bool(flags & 0x01)
+        topic = reader.string()
+        packet_id = reader.u16() if qos else 0
+        self.broker.route(topic, reader.rest(), min(qos, 1), retain)
+        if qos:
+            self.send(packet(PUBACK, 0, struct.pack('!H', packet_id)))
+
+    def on_subscribe(self, reader: Reader):
+        packet_id = reader.u16()
+        granted = []
+        while reader.offset < len(reader.data):
+            topic_filter, qos = reader.string(), min(reader.u8(), 1)
+            self.filters[topic_filter] = qos
+            self.broker.subscriptions.add(topic_filter, self, qos)
+            granted.append((topic_filter, qos))
+        self.send(packet(SUBACK, 0, struct.pack('!H', packet_id) + bytes(qos for _, qos in granted)))
+        for topic_filter, qos in granted:
+            for topic, (payload, retained_qos) in list(self.broker.retained.items()):
+                if filter_matches(topic_filter, topic):
+                    self.deliver(topic, payload, min(qos, retained_qos), retain=True)
+
+    def on_unsubscribe(self, reader: Reader):
+        packet_id = reader.u16()
+        while reader.offset < len(reader.data):
+            topic_filter = reader.string()
+            self.filters.pop(topic_filter, None)
+            self.broker.subscriptions.remove(topic_filter, self)
+        self.send(packet(UNSUBACK, 0, struct.pack('!H', packet_id)))
+
+    def close(self, publish_will: bool):
+        if self.closed:
+            return
+        self.closed = True
+        self.broker.unregister(self)
+        if publish_will and self.will:
+            topic, message, qos, retain = self.will
+            self.broker.route(topic, message, min(qos, 1), retain)
+
+
+class MiniBroker:
+    def __init__(self, host: str = '127.0.0.1', port: int = 1883):
+        self.host = host
+        self.port = port
+        self.sessions: Dict[str, Session] = {}
+        self.subscriptions = SubscriptionTree()
+        self.retained: Dict[str, Tuple[bytes, int]] = {}
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.tasks: set = set()
+        self.routed = 0
+        self.delivered = 0
+
+    def register(self, session: Session):
+        previous = self.sessions.get(session.client_id)
+        if previous is not None:
+            # Same client id connecting again takes the session over
+            previous.close(publish_will=True)
+            previous.writer.close()
+        self.sessions[session.client_id] = session
+
+    def unregister(self, session: Session):
+        if self.sessions.get(session.client_id) is session:
+            del self.sessions[session.client_id]
+        for topic_filter in session.filters:
+            self.subscriptions.remove(topic_filter, session)
+
+    def route(self, topic: str, payload: bytes, qos: int, retain: bool):
+        self.routed += 1
+        if retain:
+            if payload:
+                self.retained[topic] = (payload, qos)
+            else:
+                self.retained.pop(topic, None)
+        matches: Dict[Session, int] = {}
+        self.subscriptions.match(topic.split('/'), matches)
+        for session, granted in matches.items():
+            session.deliver(topic, payload, min(qos, granted))
+        self.delivered += len(matches)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self.tasks.add(task)
+        try:
+            await Session(self, reader, writer).run()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.tasks.discard(task)
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        print(f'Mini Broker: Listening on {self.host}:{self.port}', flush=True)
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        for session in list(self.sessions.values()):
+            session.close(publish_will=False)
+            session.writer.close()
+        for task in list(self.tasks):
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+
+async def serve(host: str, port: int):
+    broker = MiniBroker(host, port)
+    await broker.start()
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[-1])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=1883)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Payload Codec Benchmark for Hummingbot Gateway
+Compares bytes per message and encode/decode cost of the JSON and MessagePack payloads of each bridge topic family
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from log_pipeline import LogPipeline  # noqa: E402
+from payload_codec import decode, encode  # noqa: E402
+
+DEFAULT_FIXTURE = os.path.join(os.path.dirname(HERE), 'fixtures', 'hummingbot_output.log')
+TIMESTAMP = '2026-10-18T07:00:01.123456'
+
+
+def resource_metrics() -> dict:
+    """Shape of ContainerMetrics.sample() inside a bot container"""
+    return {
+        'kind': 'resources',
+        'container': {
+            'cpu': {'usage_usec': 81234567, 'limit_cores': 0.5, 'nr_periods': 120345, 'nr_throttled': 1234,
+                    'throttled_usec': 4567890, 'pct': 12.34, 'throttled_pct': 1.02},
+            'memory': {'current': 412345678, 'peak': 498765432, 'limit': 805306368, 'anon': 301234567,
+                       'file': 98765432, 'oom': 0, 'oom_kill': 0, 'pct': 51.2},
+            'io': {'rbytes': 12345678, 'wbytes': 87654321, 'rios': 1234, 'wios': 5678},
+        },
+        'process': {'cpu_pct': 11.9, 'rss': 398765432, 'threads': 23, 'children': 1, 'open_files': 37},
+        'timestamp': TIMESTAMP,
+    }
+
+
+def trading_metrics() -> dict:
+    return {
+        'timestamp': TIMESTAMP,
+        'balance': {'total': 10234.56, 'available': 8123.45, 'locked': 2111.11},
+        'pnl': {'total': 234.56, 'total_pct': 2.34, 'realized': 200.12, 'unrealized': 34.44},
+        'orders': {'active': 6, 'filled_24h': 148, 'cancelled_24h': 512, 'volume_24h': 183456.78},
+    }
+
+
+def order() -> dict:
+    return {
+        'exchange_order_id': '8389765432109876543', 'trading_pair': 'BTC-USDT', 'order_type': 'buy',
+        'order_side': 'limit', 'price': 67012.5, 'quantity': 0.015, 'filled_quantity': 0.015,
+        'status': 'filled', 'exchange_timestamp': TIMESTAMP,
+    }
+
+
+def trades(count: int) -> dict:
+    """A TradeExporter batch"""
+    rows = [{
+        'uid': f'bot1:{index}:{1760770801123 + index}', 'id': index, 'market': 'binance', 'symbol': 'BTC-USDT',
+        'base': 'BTC', 'quote': 'USDT', 'order_type': 'LIMIT', 'trade_type': 'BUY' if index % 2 else 'SELL',
+        'price': 67000.5 + index, 'amount': 0.01, 'ts': 1760770801123 + index,
+    } for index in range(1, count + 1)]
+    return {'batch_id': f'bot1:1-{count}', 'bot_id': 'bot1', 'count': count, 'trades': rows}
+
+
+def log_records(fixture: str) -> list:
+    pipeline = LogPipeline.default()
+    with open(fixture, 'r', encoding='utf-8') as f:
+        records = [pipeline.process(line) for line in f]
+    return [record for record in records if record is not None]
+
+
+def log_batch(records: list, size: int) -> dict:
+    lines = records[:size]
+    return {'v': 1, 'epoch': 1760770801123, 'seq': 0, 'count': len(lines), 'lines': lines}
+
+
+def measure(topic: str, payload: dict, encoding: str, rounds: int) -> dict:
+    encoded_topic, data = encode(topic, payload, encoding)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        encode(topic, payload, encoding)
+    encode_us = (time.perf_counter() - started) / rounds * 1e6
+    started = time.perf_counter()
+    for _ in range(rounds):
+        decode(encoded_topic, data)
+    decode_us = (time.perf_counter() - started) / rounds * 1e6
+    return {'topic': encoded_topic, 'bytes': len(data), 'encode_us': encode_us, 'decode_us': decode_us}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[-1])
+    parser.add_argument('--fixture', default=DEFAULT_FIXTURE, help='Recorded Hummingbot stdout for the log samples')
+    parser.add_argument('--rounds', type=int, default=2000, help='Encodes and decodes per sample')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    records = log_records(args.fixture)
+    batch = log_batch(records, 50)
+    samples = [
+        ('metrics (resources)', 'hbot/bot1/metrics', resource_metrics()),
+        ('metrics (trading)', 'hbot/bot1/metrics', trading_metrics()),
+        ('order', 'hbot/bot1/orders/filled', order()),
+        ('log line', 'hbot/bot1/logs/info', records[0]),
+        (f"log batch x{batch['count']}", 'hbot/bot1/logs/batch', batch),
+        (f"log batchz x{batch['count']}", 'hbot/bot1/logs/batchz', batch),
+        ('trades x100', 'hbot/bot1/trades', trades(100)),
+    ]
+    results = []
+    for name, topic, payload in samples:
+        results.append({
+            'name': name,
+            'json': measure(topic, payload, 'json', args.rounds),
+            'msgpack': measure(topic, payload, 'msgpack', args.rounds),
+        })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'sample':<20} {'json B':>8} {'msgpack B':>10} {'size':>6} {'json enc':>9} {'mp enc':>9} {'json dec':>9} {'mp dec':>9}")
+    for result in results:
+        plain, packed = result['json'], result['msgpack']
+        print(
+            f"{result['name']:<20} {plain['bytes']:>8} {packed['bytes']:>10} {packed['bytes'] / plain['bytes']:>6.0%} "
+            f"{plain['encode_us']:>7.1f}us {packed['encode_us']:>7.1f}us {plain['decode_us']:>7.1f}us {packed['decode_us']:>7.1f}us"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Per-bot command actors for Hummingbot Gateway
+Serializes commands for each bot and coalesces superseded intents
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from telemetry import MQTT_COMMAND_LATENCY
+
+# Commands that set the desired lifecycle state of a bot; the latest one wins
+LIFECYCLE_COMMANDS = frozenset({'start', 'stop'})
+
+
+class BotCommandActor:
+    """Runs the commands of a single bot one at a time, collapsing queued ones to the latest intent"""
+
+    def __init__(
+        self,
+        bot_id: str,
+        handler: Callable[[str, str, dict], Awaitable[None]],
+        release: Callable[[int], None],
+        on_idle: Callable[[str], None],
+    ):
+        self.bot_id = bot_id
+        self.handler = handler
+        self.release = release
+        self.on_idle = on_idle
+        # (command, payload, perf_counter time the command was received)
+        self.pending: List[Tuple[str, dict, float]] = []
+        self.task: Optional[asyncio.Task] = None
+        self.coalesced = 0
+
+    def submit(self, command: str, payload: dict, received_at: Optional[float] = None):
+        """Queue a command, dropping pending commands it supersedes. Must run on the event loop."""
+        received_at = time.perf_counter() if received_at is None else received_at
+        dropped = 0
+        if command in LIFECYCLE_COMMANDS:
+            # start->stop->start collapses to a single start; a stop also makes pending restarts moot
+            superseded = LIFECYCLE_COMMANDS if command == 'start' else LIFECYCLE_COMMANDS | {'config'}
+            kept = [item for item in self.pending if item[0] not in superseded]
+            dropped = len(self.pending) - len(kept)
+            self.pending = kept
+        elif command == 'config':
+            # N config updates collapse into one; keep restarting if any of them asked for it
+            for index, (queued_command, queued_payload, queued_at) in enumerate(self.pending):
+                if queued_command == 'config':
+                    payload = dict(payload)
+                    payload['remote_reload'] = bool(
+                        payload.get('remote_reload', False) and queued_payload.get('remote_reload', False)
+                    )
+                    # Latency of the merged update counts from the oldest request it absorbed
+                    received_at = min(received_at, queued_at)
+                    del self.pending[index]
+                    dropped = 1
+                    break
+
+        self.pending.append((command, payload, received_at))
+        if dropped:
+            self.coalesced += dropped
+            print(f'MQTT Bridge: Coalesced {dropped} superseded command(s) for bot {self.bot_id} into {command}', flush=True)
+            self.release(dropped)
+
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self.run())
+
+    async def run(self):
+        """Drain the queue sequentially"""
+        while self.pending:
+            command, payload, received_at = self.pending.pop(0)
+            try:
+                await self.handler(self.bot_id, command, payload)
+            finally:
+                MQTT_COMMAND_LATENCY.observe(time.perf_counter() - received_at, command)
+                self.release(1)
+        self.on_idle(self.bot_id)
+
+    def clear(self):
+        """Drop pending commands, letting the running one finish"""
+        dropped = len(self.pending)
+        self.pending.clear()
+        if dropped:
+            self.release(dropped)
+
+    def cancel(self):
+        """Drop pending commands and stop the actor"""
+        self.clear()
+        if self.task and not self.task.done():
+            self.task.cancel()
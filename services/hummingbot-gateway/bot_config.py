@@ -0,0 +1,83 @@
+"""
+Bot Config Documents for Hummingbot Gateway
+Typed, versioned bot config documents with a canonical content hash; shared by the gateway and the in-container bridge
+"""
+
+import hashlib
+import json
+from typing import Dict, Optional
+
+CONFIG_DOCUMENT_VERSION = 1
+# Where the document is delivered inside bot and backtest containers
+CONFIG_DOCUMENT_PATH = '/hummingbot/conf/bot_config.json'
+# Where a pack container finds the config documents of all bots it hosts
+PACK_MANIFEST_PATH = '/hummingbot/conf/pack.json'
+
+# Request flags that travel with a config but are not part of it
+TRANSIENT_KEYS = frozenset({'remote_reload'})
+# Log settings are owned by the in-container bridge, never by the strategy
+LOG_KEYS = frozenset({'log_limits', 'log_sample_every'})
+# Keys a running bot applies without a restart: controller changes are pushed into the V2 executor,
+# log settings are applied by the bridge
+HOT_KEYS = frozenset({'controllers'}) | LOG_KEYS
+
+
+def normalize_config(config: dict) -> dict:
+    """Drop request flags and decode values that arrive JSON-encoded, such as V2 controllers"""
+    normalized = {}
+    for key, value in config.items():
+        if key in TRANSIENT_KEYS:
+            continue
+        if key == 'controllers' and isinstance(value, str):
+            value = json.loads(value) if value.strip() else {'controllers': []}
+        if key == 'controllers' and isinstance(value, list):
+            value = {'controllers': value}
+        normalized[key] = value
+    return normalized
+
+
+def config_hash(config: dict) -> str:
+    canonical = json.dumps(normalize_config(config), sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def build_config_document(bot_id: str, config: dict) -> dict:
+    normalized = normalize_config(config)
+    return {
+        'version': CONFIG_DOCUMENT_VERSION,
+        'bot_id': bot_id,
+        'hash': config_hash(normalized),
+        'config': normalized,
+    }
+
+
+def changed_keys(current: dict, new: dict) -> set:
+    current, new = normalize_config(current), normalize_config(new)
+    return {key for key in current.keys() | new.keys() if current.get(key) != new.get(key)}
+
+
+def classify_change(current: Optional[dict], new: dict) -> str:
+    """'noop' when the config is unchanged, 'hot' when a running bot can apply it live, else 'restart'"""
+    if current is None:
+        return 'restart'
+    if config_hash(current) == config_hash(new):
+        return 'noop'
+    changed = changed_keys(current, new)
+    new = normalize_config(new)
+    if new.get('strategy_type') == 'v2' and changed <= HOT_KEYS:
+        return 'hot'
+    if changed <= LOG_KEYS:
+        return 'hot'
+    return 'restart'
+
+
+def diff_documents(current: Dict[str, dict], new: Dict[str, dict]) -> dict:
+    """Bot ids added, removed and changed (by document hash) between two {bot_id: document} maps"""
+    return {
+        'added': sorted(bot_id for bot_id in new if bot_id not in current),
+        'removed': sorted(bot_id for bot_id in current if bot_id not in new),
+        'changed': sorted(
+            bot_id for bot_id in new
+            if bot_id in current and current[bot_id].get('hash') != new[bot_id].get('hash')
+        ),
+    }
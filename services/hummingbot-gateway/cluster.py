@@ -0,0 +1,305 @@
+"""
+Gateway Cluster for Hummingbot Gateway
+Shards bots across gateway nodes: rendezvous hashing over MQTT heartbeats, with per-bot ownership leases
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+CLUSTER_TOPIC = 'hbgw'
+# Retained, one per node; the payload is the node's lease and an empty payload means it left
+NODE_TOPIC = f'{CLUSTER_TOPIC}/nodes'
+# Retained, one per bot: owning node, lease term and the bot's desired state for failover
+BOT_TOPIC = f'{CLUSTER_TOPIC}/bots'
+
+
+def rendezvous_owner(bot_id: str, nodes: List[str]) -> Optional[str]:
+    """Highest random weight: every node computes the same owner, and a departing node only moves its own bots"""
+    def weight(node_id: str) -> int:
+        digest = hashlib.blake2b(f'{node_id}/{bot_id}'.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'big')
+
+    return max(nodes, key=weight) if nodes else None
+
+
+class GatewayCluster:
+    """
+    Ownership rules, all evaluated on the event loop:
+    - A bot without a live owner belongs to its rendezvous node among the live nodes.
+    - Ownership is sticky: a node joining does not move bots, their owner keeps them while its lease is renewed.
+    - A node owns a bot once it has seen its own lease record echoed by the broker; the last record wins conflicts.
+    - Bots of a dead node are taken over only by a node that has itself been healthy for the whole takeover window,
+      so a broker outage does not make every node take over everything once it is back.
+    """
+
+    def __init__(
+        self,
+        publish: Callable[[str, str, int, bool], Any],
+        dispatch: Callable[..., None],
+        release: Callable[[int], None],
+        resume: Callable[[str, dict], None],
+        on_lost: Callable[[str], None],
+    ):
+        self.enabled = os.getenv('GATEWAY_CLUSTER', 'false').lower() == 'true'
+        self.node_id = os.getenv('GATEWAY_NODE_ID') or f'{socket.gethostname()}-{os.getpid()}'
+        self.heartbeat_interval = float(os.getenv('CLUSTER_HEARTBEAT_INTERVAL', '2'))
+        self.lease_ttl = float(os.getenv('CLUSTER_LEASE_TTL', '6'))
+        # 'shared': all nodes drive the same Docker daemon, so a new owner adopts running containers.
+        # 'node': every node has its own Docker host, so a handover moves the bot and losers stop their copy.
+        self.docker_scope = os.getenv('CLUSTER_DOCKER_SCOPE', 'shared')
+        self.publish = publish
+        # Hands buffered commands (which hold an in-flight slot) to the bot's actor
+        self.dispatch = dispatch
+        self.release = release
+        # Restarts a running bot taken over from a dead node
+        self.resume = resume
+        self.on_lost = on_lost
+
+        # node_id -> monotonic time of its last heartbeat
+        self.members: Dict[str, float] = {}
+        # bot_id -> last lease record seen on the broker
+        self.records: Dict[str, dict] = {}
+        self.owned: set = set()
+        # Commands for bots being acquired: bot_id -> [(command, payload, received_at)]
+        self.pending: Dict[str, List[Tuple[str, dict, float]]] = {}
+        self.acquiring: Dict[str, float] = {}
+        self.healthy_since: Optional[float] = None
+        self.last_echo: Optional[float] = None
+        self.started_at = time.time()
+        self.task: Optional[asyncio.Task] = None
+        self.takeovers = 0
+
+    @property
+    def takeover_after(self) -> float:
+        return self.lease_ttl + self.heartbeat_interval
+
+    def node_topic(self, node_id: Optional[str] = None) -> str:
+        return f'{NODE_TOPIC}/{node_id or self.node_id}'
+
+    def heartbeat_payload(self) -> str:
+        return json.dumps({
+            'node_id': self.node_id,
+            'timestamp': time.time(),
+            'started_at': self.started_at,
+            'bots': len(self.owned),
+        })
+
+    def is_live(self, node_id: str, now: Optional[float] = None) -> bool:
+        last_seen = self.members.get(node_id)
+        return last_seen is not None and (now or time.monotonic()) - last_seen <= self.lease_ttl
+
+    def live_members(self) -> List[str]:
+        now = time.monotonic()
+        return sorted(node_id for node_id in self.members if self.is_live(node_id, now))
+
+    @property
+    def healthy(self) -> bool:
+        """Our own lease is renewed: the broker echoed our last heartbeat recently"""
+        return self.last_echo is not None and time.monotonic() - self.last_echo <= self.lease_ttl
+
+    def can_take_over(self) -> bool:
+        return self.healthy and self.healthy_since is not None and time.monotonic() - self.healthy_since >= self.takeover_after
+
+    def owns(self, bot_id: str) -> bool:
+        """Checked for every metrics message, so it stays a set lookup"""
+        return not self.enabled or bot_id in self.owned
+
+    def holder(self, bot_id: str) -> Optional[str]:
+        record = self.records.get(bot_id)
+        return record.get('node') if record else None
+
+    def on_message(self, topic: str, payload: bytes):
+        """Cluster traffic, handled inline by the inbound reader; it never waits for a command slot"""
+        parts = topic.split('/')
+        if len(parts) != 3:
+            return
+        if parts[1] == 'nodes':
+            self.on_heartbeat(parts[2], payload)
+        elif parts[1] == 'bots':
+            self.on_record(parts[2], json.loads(payload) if payload else None)
+
+    def on_heartbeat(self, node_id: str, payload: bytes):
+        now = time.monotonic()
+        if not payload:
+            # Left the cluster (graceful stop or its last will)
+            self.members.pop(node_id, None)
+            return
+        heartbeat = json.loads(payload)
+        # Retained heartbeats of dead nodes arrive on subscribe; age them by their wall clock timestamp
+        age = max(0.0, time.time() - heartbeat.get('timestamp', 0))
+        self.members[node_id] = now - age
+        if node_id == self.node_id and age <= self.lease_ttl:
+            if not self.healthy:
+                self.healthy_since = now
+                print(f'Gateway Cluster: Node {self.node_id} lease is live', flush=True)
+            self.last_echo = now
+
+    def on_record(self, bot_id: str, record: Optional[dict]):
+        if record is None:
+            self.records.pop(bot_id, None)
+            return
+        self.records[bot_id] = record
+        node_id = record.get('node')
+        if node_id == self.node_id and bot_id in self.acquiring:
+            # Our record made it through the broker: the bot is ours
+            del self.acquiring[bot_id]
+            self.owned.add(bot_id)
+            if record.get('takeover') and record.get('desired') == 'running':
+                self.takeovers += 1
+                self.resume(bot_id, record)
+            for command, payload, received_at in self.pending.pop(bot_id, []):
+                self.dispatch(bot_id, command, payload, received_at)
+        elif node_id != self.node_id and (bot_id in self.owned or bot_id in self.acquiring):
+            # Someone else's record came last, so it wins
+            print(f'Gateway Cluster: Bot {bot_id} is now owned by {node_id}, yielding', flush=True)
+            self.drop(bot_id)
+            self.on_lost(bot_id)
+
+    def drop(self, bot_id: str):
+        self.owned.discard(bot_id)
+        self.acquiring.pop(bot_id, None)
+        dropped = self.pending.pop(bot_id, [])
+        if dropped:
+            self.release(len(dropped))
+
+    def acquire(self, bot_id: str, takeover: bool = False):
+        """Publish our lease record; ownership starts once the broker echoes it back"""
+        if bot_id in self.acquiring:
+            return
+        record = self.records.get(bot_id) or {}
+        self.acquiring[bot_id] = time.monotonic()
+        self.publish_record(bot_id, {
+            **record,
+            'node': self.node_id,
+            'term': record.get('term', 0) + 1,
+            'takeover': takeover,
+            'previous': record.get('node'),
+        })
+
+    def publish_record(self, bot_id: str, record: dict):
+        return self.publish(f'{BOT_TOPIC}/{bot_id}', json.dumps(record), 1, True)
+
+    def update_record(self, bot_id: str, desired: Optional[str] = None, document: Optional[dict] = None):
+        """Keep the desired state of an owned bot on the broker, so a successor can restart it"""
+        if not self.enabled or bot_id not in self.owned:
+            return
+        record = dict(self.records.get(bot_id) or {'node': self.node_id, 'term': 1})
+        record['takeover'] = False
+        if desired is not None:
+            record['desired'] = desired
+        if document is not None:
+            record['document'] = document
+        self.records[bot_id] = record
+        self.publish_record(bot_id, record)
+
+    def route(self, bot_id: str, command: str, payload: dict, received_at: float) -> str:
+        """'own' to handle the command here, 'foreign' when another node does, 'pending' while acquiring"""
+        if not self.enabled or bot_id in self.owned:
+            return 'own'
+        holder = self.holder(bot_id)
+        live = self.live_members()
+        if holder is not None and holder != self.node_id and holder in live:
+            return 'foreign'
+        if not self.healthy:
+            # Without our own lease we can't tell who owns what yet
+            self.pending.setdefault(bot_id, []).append((command, payload, received_at))
+            return 'pending'
+        if holder is not None and holder != self.node_id and not self.can_take_over():
+            self.pending.setdefault(bot_id, []).append((command, payload, received_at))
+            return 'pending'
+        if holder != self.node_id and rendezvous_owner(bot_id, live) != self.node_id:
+            return 'foreign'
+        self.pending.setdefault(bot_id, []).append((command, payload, received_at))
+        # A bot with a record has run before: resume it if it was running, before the buffered commands
+        self.acquire(bot_id, takeover=bot_id in self.records)
+        return 'pending'
+
+    def rebalance(self):
+        """Take over the running bots of dead nodes and settle commands buffered while we were unsure"""
+        live = self.live_members()
+        now = time.monotonic()
+        for bot_id, started in list(self.acquiring.items()):
+            if now - started > self.lease_ttl:
+                # The echo never came (lost publish); try again
+                del self.acquiring[bot_id]
+        if not self.healthy:
+            return
+        for bot_id, record in list(self.records.items()):
+            if bot_id in self.owned or bot_id in self.acquiring:
+                continue
+            holder = record.get('node')
+            if holder == self.node_id:
+                # Restarted under the same node id: resume our own bots right away
+                self.acquire(bot_id, takeover=True)
+                continue
+            if record.get('desired') != 'running' or (holder is not None and holder in live):
+                continue
+            if self.can_take_over() and rendezvous_owner(bot_id, live) == self.node_id:
+                print(f'Gateway Cluster: Taking over bot {bot_id} from {holder or "nobody"}', flush=True)
+                self.acquire(bot_id, takeover=True)
+        for bot_id in list(self.pending):
+            if bot_id in self.acquiring or bot_id in self.owned:
+                continue
+            commands = self.pending.pop(bot_id)
+            for command, payload, received_at in commands:
+                if self.route(bot_id, command, payload, received_at) == 'foreign':
+                    self.release(1)
+                elif bot_id in self.owned:
+                    self.dispatch(bot_id, command, payload, received_at)
+
+    async def run(self):
+        while True:
+            try:
+                self.publish(self.node_topic(), self.heartbeat_payload(), 1, True)
+                self.rebalance()
+            except Exception as e:
+                print(f'Gateway Cluster: Heartbeat failed: {e}', flush=True)
+            await asyncio.sleep(self.heartbeat_interval)
+
+    def start(self):
+        if self.enabled:
+            print(f'Gateway Cluster: Node {self.node_id} joining (lease {self.lease_ttl:g}s, docker scope {self.docker_scope})', flush=True)
+            self.task = asyncio.get_running_loop().create_task(self.run())
+
+    async def leave(self, stop_bot: Callable[[str], 'asyncio.Future']):
+        """Hand owned bots over and clear our lease, so peers take over without waiting for it to expire"""
+        if not self.enabled:
+            return
+        if self.task:
+            self.task.cancel()
+        published = []
+        for bot_id in sorted(self.owned):
+            record = dict(self.records.get(bot_id) or {})
+            if self.docker_scope == 'node' and record.get('desired') == 'running':
+                # The successor starts it on its own host
+                try:
+                    await stop_bot(bot_id)
+                except Exception as e:
+                    print(f'Gateway Cluster: Could not stop bot {bot_id} before handover: {e}', flush=True)
+            record.update({'node': None, 'takeover': False, 'previous': self.node_id})
+            published.append(self.publish_record(bot_id, record))
+        self.owned.clear()
+        published.append(self.publish(self.node_topic(), '', 1, True))
+        # Make sure the handover reached the broker before the connection goes away
+        futures = [future for future in published if isinstance(future, asyncio.Future)]
+        if futures:
+            await asyncio.wait(futures, timeout=5)
+        print(f'Gateway Cluster: Node {self.node_id} left, handed over {len(published) - 1} bot(s)', flush=True)
+
+    def metrics(self) -> dict:
+        return {
+            'node_id': self.node_id,
+            'enabled': self.enabled,
+            'healthy': self.healthy,
+            'members': self.live_members(),
+            'owned': len(self.owned),
+            'acquiring': len(self.acquiring),
+            'pending': sum(len(commands) for commands in self.pending.values()),
+            'known_bots': len(self.records),
+            'takeovers': self.takeovers,
+        }
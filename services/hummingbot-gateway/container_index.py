@@ -0,0 +1,244 @@
+"""
+Container State Index for Hummingbot Gateway
+Keeps an in-memory view of bot, backtest and warm pool containers, driven by the Docker events stream
+"""
+
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+BOT_IMAGE = 'janym-hummingbot'
+
+BOT_PREFIX = 'hummingbot_'
+BACKTEST_PREFIX = 'backtest_'
+POOL_PREFIX = 'hbpool_'
+# Containers hosting several packed V2 bots; their index entries carry the pack id as bot_id
+PACK_PREFIX = 'hbpack_'
+
+# Memory limit in bytes, stamped on every container the gateway creates for host admission
+MEMORY_LABEL = 'io.janym.memory'
+
+# Listener signature: (state, status, metadata)
+StatusListener = Callable[['ContainerState', str, dict], None]
+
+
+@dataclass
+class ContainerState:
+    id: str
+    name: str
+    kind: str
+    bot_id: str
+    status: str
+    started_at: Optional[float] = None
+    exit_code: Optional[int] = None
+    restart_count: int = 0
+    oom_killed: bool = False
+    memory: int = 0
+    updated_at: float = field(default_factory=time.time)
+    restarts: Deque[float] = field(default_factory=deque, repr=False)
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'name': self.name,
+            'kind': self.kind,
+            'bot_id': self.bot_id,
+            'status': self.status,
+            'started_at': self.started_at,
+            'exit_code': self.exit_code,
+            'restart_count': self.restart_count,
+            'oom_killed': self.oom_killed,
+            'memory': self.memory,
+            'updated_at': self.updated_at,
+        }
+
+
+def classify_container(name: str) -> Optional[Tuple[str, str]]:
+    """Return (kind, bot_id) for containers managed by the gateway, None otherwise"""
+    name = name.lstrip('/')
+    if name.startswith(BOT_PREFIX):
+        return 'bot', name[len(BOT_PREFIX):]
+    if name.startswith(BACKTEST_PREFIX):
+        # backtest_{bot_id}_{timestamp}
+        return 'backtest', name[len(BACKTEST_PREFIX):].rsplit('_', 1)[0]
+    if name.startswith(PACK_PREFIX):
+        return 'pack', name[len(PACK_PREFIX):]
+    if name.startswith(POOL_PREFIX):
+        # Warm pool containers have no bot assigned yet
+        return 'pool', ''
+    return None
+
+
+def parse_memory_label(labels: dict) -> int:
+    try:
+        return int((labels or {}).get(MEMORY_LABEL, 0))
+    except ValueError:
+        return 0
+
+
+def parse_exit_code(status_text: str) -> Optional[int]:
+    """Extract the exit code from a summary status such as 'Exited (137) 5 minutes ago'"""
+    if not status_text.startswith('Exited ('):
+        return None
+    try:
+        return int(status_text[len('Exited ('):status_text.index(')')])
+    except ValueError:
+        return None
+
+
+class ContainerIndex:
+    def __init__(self):
+        self.by_name: Dict[str, ContainerState] = {}
+        self.by_id: Dict[str, ContainerState] = {}
+        self.listeners: List[StatusListener] = []
+        self.expected_stops: set = set()
+        self.is_live = False
+        self.crash_loop_restarts = int(os.getenv('CRASH_LOOP_RESTARTS', '3'))
+        self.crash_loop_window = float(os.getenv('CRASH_LOOP_WINDOW', '300'))
+
+    def add_listener(self, listener: StatusListener):
+        self.listeners.append(listener)
+
+    def get(self, name: str) -> Optional[ContainerState]:
+        return self.by_name.get(name)
+
+    def expect_stop(self, name: str):
+        """Mark the next exit of a container as requested by the gateway rather than a crash"""
+        self.expected_stops.add(name)
+
+    def seed(self, summaries: List[dict]):
+        """Replace the index with a snapshot from the low-level containers list"""
+        self.by_name.clear()
+        self.by_id.clear()
+        for summary in summaries:
+            name = (summary.get('Names') or [''])[0].lstrip('/')
+            classified = classify_container(name)
+            if not classified:
+                continue
+            kind, bot_id = classified
+            state = ContainerState(
+                id=summary['Id'],
+                name=name,
+                kind=kind,
+                bot_id=bot_id,
+                status=summary.get('State', 'unknown'),
+                exit_code=parse_exit_code(summary.get('Status', '')),
+                memory=parse_memory_label(summary.get('Labels')),
+            )
+            self.by_name[name] = state
+            self.by_id[state.id] = state
+
+    def apply_event(self, event: dict):
+        """Apply a Docker container event and notify listeners of status transitions"""
+        if event.get('Type') != 'container':
+            return
+        actor = event.get('Actor') or {}
+        attributes = actor.get('Attributes') or {}
+        container_id = actor.get('ID') or event.get('id')
+        name = attributes.get('name', '')
+        action = (event.get('Action') or event.get('status') or '').split(':')[0]
+        classified = classify_container(name)
+        if not container_id or not classified:
+            return
+        kind, bot_id = classified
+        timestamp = event.get('timeNano', 0) / 1e9 or event.get('time') or time.time()
+
+        state = self.by_id.get(container_id)
+        if state is not None and state.name != name:
+            # Renamed, e.g. a warm pool container claimed by a bot
+            if self.by_name.get(state.name) is state:
+                del self.by_name[state.name]
+            state.name, state.kind, state.bot_id = name, kind, bot_id
+            self.by_name[name] = state
+        if state is None:
+            if action == 'destroy':
+                return
+            # A new container may reuse the name of a previous one
+            previous = self.by_name.pop(name, None)
+            if previous is not None:
+                self.by_id.pop(previous.id, None)
+            # Event attributes carry the container's labels
+            state = ContainerState(
+                id=container_id, name=name, kind=kind, bot_id=bot_id, status='created',
+                memory=parse_memory_label(attributes),
+            )
+            self.by_name[name] = state
+            self.by_id[container_id] = state
+        state.updated_at = timestamp
+
+        if action == 'start':
+            if state.exit_code is not None and name not in self.expected_stops:
+                # Started again after dying: the restart policy brought it back
+                self.record_restart(state, timestamp)
+            state.status = 'running'
+            state.started_at = timestamp
+            state.exit_code = None
+            state.oom_killed = False
+            self.expected_stops.discard(name)
+            if self.is_crash_looping(state):
+                self.notify(state, 'crash_loop', {'restart_count': state.restart_count})
+            else:
+                self.notify(state, 'running', {})
+        elif action == 'oom':
+            state.oom_killed = True
+        elif action == 'die':
+            state.status = 'exited'
+            state.exit_code = int(attributes.get('exitCode', '0') or 0)
+            if name in self.expected_stops:
+                self.notify(state, 'stopped', {'exit_code': state.exit_code})
+            elif state.oom_killed:
+                self.notify(state, 'error', {'error': 'Container was OOM killed', 'exit_code': state.exit_code, 'reason': 'oom_killed'})
+            elif state.exit_code != 0:
+                self.notify(state, 'error', {'error': f'Container exited with code {state.exit_code}', 'exit_code': state.exit_code})
+            else:
+                self.notify(state, 'stopped', {'exit_code': state.exit_code})
+        elif action == 'restart':
+            self.record_restart(state, timestamp)
+        elif action == 'pause':
+            state.status = 'paused'
+        elif action == 'unpause':
+            state.status = 'running'
+        elif action == 'destroy':
+            self.by_id.pop(container_id, None)
+            if self.by_name.get(name) is state:
+                del self.by_name[name]
+            self.expected_stops.discard(name)
+
+    def record_restart(self, state: ContainerState, timestamp: float):
+        state.restart_count += 1
+        state.restarts.append(timestamp)
+        while state.restarts and timestamp - state.restarts[0] > self.crash_loop_window:
+            state.restarts.popleft()
+
+    def is_crash_looping(self, state: ContainerState) -> bool:
+        return len(state.restarts) >= self.crash_loop_restarts
+
+    def notify(self, state: ContainerState, status: str, metadata: dict):
+        for listener in self.listeners:
+            try:
+                listener(state, status, metadata)
+            except Exception as e:
+                print(f'Container Index: Listener error for {state.name}: {e}', flush=True)
+
+    def find(self, kind: str, status: Optional[str] = None) -> List[ContainerState]:
+        return [
+            state for state in self.by_name.values()
+            if state.kind == kind and (status is None or state.status == status)
+        ]
+
+    def query(
+        self,
+        status: Optional[str] = None,
+        kind: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> Tuple[List[dict], int]:
+        """Filter and paginate the index, ordered by container name"""
+        matches = [
+            state for state in self.by_name.values()
+            if (status is None or state.status == status) and (kind is None or state.kind == kind)
+        ]
+        matches.sort(key=lambda state: state.name)
+        return [state.to_dict() for state in matches[offset:offset + limit]], len(matches)
@@ -0,0 +1,167 @@
+"""
+Container Metrics for Hummingbot containers
+Container-scoped resource usage from cgroup v2 accounting plus per-process stats for the Hummingbot process
+"""
+
+import os
+import time
+from typing import Dict, Optional
+
+import psutil
+
+CGROUP_ROOT = '/sys/fs/cgroup'
+
+
+def read_text(path: str) -> Optional[str]:
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip()
+    except (FileNotFoundError, PermissionError, OSError):
+        return None
+
+
+def read_int(path: str) -> Optional[int]:
+    value = read_text(path)
+    if value is None or value == 'max':
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def read_flat_keyed(path: str) -> Dict[str, int]:
+    """Parse cgroup files of 'key value' lines such as cpu.stat and memory.events"""
+    values = {}
+    for line in (read_text(path) or '').splitlines():
+        key, _, value = line.partition(' ')
+        if value.isdigit():
+            values[key] = int(value)
+    return values
+
+
+def read_io_stat(path: str) -> Dict[str, int]:
+    """Sum io.stat over all devices ('8:0 rbytes=1 wbytes=2 rios=3 wios=4 ...')"""
+    totals = {'rbytes': 0, 'wbytes': 0, 'rios': 0, 'wios': 0}
+    for line in (read_text(path) or '').splitlines():
+        for field in line.split()[1:]:
+            key, _, value = field.partition('=')
+            if key in totals and value.isdigit():
+                totals[key] += int(value)
+    return totals
+
+
+class ContainerMetrics:
+    """Samples the container's cgroup and the bot process; rates are computed between consecutive samples"""
+
+    def __init__(self, cgroup_root: str = CGROUP_ROOT):
+        self.cgroup_root = cgroup_root
+        # cgroup v2 exposes cgroup.controllers at the root of the (namespaced) hierarchy
+        self.available = os.path.exists(os.path.join(cgroup_root, 'cgroup.controllers'))
+        self.previous: Optional[dict] = None
+        self.process: Optional[psutil.Process] = None
+        # cpu_percent measures between calls on the same Process object, so children are kept across samples
+        self.children: Dict[int, psutil.Process] = {}
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.cgroup_root, name)
+
+    def cpu_limit(self) -> Optional[float]:
+        """CPU limit in cores from cpu.max ('quota period' or 'max period')"""
+        quota, _, period = (read_text(self.path('cpu.max')) or 'max').partition(' ')
+        if quota == 'max' or not period:
+            return None
+        return int(quota) / int(period)
+
+    def sample_cgroup(self, now: float) -> Optional[dict]:
+        if not self.available:
+            return None
+        cpu = read_flat_keyed(self.path('cpu.stat'))
+        io = read_io_stat(self.path('io.stat'))
+        events = read_flat_keyed(self.path('memory.events'))
+        memory_stat = read_flat_keyed(self.path('memory.stat'))
+        current = {'time': now, 'cpu': cpu, 'io': io}
+        previous, self.previous = self.previous, current
+
+        metrics = {
+            'cpu': {
+                'usage_usec': cpu.get('usage_usec'),
+                'limit_cores': self.cpu_limit(),
+                'nr_periods': cpu.get('nr_periods'),
+                'nr_throttled': cpu.get('nr_throttled'),
+                'throttled_usec': cpu.get('throttled_usec'),
+            },
+            'memory': {
+                'current': read_int(self.path('memory.current')),
+                'peak': read_int(self.path('memory.peak')),
+                'limit': read_int(self.path('memory.max')),
+                'anon': memory_stat.get('anon'),
+                'file': memory_stat.get('file'),
+                'oom': events.get('oom', 0),
+                'oom_kill': events.get('oom_kill', 0),
+            },
+            'io': io,
+        }
+        if metrics['memory']['current'] is not None and metrics['memory']['limit']:
+            metrics['memory']['pct'] = round(100 * metrics['memory']['current'] / metrics['memory']['limit'], 2)
+
+        if previous:
+            elapsed = now - previous['time']
+            if elapsed > 0:
+                usage = cpu.get('usage_usec', 0) - previous['cpu'].get('usage_usec', 0)
+                periods = cpu.get('nr_periods', 0) - previous['cpu'].get('nr_periods', 0)
+                throttled = cpu.get('nr_throttled', 0) - previous['cpu'].get('nr_throttled', 0)
+                # Percent of one core, like `docker stats`
+                metrics['cpu']['pct'] = round(100 * usage / (elapsed * 1_000_000), 2)
+                metrics['cpu']['throttled_pct'] = round(100 * throttled / periods, 2) if periods else 0.0
+                metrics['io']['read_bps'] = round((io['rbytes'] - previous['io']['rbytes']) / elapsed)
+                metrics['io']['write_bps'] = round((io['wbytes'] - previous['io']['wbytes']) / elapsed)
+        return metrics
+
+    def sample_process(self, pid: Optional[int]) -> Optional[dict]:
+        """Stats summed over the bridge's child process tree: the `script` wrapper and Hummingbot under it"""
+        if pid is None:
+            return None
+        try:
+            if self.process is None or self.process.pid != pid:
+                self.process = psutil.Process(pid)
+                self.children = {}
+                # The first cpu_percent call only primes the counter
+                self.process.cpu_percent(None)
+            children = {}
+            for child in self.process.children(recursive=True):
+                children[child.pid] = self.children.get(child.pid) or child
+            self.children = children
+            cpu_pct = 0.0
+            rss = 0
+            threads = 0
+            open_files = 0
+            for process in [self.process, *children.values()]:
+                try:
+                    with process.oneshot():
+                        cpu_pct += process.cpu_percent(None)
+                        rss += process.memory_info().rss
+                        threads += process.num_threads()
+                        open_files += process.num_fds() if hasattr(process, 'num_fds') else 0
+                except psutil.NoSuchProcess:
+                    # A child that exited between listing and sampling
+                    continue
+            return {
+                'cpu_pct': round(cpu_pct, 2),
+                'rss': rss,
+                'threads': threads,
+                'children': len(children),
+                'open_files': open_files if hasattr(self.process, 'num_fds') else None,
+            }
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            self.process = None
+            self.children = {}
+            return None
+
+    def sample(self, pid: Optional[int] = None) -> dict:
+        now = time.monotonic()
+        return {
+            'kind': 'resources',
+            'container': self.sample_cgroup(now),
+            'process': self.sample_process(pid),
+        }
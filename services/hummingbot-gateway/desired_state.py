@@ -0,0 +1,95 @@
+"""
+Desired State Store for Hummingbot Gateway
+Local SQLite record of what each bot was last asked to be, so a restarted gateway can reconcile containers against it
+"""
+
+import json
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bots (
+    bot_id TEXT PRIMARY KEY,
+    desired TEXT NOT NULL,
+    document TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+@dataclass
+class DesiredState:
+    bot_id: str
+    # 'running' or 'stopped'
+    desired: str
+    document: Optional[dict]
+    updated_at: float
+
+
+class DesiredStateStore:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv(
+            'GATEWAY_STATE_DB',
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'gateway_state.db'),
+        )
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        # Only touched from the event loop; WAL without per-commit fsync keeps a write in the tens of microseconds
+        self.db = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.executescript(SCHEMA)
+
+    @property
+    def initialized(self) -> bool:
+        """False until the first reconciliation adopted the containers found on the host"""
+        return self.db.execute("SELECT 1 FROM meta WHERE key = 'initialized'").fetchone() is not None
+
+    def mark_initialized(self):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('initialized', ?)", (str(time.time()),))
+
+    def set(self, bot_id: str, desired: Optional[str] = None, document: Optional[dict] = None):
+        """Record a bot's desired state and/or config document; omitted fields keep their stored value"""
+        current = self.get(bot_id)
+        desired = desired or (current.desired if current else 'stopped')
+        if document is None and current is not None:
+            document = current.document
+        self.db.execute(
+            'INSERT OR REPLACE INTO bots (bot_id, desired, document, updated_at) VALUES (?, ?, ?, ?)',
+            (bot_id, desired, json.dumps(document) if document is not None else None, time.time()),
+        )
+
+    def set_many(self, states: Dict[str, str]):
+        """Adopt {bot_id: desired} in one transaction, keeping stored documents"""
+        now = time.time()
+        with self.db:
+            self.db.execute('BEGIN')
+            self.db.executemany(
+                'INSERT INTO bots (bot_id, desired, document, updated_at) VALUES (?, ?, NULL, ?) '
+                'ON CONFLICT(bot_id) DO UPDATE SET desired = excluded.desired, updated_at = excluded.updated_at',
+                [(bot_id, desired, now) for bot_id, desired in states.items()],
+            )
+
+    def get(self, bot_id: str) -> Optional[DesiredState]:
+        row = self.db.execute('SELECT bot_id, desired, document, updated_at FROM bots WHERE bot_id = ?', (bot_id,)).fetchone()
+        return self.to_state(row) if row else None
+
+    def all(self) -> Dict[str, DesiredState]:
+        rows = self.db.execute('SELECT bot_id, desired, document, updated_at FROM bots').fetchall()
+        return {row[0]: self.to_state(row) for row in rows}
+
+    def delete(self, bot_id: str):
+        self.db.execute('DELETE FROM bots WHERE bot_id = ?', (bot_id,))
+
+    @staticmethod
+    def to_state(row: tuple) -> DesiredState:
+        return DesiredState(bot_id=row[0], desired=row[1], document=json.loads(row[2]) if row[2] else None, updated_at=row[3])
+
+    def close(self):
+        self.db.close()
@@ -3,116 +3,501 @@ Docker Manager for Hummingbot Gateway
 Manages Docker containers for Hummingbot bot instances
 """
 
+import io
+import json
 import os
 import asyncio
-from typing import Optional, List, Dict
+import functools
+import hashlib
+import tarfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, List, Dict, Tuple
 
 import docker
-from docker.models.containers import Container
+
+from bot_config import CONFIG_DOCUMENT_PATH, PACK_MANIFEST_PATH, build_config_document, changed_keys, classify_change
+from container_index import BACKTEST_PREFIX, BOT_IMAGE, BOT_PREFIX, MEMORY_LABEL, PACK_PREFIX, POOL_PREFIX, ContainerIndex
+from payload_codec import PAYLOAD_ENCODING
+from placement import PACK_KEY_LABEL, Pack, PlacementPolicy, pack_key
+from resources import HostAdmission, ResourcePlan, ResourceSizer
+from telemetry import DOCKER_CALL_ERRORS, DOCKER_CALL_LATENCY, DOCKER_CALLS_INFLIGHT, DOCKER_QUEUE_WAIT
+from warm_pool import WarmPool, parse_memory
+
+# Files baked into the bot image; a change in any of them requires a rebuild
+BUILD_CONTEXT_FILES = (
+    'Dockerfile.hummingbot',
+    'mqtt_bridge_client.py',
+    'v2_generic_executor.py',
+    'entrypoint.sh',
+    'market_data_store.py',
+    'log_pipeline.py',
+    'trade_exporter.py',
+    'container_metrics.py',
+    'bot_config.py',
+    'payload_codec.py',
+)
+# Where backtest containers see the shared market data store
+MARKET_DATA_MOUNT = '/market_data'
+CONTEXT_HASH_LABEL = 'io.janym.context-hash'
+# Hash of the config document a container was created with
+CONFIG_HASH_LABEL = 'io.janym.config-hash'
+
+
+def compute_context_hash(path: str) -> str:
+    """Hash the bot image build context so unchanged sources can skip the build"""
+    digest = hashlib.sha256()
+    for name in BUILD_CONTEXT_FILES:
+        digest.update(name.encode())
+        with open(os.path.join(path, name), 'rb') as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
 
 
 class DockerManager:
-    def __init__(self):
+    # Default timeouts (seconds) per Docker operation, overridable via DOCKER_TIMEOUT_<OP>
+    DEFAULT_TIMEOUTS = {
+        'ping': 10,
+        'build': 1800,
+        'get': 15,
+        'list': 30,
+        'run': 120,
+        'remove': 60,
+        'stop': 60,
+        'rename': 15,
+        'put': 30,
+        'update': 15,
+    }
+
+    def __init__(self, metrics_store=None):
         self.client: Optional[docker.DockerClient] = None
-        self.containers: Dict[str, Container] = {}
         self.is_available_flag = False
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # In-memory view of bot/backtest containers, kept current by the Docker events stream
+        self.index = ContainerIndex()
+        self.events_thread: Optional[threading.Thread] = None
+        self.event_stream = None
+        self.is_closing = False
+
+        # Pre-started containers that bots can claim instead of booting from cold
+        self.warm_pool = WarmPool(self)
+        # Config document each bot container currently runs with, filled lazily from the container itself
+        self.bot_configs: Dict[str, dict] = {}
+        # Opt-in packing of small V2 bots into shared containers; packs are recovered from running containers once
+        self.placement = PlacementPolicy()
+        self.packs_loading: Optional[asyncio.Task] = None
+
+        # Memory and CPU per bot from strategy profiles and usage history, within a host memory budget
+        self.sizer = ResourceSizer(metrics_store)
+        self.admission = HostAdmission(self.index)
+
+        # Bot image state; only the very first build on a host blocks container starts
+        self.image_ready = asyncio.Event()
+        self.image_status = {'status': 'unknown', 'context_hash': None}
+        # Context hash of the image containers actually run, which lags image_status during a rebuild
+        self.image_version: Optional[str] = None
+        self.build_task: Optional[asyncio.Task] = None
+        self.startup_timings: Dict[str, float] = {}
+
+        # Blocking docker-py calls run on a bounded pool so they never stall the event loop
+        self.max_concurrency = int(os.getenv('DOCKER_MAX_CONCURRENCY', '32'))
+        self.stop_timeout = int(os.getenv('DOCKER_STOP_TIMEOUT', '30'))
+        self.backtest_cpu_shares = int(os.getenv('BACKTEST_CPU_SHARES', '256'))
+        # Host path of MARKET_DATA_DIR, for bind mounts into sibling containers
+        self.market_data_host_dir = os.getenv('MARKET_DATA_HOST_DIR', os.getenv('MARKET_DATA_DIR'))
+        self.timeouts = {
+            op: float(os.getenv(f'DOCKER_TIMEOUT_{op.upper()}', default))
+            for op, default in self.DEFAULT_TIMEOUTS.items()
+        }
+        # A graceful stop may legitimately take the whole stop grace period
+        self.timeouts['stop'] = max(self.timeouts['stop'], self.stop_timeout + 15)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='docker')
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def _call(self, op: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking Docker SDK call on the executor with a per-operation timeout"""
+        timeout = self.timeouts.get(op, 60)
+        queued_at = time.perf_counter()
+        await self.semaphore.acquire()
+        started = time.perf_counter()
+        DOCKER_QUEUE_WAIT.observe(started - queued_at, op)
+        DOCKER_CALLS_INFLIGHT.inc()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+
+        def release(fut: asyncio.Future):
+            # The slot is only freed once the worker thread is really done, even after a timeout
+            self.semaphore.release()
+            DOCKER_CALLS_INFLIGHT.inc(amount=-1)
+            DOCKER_CALL_LATENCY.observe(time.perf_counter() - started, op)
+            if fut.cancelled() or fut.exception() is not None:
+                DOCKER_CALL_ERRORS.inc(op)
+
+        future.add_done_callback(release)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            DOCKER_CALL_ERRORS.inc(op)
+            raise TimeoutError(f'Docker operation {op} timed out after {timeout}s') from None
 
     async def initialize(self):
         """Initialize Docker client"""
+        self.loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        if os.getenv('DOCKER_BACKEND') == 'fake':
+            # Stand-in daemon for running several gateway nodes on one machine, e.g. cluster and load tests
+            from fake_docker import FakeDockerClient
+
+            self.client = FakeDockerClient()
+            self.is_available_flag = True
+            print('Docker Manager: Using the in-memory stand-in Docker backend', flush=True)
+        else:
+            await self.connect()
+        self.startup_timings['docker_connect'] = time.monotonic() - started
+
+        if self.is_available_flag:
+            try:
+                info = await self._call('get', self.client.info)
+                self.admission.configure_host(info.get('MemTotal', 0))
+            except Exception as e:
+                print(f'Docker Manager: Could not read host memory, admission needs HOST_MEMORY_BUDGET: {e}', flush=True)
+            self.start_event_watcher()
+            await self.ensure_bot_image()
+            self.warm_pool.start()
+
+    async def connect(self):
+        """Connect to the local Docker daemon"""
         try:
             # Try Unix socket first (default for Linux)
-            self.client = docker.from_env()
+            self.client = await self._call('ping', docker.from_env, max_pool_size=self.max_concurrency)
             # Explicitly test the connection
-            self.client.ping()
+            await self._call('ping', self.client.ping)
             self.is_available_flag = True
             print('Docker Manager: Initialized successfully via from_env()')
         except Exception as e:
             print(f'Docker Manager: from_env() failed, trying explicit socket: {e}', flush=True)
             try:
-                self.client = docker.DockerClient(base_url='unix://var/run/docker.sock')
-                self.client.ping()
+                self.client = docker.DockerClient(
+                    base_url='unix://var/run/docker.sock',
+                    max_pool_size=self.max_concurrency,
+                )
+                await self._call('ping', self.client.ping)
                 self.is_available_flag = True
                 print('Docker Manager: Initialized successfully via unix://var/run/docker.sock', flush=True)
             except Exception as e2:
                 print(f'Docker Manager: Explicit socket failed: {e2}', flush=True)
                 self.is_available_flag = False
-        
-        if self.is_available_flag:
-            await self.build_bot_image()
 
-    async def build_bot_image(self):
+    async def ensure_bot_image(self):
+        """Skip the bot image build when the context is unchanged, otherwise rebuild in the background"""
+        started = time.monotonic()
+        path = os.path.dirname(os.path.abspath(__file__))
+        context_hash = compute_context_hash(path)
+        try:
+            image = await self._call('get', self.client.images.get, BOT_IMAGE)
+            current_hash = (image.labels or {}).get(CONTEXT_HASH_LABEL)
+        except docker.errors.ImageNotFound:
+            image, current_hash = None, None
+        self.startup_timings['image_check'] = time.monotonic() - started
+        self.image_version = current_hash
+
+        if current_hash == context_hash:
+            print(f'Docker Manager: Image {BOT_IMAGE} is up to date ({context_hash[:12]}), skipping build', flush=True)
+            self.image_status = {'status': 'current', 'context_hash': context_hash}
+            self.image_ready.set()
+            return
+
+        if image is not None:
+            # The tag only moves once the new build succeeds, so keep using the previous image until then
+            print(f'Docker Manager: Image {BOT_IMAGE} is outdated, rebuilding in the background', flush=True)
+            self.image_ready.set()
+        self.image_status = {'status': 'building', 'context_hash': context_hash}
+        self.build_task = asyncio.get_running_loop().create_task(self.build_bot_image(context_hash))
+
+    async def build_bot_image(self, context_hash: str):
         """Build the custom Hummingbot image with Janym specific tools"""
-        print('Docker Manager: Building custom bot image (janym-hummingbot)...', flush=True)
+        print(f'Docker Manager: Building custom bot image ({BOT_IMAGE})...', flush=True)
+        started = time.monotonic()
         try:
             # We use the same directory as the gateway for context
             path = os.path.dirname(os.path.abspath(__file__))
-            image, logs = self.client.images.build(
+            image, logs = await self._call(
+                'build',
+                self.client.images.build,
                 path=path,
                 dockerfile='Dockerfile.hummingbot',
-                tag='janym-hummingbot',
+                tag=BOT_IMAGE,
+                labels={CONTEXT_HASH_LABEL: context_hash},
                 rm=True
             )
             for line in logs:
                 if 'stream' in line:
                     print(f"Docker Build: {line['stream'].strip()}", flush=True)
-            print('Docker Manager: Custom bot image janym-hummingbot built successfully', flush=True)
+            self.image_status = {'status': 'built', 'context_hash': context_hash}
+            self.image_version = context_hash
+            print(f'Docker Manager: Custom bot image {BOT_IMAGE} built successfully', flush=True)
         except Exception as e:
+            self.image_status = {'status': 'failed', 'context_hash': context_hash, 'error': str(e)}
             print(f'Docker Manager: Failed to build custom bot image: {e}', flush=True)
+        finally:
+            self.startup_timings['image_build'] = time.monotonic() - started
+            self.image_ready.set()
+
+    async def wait_for_image(self):
+        """Wait for a usable bot image; only blocks while the first build on this host runs"""
+        if not self.image_ready.is_set():
+            print(f'Docker Manager: Waiting for the first {BOT_IMAGE} build to finish...', flush=True)
+            await asyncio.wait_for(self.image_ready.wait(), self.timeouts['build'])
+
+    def start_event_watcher(self):
+        """Follow Docker container events on a dedicated thread to keep the index current"""
+        self.events_thread = threading.Thread(target=self.watch_events, name='docker-events', daemon=True)
+        self.events_thread.start()
+
+    def watch_events(self):
+        """Seed the index, then stream events into it; reseeds after every reconnect"""
+        while not self.is_closing:
+            try:
+                since = int(time.time())
+                summaries = self.client.api.containers(all=True, filters={'name': [BOT_PREFIX, BACKTEST_PREFIX, POOL_PREFIX, PACK_PREFIX]})
+                self.loop.call_soon_threadsafe(self.index.seed, summaries)
+                self.event_stream = self.client.events(decode=True, since=since, filters={'type': 'container'})
+                self.loop.call_soon_threadsafe(setattr, self.index, 'is_live', True)
+                print(f'Docker Manager: Watching container events ({len(summaries)} containers indexed)', flush=True)
+                for event in self.event_stream:
+                    self.loop.call_soon_threadsafe(self.index.apply_event, event)
+            except Exception as e:
+                if not self.is_closing:
+                    print(f'Docker Manager: Event stream interrupted: {e}', flush=True)
+            if self.is_closing:
+                break
+            self.loop.call_soon_threadsafe(setattr, self.index, 'is_live', False)
+            time.sleep(2)
 
     async def start_bot(self, bot_id: str, config: dict):
         """Start a Hummingbot container for a bot"""
         print(f'Docker Manager: Starting bot {bot_id} with config: {config}', flush=True)
         if not self.client:
             raise RuntimeError('Docker client not initialized')
+        await self.wait_for_image()
 
         container_name = f'hummingbot_{bot_id}'
         print(f'Docker Manager: Target container name: {container_name}', flush=True)
 
-        # Check if container already exists
+        # Check if container already exists, answering from the index when it is live
         try:
-            existing = self.client.containers.get(container_name)
-            if existing.status == 'running':
+            existing = await self.find_container(container_name)
+            if existing is None:
+                pass
+            elif existing[1] == 'running':
                 print(f'Docker Manager: Container {container_name} already running', flush=True)
                 return
             else:
-                print(f'Docker Manager: Container {container_name} exists with status {existing.status}. Removing it before recreation...', flush=True)
-                existing.remove(force=True)
+                print(f'Docker Manager: Container {container_name} exists with status {existing[1]}. Removing it before recreation...', flush=True)
+                await self._call('remove', self.client.api.remove_container, existing[0], force=True)
         except docker.errors.NotFound:
             pass
         except Exception as e:
             print(f'Docker Manager: Warning while checking existing container: {e}', flush=True)
 
+        document = build_config_document(bot_id, config)
+
+        key = pack_key(document['config']) if self.placement.enabled else None
+        if key is not None:
+            await self.start_packed(bot_id, document, key)
+            return
+        await self.load_packs()
+        if self.placement.pack_of(bot_id):
+            # No longer eligible for packing, e.g. marked dedicated: move it out into its own container
+            await self.stop_packed(bot_id)
+
+        plan = self.sizer.plan(bot_id, document['config'])
+        print(f'Docker Manager: Resource plan for bot {bot_id}: {plan.to_dict()}', flush=True)
+
+        # Prefer a warm container when its memory limit covers the plan; otherwise start cold
+        if plan.memory <= parse_memory(self.warm_pool.mem_limit):
+            container_id = await self.warm_pool.claim(bot_id, document)
+            if container_id:
+                self.bot_configs[bot_id] = document
+                await self.apply_cpu_plan(container_id, plan)
+                return
+
+        # Queues (or rejects) the start while the host's committed memory is at its budget
+        await self.admission.admit(bot_id, container_name, plan.memory)
+
         # Create new container
         try:
-            print(f'Docker Manager: Creating new container {container_name} from image janym-hummingbot...', flush=True)
-            container = self.client.containers.run(
-                'janym-hummingbot',  # Use our custom image
+            print(f'Docker Manager: Creating new container {container_name} from image {BOT_IMAGE}...', flush=True)
+            container = await self.create_with_config(
+                document,
                 name=container_name,
-                detach=True,
                 environment={
                     'BOT_ID': bot_id,
                     'MQTT_BROKER': os.getenv('MQTT_BROKER_URL', 'emqx'),
                     'MQTT_PORT': os.getenv('MQTT_PORT', '1883'),
-                    **{f'CONFIG_{k.upper()}': str(v) for k, v in config.items()},
+                    'MQTT_PAYLOAD_ENCODING': PAYLOAD_ENCODING,
                 },
                 network_mode='janym-network',
                 restart_policy={'Name': 'unless-stopped'},
-                mem_limit='2g',
+                **plan.container_kwargs(),
             )
-            self.containers[bot_id] = container
+            self.bot_configs[bot_id] = document
             print(f'Docker Manager: Created and started container {container_name} (ID: {container.id})', flush=True)
         except Exception as e:
+            self.admission.release(container_name)
             print(f'Docker Manager: Error creating container {container_name}: {e}', flush=True)
             raise
 
-    async def run_backtest(self, bot_id: str, config: dict, start_date: str, end_date: str):
-        """Run a backtest in a temporary container"""
+    async def apply_cpu_plan(self, container_id: str, plan: ResourcePlan):
+        """Give a claimed warm container the CPU weight of its bot; it keeps the pool's memory limit"""
+        quota = {'cpu_period': 100000, 'cpu_quota': int(plan.cpus * 100000)} if plan.cpus else {}
+        try:
+            await self._call('update', self.client.api.update_container, container_id, cpu_shares=plan.cpu_shares, **quota)
+        except Exception as e:
+            print(f'Docker Manager: Could not update CPU limits of {container_id[:12]}: {e}', flush=True)
+
+    async def create_with_config(self, document: dict, labels: Optional[dict] = None, **kwargs):
+        """Create a container, deliver its config document, then start it"""
+        return await self.create_with_files(
+            {CONFIG_DOCUMENT_PATH: json.dumps(document).encode()},
+            labels={CONFIG_HASH_LABEL: document['hash'], **(labels or {})},
+            **kwargs,
+        )
+
+    async def create_with_files(self, files: Dict[str, bytes], labels: Optional[dict] = None, **kwargs):
+        """Create a container, write files into it, then start it"""
+        labels = dict(labels or {})
+        if kwargs.get('mem_limit'):
+            labels[MEMORY_LABEL] = str(parse_memory(str(kwargs['mem_limit'])))
+        container = await self._call('run', self.client.containers.create, BOT_IMAGE, labels=labels, **kwargs)
+        try:
+            for path, data in files.items():
+                await self.put_file(container.id, path, data)
+            await self._call('run', container.start)
+        except Exception:
+            await self._call('remove', self.client.api.remove_container, container.id, force=True)
+            raise
+        return container
+
+    async def load_packs(self):
+        """Recover pack placements from running pack containers, once per gateway process"""
+        if not self.placement.enabled:
+            return
+        if self.packs_loading is None:
+            self.packs_loading = asyncio.get_running_loop().create_task(self.read_pack_manifests())
+        await asyncio.shield(self.packs_loading)
+
+    async def read_pack_manifests(self):
+        summaries = await self._call('list', self.client.api.containers, all=True, filters={'name': [PACK_PREFIX]})
+        for summary in summaries:
+            if summary.get('State') != 'running':
+                continue
+            try:
+                manifest = json.loads(await self.get_file(summary['Id'], PACK_MANIFEST_PATH))
+            except Exception as e:
+                print(f'Docker Manager: Could not read pack manifest of {summary["Id"][:12]}: {e}', flush=True)
+                continue
+            self.placement.restore(summary['Id'], manifest)
+            self.bot_configs.update(manifest.get('bots', {}))
+        print(f'Docker Manager: Recovered {len(self.placement.packs)} bot pack(s)', flush=True)
+
+    async def start_packed(self, bot_id: str, document: dict, key: str):
+        """Run a bot as a controller group inside a shared pack container"""
+        await self.load_packs()
+        pack = self.placement.pack_of(bot_id)
+        if pack is not None and pack.key != key:
+            # Different account or connectors now: it has to move to another pack
+            await self.stop_packed(bot_id)
+            pack = None
+        if pack is None:
+            pack = self.placement.place(bot_id, key)
+        pack.bots[bot_id] = document
+        self.bot_configs[bot_id] = document
+        try:
+            await self.write_pack(pack, bot_id)
+        except Exception as e:
+            print(f'Docker Manager: Error placing bot {bot_id} in pack {pack.pack_id}: {e}', flush=True)
+            self.placement.release(bot_id)
+            self.bot_configs.pop(bot_id, None)
+            if not pack.bots:
+                self.placement.forget(pack)
+            raise
+        print(f'Docker Manager: Bot {bot_id} runs in pack {pack.pack_id} ({len(pack.bots)}/{self.placement.capacity} bots)', flush=True)
+
+    async def write_pack(self, pack: Pack, bot_id: Optional[str] = None):
+        """Deliver a pack's manifest, creating its container on the first write; the in-container bridge applies the diff"""
+        async with pack.lock:
+            if pack.container_id is not None:
+                await self.put_file(pack.container_id, PACK_MANIFEST_PATH, json.dumps(pack.manifest()).encode())
+                return
+            name = f'{PACK_PREFIX}{pack.pack_id}'
+            await self.admission.admit(bot_id or f'pack_{pack.pack_id}', name, parse_memory(self.placement.mem_limit))
+            try:
+                # Manifest taken after admission, so bots placed while the start was queued are included
+                container = await self.create_with_files(
+                    {PACK_MANIFEST_PATH: json.dumps(pack.manifest()).encode()},
+                    name=name,
+                    labels={PACK_KEY_LABEL: pack.key},
+                    environment={
+                        'BOT_ID': f'pack_{pack.pack_id}',
+                        'PACK_ID': pack.pack_id,
+                        'MQTT_BROKER': os.getenv('MQTT_BROKER_URL', 'emqx'),
+                        'MQTT_PORT': os.getenv('MQTT_PORT', '1883'),
+                        'MQTT_PAYLOAD_ENCODING': PAYLOAD_ENCODING,
+                    },
+                    network_mode='janym-network',
+                    restart_policy={'Name': 'unless-stopped'},
+                    mem_limit=self.placement.mem_limit,
+                    cpu_shares=self.placement.cpu_shares,
+                )
+            except Exception:
+                self.admission.release(name)
+                raise
+            pack.container_id = container.id
+            print(f'Docker Manager: Created pack container {name} (ID: {container.id})', flush=True)
+
+    async def stop_packed(self, bot_id: str):
+        """Remove a bot from its pack; the last bot out stops and removes the pack container"""
+        pack = self.placement.release(bot_id)
+        self.bot_configs.pop(bot_id, None)
+        if pack is None:
+            return
+        if pack.bots:
+            await self.write_pack(pack)
+            print(f'Docker Manager: Removed bot {bot_id} from pack {pack.pack_id}', flush=True)
+            return
+        # Forget the empty pack before awaiting anything, so no new bot is placed into a container being removed
+        self.placement.forget(pack)
+        async with pack.lock:
+            if pack.container_id is None:
+                return
+            name = f'{PACK_PREFIX}{pack.pack_id}'
+            self.index.expect_stop(name)
+            await self._call('stop', self.client.api.stop, pack.container_id, timeout=self.stop_timeout)
+            await self._call('remove', self.client.api.remove_container, pack.container_id, force=True)
+            print(f'Docker Manager: Removed empty pack container {name}', flush=True)
+
+    async def run_backtest(
+        self,
+        bot_id: str,
+        config: dict,
+        start_date: str,
+        end_date: str,
+        container_name: Optional[str] = None,
+        cpus: Optional[float] = None,
+        mem_limit: str = '2g',
+        auto_remove: bool = True,
+    ):
+        """Run a backtest in a temporary container, at lower CPU priority than live bots"""
         print(f'Docker Manager: Running backtest for bot {bot_id} from {start_date} to {end_date}', flush=True)
         if not self.client:
             raise RuntimeError('Docker client not initialized')
+        await self.wait_for_image()
+
+        container_name = container_name or f'backtest_{bot_id}_{int(asyncio.get_event_loop().time())}'
 
-        container_name = f'backtest_{bot_id}_{int(asyncio.get_event_loop().time())}'
-        
         # Merge backtest params into config for the bridge client
         bt_config = {
             **config,
@@ -121,20 +506,31 @@ class DockerManager:
             'backtest_end': end_date
         }
 
+        environment = {
+            'BOT_ID': f'BT_{bot_id}',
+            'MQTT_BROKER': os.getenv('MQTT_BROKER_URL', 'emqx'),
+            'MQTT_PORT': os.getenv('MQTT_PORT', '1883'),
+            'MQTT_PAYLOAD_ENCODING': PAYLOAD_ENCODING,
+        }
+        volumes = {}
+        if self.market_data_host_dir:
+            environment['MARKET_DATA_DIR'] = MARKET_DATA_MOUNT
+            volumes[self.market_data_host_dir] = {'bind': MARKET_DATA_MOUNT, 'mode': 'ro'}
+
         try:
-            container = self.client.containers.run(
-                'janym-hummingbot',
+            container = await self.create_with_config(
+                build_config_document(f'BT_{bot_id}', bt_config),
                 name=container_name,
-                detach=True,
-                environment={
-                    'BOT_ID': f'BT_{bot_id}',
-                    'MQTT_BROKER': os.getenv('MQTT_BROKER_URL', 'emqx'),
-                    'MQTT_PORT': os.getenv('MQTT_PORT', '1883'),
-                    **{f'CONFIG_{k.upper()}': str(v) for k, v in bt_config.items()},
-                },
+                environment=environment,
+                volumes=volumes,
                 network_mode='janym-network',
-                remove=True, # Auto-remove after completion
-                mem_limit='2g',
+                auto_remove=auto_remove,
+                mem_limit=mem_limit,
+                # Live bots keep the default 1024 shares, so they win any CPU contention
+                cpu_shares=self.backtest_cpu_shares,
+                nano_cpus=int(cpus * 1e9) if cpus else None,
+                # Let the kernel pick backtests first if the host runs out of memory
+                oom_score_adj=500,
             )
             print(f'Docker Manager: Backtest container {container_name} started (ID: {container.id})', flush=True)
             return container.id
@@ -147,41 +543,148 @@ class DockerManager:
         if not self.client:
             raise RuntimeError('Docker client not initialized')
 
+        await self.load_packs()
+        if self.placement.pack_of(bot_id):
+            await self.stop_packed(bot_id)
+            return
+
         container_name = f'hummingbot_{bot_id}'
 
         try:
-            container = self.client.containers.get(container_name)
-            if container.status == 'running':
-                container.stop(timeout=30)
+            existing = await self.find_container(container_name)
+            if existing is None:
+                raise docker.errors.NotFound(f'No such container: {container_name}')
+            if existing[1] == 'running':
+                self.index.expect_stop(container_name)
+                await self._call('stop', self.client.api.stop, existing[0], timeout=self.stop_timeout)
                 print(f'Docker Manager: Stopped container {container_name}')
-            self.containers.pop(bot_id, None)
         except docker.errors.NotFound:
             print(f'Docker Manager: Container {container_name} not found')
         except Exception as e:
             print(f'Docker Manager: Error stopping container: {e}')
             raise
 
-    async def restart_bot(self, bot_id: str):
-        """Restart a Hummingbot container"""
+    async def remove_bot(self, bot_id: str):
+        """Stop a bot and remove its container"""
+        await self.load_packs()
+        if self.placement.pack_of(bot_id):
+            await self.stop_packed(bot_id)
+            return
+        container_name = f'{BOT_PREFIX}{bot_id}'
+        existing = await self.find_container(container_name)
+        self.bot_configs.pop(bot_id, None)
+        if existing is None:
+            return
+        self.index.expect_stop(container_name)
+        await self._call('remove', self.client.api.remove_container, existing[0], force=True)
+        print(f'Docker Manager: Removed container {container_name}', flush=True)
+
+    async def restart_bot(self, bot_id: str, config: Optional[dict] = None):
+        """Restart a Hummingbot container, with a new config or the one it currently runs"""
+        if config is None:
+            document = await self.current_config(bot_id)
+            config = document['config'] if document else {}
         await self.stop_bot(bot_id)
         await asyncio.sleep(2)
-        await self.start_bot(bot_id, {})
+        await self.start_bot(bot_id, config)
 
-    async def update_bot_config(self, bot_id: str, config: dict, skip_restart: bool = False):
-        """Update bot configuration. If skip_restart is True, assumes internal bridge handles it."""
-        if skip_restart:
-            print(f'Docker Manager: Skipping restart for bot {bot_id} as requested (on-the-fly update)', flush=True)
-            return
-        await self.restart_bot(bot_id)
+    async def current_config(self, bot_id: str) -> Optional[dict]:
+        """Config document of a bot's container, read back from the container when not cached"""
+        if bot_id in self.bot_configs:
+            return self.bot_configs[bot_id]
+        await self.load_packs()
+        pack = self.placement.pack_of(bot_id)
+        if pack is not None:
+            return pack.bots.get(bot_id)
+        existing = await self.find_container(f'{BOT_PREFIX}{bot_id}')
+        if existing is None:
+            return None
+        try:
+            document = json.loads(await self.get_file(existing[0], CONFIG_DOCUMENT_PATH))
+        except Exception:
+            # Containers created before config documents only have CONFIG_* env vars
+            return None
+        self.bot_configs[bot_id] = document
+        return document
+
+    async def update_bot_config(self, bot_id: str, config: dict, skip_restart: bool = False) -> str:
+        """Apply a config update, restarting only for changes a running bot cannot take live.
+        Returns 'noop', 'hot' or 'restart'."""
+        current = await self.current_config(bot_id)
+        if current is None:
+            # Unknown running config: trust the caller's hint like before
+            change = 'hot' if skip_restart else 'restart'
+        else:
+            change = classify_change(current['config'], config)
+            # Controller changes are pushed live only on request; log settings are always applied by the bridge
+            if change == 'hot' and not skip_restart and 'controllers' in changed_keys(current['config'], config):
+                change = 'restart'
+
+        if change == 'noop':
+            print(f'Docker Manager: Config for bot {bot_id} unchanged (hash {current["hash"][:12]}), nothing to do', flush=True)
+        elif change == 'hot':
+            print(f'Docker Manager: Config for bot {bot_id} is applied live by the in-container bridge', flush=True)
+            self.bot_configs[bot_id] = build_config_document(bot_id, config)
+            pack = self.placement.pack_of(bot_id)
+            if pack is not None:
+                # The bridge already applied it; the manifest keeps it across pack and gateway restarts
+                pack.bots[bot_id] = self.bot_configs[bot_id]
+                await self.write_pack(pack)
+        elif self.placement.pack_of(bot_id):
+            # A packed bot restarts as its controller group; the pack container and its other bots keep running
+            await self.start_bot(bot_id, config)
+        else:
+            await self.restart_bot(bot_id, config)
+        return change
+
+    async def put_file(self, container_id: str, path: str, data: bytes):
+        """Write a single file into a container through the Docker archive API"""
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode='w') as tar:
+            info = tarfile.TarInfo(os.path.basename(path))
+            info.size = len(data)
+            info.mtime = int(time.time())
+            tar.addfile(info, io.BytesIO(data))
+        await self._call('put', self.client.api.put_archive, container_id, os.path.dirname(path), buffer.getvalue())
+
+    async def get_file(self, container_id: str, path: str) -> bytes:
+        """Read a single file out of a container through the Docker archive API"""
+        def read() -> bytes:
+            stream, _ = self.client.api.get_archive(container_id, path)
+            with tarfile.open(fileobj=io.BytesIO(b''.join(stream))) as tar:
+                return tar.extractfile(tar.next()).read()
 
-    async def list_containers(self) -> List[dict]:
-        """List all Hummingbot containers"""
+        return await self._call('get', read)
+
+    async def find_container(self, name: str) -> Optional[Tuple[str, str]]:
+        """Return (id, status) of a container by name, from the index when live, else from the daemon"""
+        if self.index.is_live:
+            state = self.index.get(name)
+            return (state.id, state.status) if state else None
+        try:
+            container = await self._call('get', self.client.containers.get, name)
+            return container.id, container.status
+        except docker.errors.NotFound:
+            return None
+
+    async def list_containers(
+        self,
+        status: Optional[str] = None,
+        kind: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> Tuple[List[dict], int]:
+        """List gateway containers from the index, falling back to the daemon until it is live"""
         if not self.client:
-            return []
+            return [], 0
+        if self.index.is_live:
+            return self.index.query(status=status, kind=kind, limit=limit, offset=offset)
 
         containers = []
         try:
-            all_containers = self.client.containers.list(
+            all_containers = await self._call(
+                'list',
+                self.client.containers.list,
                 all=True,
                 filters={'name': 'hummingbot_'},
             )
@@ -189,17 +692,32 @@ class DockerManager:
                 containers.append({
                     'id': container.id,
                     'name': container.name,
+                    'kind': 'bot',
                     'status': container.status,
                     'bot_id': container.name.replace('hummingbot_', ''),
                 })
         except Exception as e:
             print(f'Docker Manager: Error listing containers: {e}')
 
-        return containers
+        if status is not None:
+            containers = [container for container in containers if container['status'] == status]
+        if kind not in (None, 'bot'):
+            containers = []
+        return containers[offset:offset + limit], len(containers)
 
     async def cleanup(self):
         """Cleanup Docker resources"""
-        # Containers are managed individually, no global cleanup needed
+        # Containers are managed individually, only background tasks and the worker pool need shutting down
+        await self.warm_pool.stop()
+        if self.build_task and not self.build_task.done():
+            self.build_task.cancel()
+        self.is_closing = True
+        if self.event_stream is not None:
+            try:
+                self.event_stream.close()
+            except Exception:
+                pass
+        self.executor.shutdown(wait=False, cancel_futures=True)
         print('Docker Manager: Cleanup completed')
 
     def is_available(self) -> bool:
@@ -0,0 +1,256 @@
+"""
+Stand-in Docker Backend for Hummingbot Gateway
+In-memory implementation of the docker-py calls the gateway makes, for running gateway nodes without a Docker daemon
+"""
+
+import io
+import itertools
+import os
+import queue
+import tarfile
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import docker
+
+
+class FakeImage:
+    def __init__(self, tag: str, labels: Optional[dict] = None):
+        self.id = f'sha256:{uuid.uuid4().hex}'
+        self.tags = [tag]
+        self.labels = labels or {}
+
+
+class FakeContainer:
+    def __init__(self, backend: 'FakeDockerClient', name: str, image: str, labels: dict, environment: dict, options: dict):
+        self.backend = backend
+        self.id = uuid.uuid4().hex + uuid.uuid4().hex
+        self.name = name
+        self.image = image
+        self.labels = labels
+        self.environment = environment
+        self.options = options
+        self.status = 'created'
+        self.files: Dict[str, bytes] = {}
+        self.exit_code: Optional[int] = None
+
+    def start(self):
+        self.backend.set_status(self, 'running', 'start')
+
+    def summary(self) -> dict:
+        exited = f'Exited ({self.exit_code}) 1 second ago' if self.status == 'exited' else 'Up 1 second'
+        return {
+            'Id': self.id,
+            'Names': [f'/{self.name}'],
+            'Image': self.image,
+            'State': self.status,
+            'Status': exited,
+            'Labels': self.labels,
+        }
+
+
+class FakeImages:
+    def __init__(self, backend: 'FakeDockerClient'):
+        self.backend = backend
+        self.images: Dict[str, FakeImage] = {}
+
+    def get(self, name: str) -> FakeImage:
+        if name not in self.images:
+            raise docker.errors.ImageNotFound(f'No such image: {name}')
+        return self.images[name]
+
+    def build(self, tag: str, labels: Optional[dict] = None, **kwargs):
+        self.images[tag] = FakeImage(tag, labels)
+        return self.images[tag], iter([{'stream': f'Successfully tagged {tag} (stand-in backend)'}])
+
+
+class FakeContainers:
+    def __init__(self, backend: 'FakeDockerClient'):
+        self.backend = backend
+
+    def create(self, image: str, name: Optional[str] = None, labels: Optional[dict] = None, environment: Optional[dict] = None, **options) -> FakeContainer:
+        return self.backend.create(image, name or uuid.uuid4().hex[:12], labels or {}, environment or {}, options)
+
+    def run(self, image: str, name: Optional[str] = None, labels: Optional[dict] = None, environment: Optional[dict] = None, detach: bool = True, **options) -> FakeContainer:
+        container = self.create(image, name=name, labels=labels, environment=environment, **options)
+        container.start()
+        return container
+
+    def get(self, name_or_id: str) -> FakeContainer:
+        return self.backend.lookup(name_or_id)
+
+    def list(self, all: bool = False, filters: Optional[dict] = None) -> List[FakeContainer]:
+        return [
+            container for container in self.backend.matching(filters)
+            if all or container.status == 'running'
+        ]
+
+
+class FakeAPI:
+    """The low-level APIClient subset: ids in, plain dicts out"""
+
+    def __init__(self, backend: 'FakeDockerClient'):
+        self.backend = backend
+
+    def containers(self, all: bool = False, filters: Optional[dict] = None) -> List[dict]:
+        return [
+            container.summary() for container in self.backend.matching(filters)
+            if all or container.status == 'running'
+        ]
+
+    def stop(self, container_id: str, timeout: int = 10):
+        container = self.backend.lookup(container_id)
+        if container.status == 'running':
+            container.exit_code = 0
+            self.backend.set_status(container, 'exited', 'die')
+
+    def remove_container(self, container_id: str, force: bool = False):
+        container = self.backend.lookup(container_id)
+        if container.status == 'running':
+            if not force:
+                raise docker.errors.APIError(f'Conflict: container {container.name} is running')
+            container.exit_code = 137
+            self.backend.set_status(container, 'exited', 'die')
+        self.backend.remove(container)
+
+    def rename(self, container_id: str, name: str):
+        self.backend.rename(self.backend.lookup(container_id), name)
+
+    def update_container(self, container_id: str, **options):
+        self.backend.lookup(container_id).options.update(options)
+
+    def put_archive(self, container_id: str, path: str, data: bytes) -> bool:
+        container = self.backend.lookup(container_id)
+        with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+            for member in tar.getmembers():
+                container.files[os.path.join(path, member.name)] = tar.extractfile(member).read()
+        return True
+
+    def get_archive(self, container_id: str, path: str):
+        container = self.backend.lookup(container_id)
+        if path not in container.files:
+            raise docker.errors.NotFound(f'Could not find the file {path} in container {container.name}')
+        data = container.files[path]
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode='w') as tar:
+            info = tarfile.TarInfo(os.path.basename(path))
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+        return iter([buffer.getvalue()]), {'name': os.path.basename(path), 'size': len(data)}
+
+
+class FakeEventStream:
+    """Blocking iterator over container events, like the stream docker-py returns"""
+
+    def __init__(self, backend: 'FakeDockerClient'):
+        self.backend = backend
+        self.queue: queue.Queue = queue.Queue()
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> dict:
+        event = self.queue.get()
+        if event is None:
+            raise StopIteration
+        return event
+
+    def close(self):
+        self.closed = True
+        self.queue.put(None)
+        self.backend.unsubscribe(self)
+
+
+class FakeDockerClient:
+    """A Docker daemon that only keeps state: containers "run" without executing anything"""
+
+    def __init__(self, mem_total: Optional[int] = None, **kwargs):
+        self.mem_total = mem_total or int(os.getenv('FAKE_DOCKER_MEM_TOTAL', str(64 * 1024 ** 3)))
+        self.lock = threading.RLock()
+        self.by_id: Dict[str, FakeContainer] = {}
+        self.streams: List[FakeEventStream] = []
+        self.sequence = itertools.count()
+        self.images = FakeImages(self)
+        self.containers = FakeContainers(self)
+        self.api = FakeAPI(self)
+
+    def ping(self) -> bool:
+        return True
+
+    def info(self) -> dict:
+        return {'MemTotal': self.mem_total, 'OperatingSystem': 'stand-in backend'}
+
+    def events(self, decode: bool = True, since: Optional[int] = None, filters: Optional[dict] = None) -> FakeEventStream:
+        stream = FakeEventStream(self)
+        with self.lock:
+            self.streams.append(stream)
+        return stream
+
+    def unsubscribe(self, stream: FakeEventStream):
+        with self.lock:
+            if stream in self.streams:
+                self.streams.remove(stream)
+
+    def emit(self, container: FakeContainer, action: str):
+        attributes = {**container.labels, 'name': container.name, 'image': container.image}
+        if action == 'die':
+            attributes['exitCode'] = str(container.exit_code or 0)
+        event = {
+            'Type': 'container',
+            'Action': action,
+            'Actor': {'ID': container.id, 'Attributes': attributes},
+            'time': int(time.time()),
+            'timeNano': time.time_ns(),
+        }
+        for stream in list(self.streams):
+            stream.queue.put(event)
+
+    def create(self, image: str, name: str, labels: dict, environment: dict, options: dict) -> FakeContainer:
+        with self.lock:
+            if any(container.name == name for container in self.by_id.values()):
+                raise docker.errors.APIError(f'Conflict: the container name "/{name}" is already in use')
+            container = FakeContainer(self, name, image, labels, environment, options)
+            self.by_id[container.id] = container
+            self.emit(container, 'create')
+            return container
+
+    def set_status(self, container: FakeContainer, status: str, action: str):
+        with self.lock:
+            container.status = status
+            self.emit(container, action)
+
+    def rename(self, container: FakeContainer, name: str):
+        with self.lock:
+            container.name = name
+            self.emit(container, 'rename')
+
+    def remove(self, container: FakeContainer):
+        with self.lock:
+            self.by_id.pop(container.id, None)
+            self.emit(container, 'destroy')
+
+    def lookup(self, name_or_id: str) -> FakeContainer:
+        with self.lock:
+            for container in self.by_id.values():
+                if container.id == name_or_id or container.id.startswith(name_or_id) or container.name == name_or_id:
+                    return container
+        raise docker.errors.NotFound(f'No such container: {name_or_id}')
+
+    def matching(self, filters: Optional[dict] = None) -> List[FakeContainer]:
+        """Containers whose name contains one of the filter's names, like the daemon's substring match"""
+        names = (filters or {}).get('name')
+        if isinstance(names, str):
+            names = [names]
+        with self.lock:
+            containers = list(self.by_id.values())
+        return [
+            container for container in containers
+            if not names or any(name in container.name for name in names)
+        ]
+
+    def close(self):
+        for stream in list(self.streams):
+            stream.close()
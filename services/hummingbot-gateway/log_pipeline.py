@@ -0,0 +1,239 @@
+"""
+Log Pipeline for Hummingbot containers
+Precompiled filter/classify/enrich stages the in-container bridge runs on every Hummingbot output line
+"""
+
+import json
+import re
+import threading
+import time
+from typing import Callable, Iterable, Optional, Tuple
+
+# A stage takes (level, message) and returns the possibly rewritten pair, or None to drop the line
+Stage = Callable[[Optional[str], str], Optional[Tuple[Optional[str], str]]]
+
+ANSI_ESCAPE = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+# Welcome screen ASCII art
+BOX_DRAWING = frozenset('█╗╝╚═║╔')
+# Shell noise we know is harmless, e.g. from `yes | script`; a line is dropped when it contains every part of a rule
+HARMLESS = (
+    ('Broken pipe', 'yes'),
+    ('/bin/bash:',),
+)
+
+
+def strip_ansi(level, message):
+    if '\x1b' in message:
+        message = ANSI_ESCAPE.sub('', message)
+    message = message.strip()
+    return (level, message) if message else None
+
+
+def drop_box_drawing(level, message):
+    # Almost every log line is plain ASCII, which rules out box drawing without scanning characters
+    if message.isascii() or BOX_DRAWING.isdisjoint(message):
+        return level, message
+    return None
+
+
+def drop_containing(rules: Iterable[Tuple[str, ...]]) -> Stage:
+    """Stage dropping every line that contains all substrings of any rule"""
+    rules = tuple(tuple(rule) for rule in rules if rule)
+
+    def stage(level, message):
+        for rule in rules:
+            for part in rule:
+                if part not in message:
+                    break
+            else:
+                return None
+        return level, message
+    return stage
+
+
+def unwrap_json(level, message):
+    """Lines that are JSON log records contribute their own message and level"""
+    if message[0] != '{' or message[-1] != '}':
+        return level, message
+    try:
+        data = json.loads(message)
+    except ValueError:
+        return level, message
+    if isinstance(data, dict):
+        inner = data.get('message')
+        if isinstance(inner, str) and inner.strip():
+            message = inner.strip()
+        if isinstance(data.get('level'), str):
+            level = data['level'].lower()
+    return level, message
+
+
+def classify_level(level, message):
+    """Fill in the level of raw output lines; explicit levels are kept"""
+    if level is not None:
+        return level, message
+    # Cheap case-sensitive probes first, so only candidate lines pay for lower()
+    if 'rror' in message or 'RROR' in message or 'arning' in message or 'ARNING' in message:
+        lowered = message.lower()
+        if 'error' in lowered:
+            return 'error', message
+        if 'warning' in lowered:
+            return 'warning', message
+    return 'info', message
+
+
+def min_length(length: int) -> Stage:
+    def stage(level, message):
+        return (level, message) if len(message) >= length else None
+    return stage
+
+
+class Timestamper:
+    """Millisecond UTC ISO timestamps, formatted once per millisecond rather than once per line"""
+
+    def __init__(self):
+        self.millis = None
+        self.second = None
+        self.prefix = ''
+        self.value = ''
+
+    def __call__(self) -> str:
+        millis = int(time.time() * 1000)
+        if millis != self.millis:
+            self.millis = millis
+            second = millis // 1000
+            if second != self.second:
+                self.second = second
+                self.prefix = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(second))
+            self.value = f'{self.prefix}.{millis % 1000:03d}'
+        return self.value
+
+
+class LogPipeline:
+    def __init__(self, stages: Iterable[Stage]):
+        self.stages = tuple(stages)
+        self.timestamp = Timestamper()
+
+    @classmethod
+    def default(cls, drop: str = '') -> 'LogPipeline':
+        """The bridge's standard pipeline; drop adds newline-separated substrings whose lines are filtered out"""
+        rules = [*HARMLESS, *((line.strip(),) for line in drop.splitlines() if line.strip())]
+        return cls([strip_ansi, drop_box_drawing, drop_containing(rules), unwrap_json, classify_level, min_length(2)])
+
+    def process(self, message: str, level: Optional[str] = None) -> Optional[dict]:
+        """Run a line through every stage; returns the log record to publish, or None when dropped"""
+        result = (level, message)
+        for stage in self.stages:
+            result = stage(*result)
+            if result is None:
+                return None
+        return {'level': result[0], 'message': result[1], 'timestamp': self.timestamp()}
+
+
+# Lines per second and burst size per level; levels without an entry (e.g. metrics) are not limited
+DEFAULT_LOG_LIMITS = {
+    'error': {'rate': 50, 'burst': 200},
+    'warning': {'rate': 20, 'burst': 100},
+    'info': {'rate': 20, 'burst': 100},
+    'debug': {'rate': 5, 'burst': 20},
+}
+# Levels whose lines are sampled rather than dropped outright once their bucket is empty
+SAMPLED_LEVELS = ('info', 'debug')
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now: float) -> bool:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class LogLimiter:
+    """Per-level token buckets with sampling and repeat collapsing, so an error loop cannot flood the broker"""
+
+    def __init__(self, limits: Optional[dict] = None, sample_every: int = 10):
+        self.lock = threading.Lock()
+        self.buckets = {}
+        self.sample_every = sample_every
+        self.configure(limits, sample_every)
+        self.last_key = None
+        self.last_record = None
+        self.repeats = 0
+        self.sample_counts = dict.fromkeys(SAMPLED_LEVELS, 0)
+        self.counters = self.empty_counters()
+
+    @staticmethod
+    def empty_counters() -> dict:
+        return {'dropped': {}, 'sampled': {}, 'collapsed': 0}
+
+    def configure(self, limits: Optional[dict] = None, sample_every: Optional[int] = None):
+        """Replace the limits; levels missing from limits keep their defaults, a null entry disables the limit"""
+        merged = {**DEFAULT_LOG_LIMITS, **(limits or {})}
+        now = time.monotonic()
+        with self.lock:
+            self.buckets = {
+                level: TokenBucket(float(limit['rate']), float(limit['burst']), now)
+                for level, limit in merged.items() if limit
+            }
+            if sample_every is not None:
+                self.sample_every = max(1, int(sample_every))
+
+    def take_repeat_summary(self) -> Optional[dict]:
+        if not self.repeats:
+            return None
+        summary = {
+            **self.last_record,
+            'message': f"Previous message repeated {self.repeats} times: {self.last_record['message'][:200]}",
+            'metadata': {'repeated': self.repeats},
+        }
+        self.repeats = 0
+        return summary
+
+    def admit(self, record: dict) -> Tuple[dict, ...]:
+        """Records to publish for one processed line: nothing, the line, and/or a pending repeat summary"""
+        level = record['level']
+        key = (level, record['message'])
+        with self.lock:
+            if key == self.last_key:
+                self.repeats += 1
+                self.last_record = record
+                self.counters['collapsed'] += 1
+                return ()
+            summary = self.take_repeat_summary()
+            self.last_key = key
+            self.last_record = record
+
+            bucket = self.buckets.get(level)
+            if bucket is None or bucket.take(time.monotonic()):
+                admitted = True
+            elif level in self.sample_counts:
+                self.sample_counts[level] += 1
+                admitted = self.sample_counts[level] % self.sample_every == 0
+                if admitted:
+                    self.counters['sampled'][level] = self.counters['sampled'].get(level, 0) + 1
+            else:
+                admitted = False
+            if not admitted:
+                self.counters['dropped'][level] = self.counters['dropped'].get(level, 0) + 1
+
+        if summary:
+            return (summary, record) if admitted else (summary,)
+        return (record,) if admitted else ()
+
+    def flush(self) -> Tuple[Optional[dict], dict]:
+        """Pending repeat summary and the counters accumulated since the last flush"""
+        with self.lock:
+            summary = self.take_repeat_summary()
+            # The next occurrence of the same line starts a new run rather than extending a reported one
+            self.last_key = None
+            counters, self.counters = self.counters, self.empty_counters()
+        return summary, counters
@@ -5,42 +5,76 @@ Manages Docker containers for Hummingbot instances and bridges MQTT communicatio
 
 import asyncio
 import os
+import time
 from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import PlainTextResponse
 from dotenv import load_dotenv
 
+from backtest_scheduler import BacktestQueueFull, BacktestScheduler
+from backtest_sweep import SweepManager, SweepTooLarge
+from desired_state import DesiredStateStore
 from docker_manager import DockerManager
+from metrics_store import RESOLUTIONS, MetricsStore
 from mqtt_bridge import MQTTBridge
+from reconcile import StartupReconciler
+import telemetry
 from pydantic import BaseModel
 
 load_dotenv()
 
 mqtt_bridge: MQTTBridge | None = None
 docker_manager: DockerManager | None = None
+backtest_scheduler: BacktestScheduler | None = None
+sweep_manager: SweepManager | None = None
+reconciler: StartupReconciler | None = None
+metrics_store = MetricsStore()
+startup_timings: dict = {}
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events"""
-    global mqtt_bridge, docker_manager
+    global mqtt_bridge, docker_manager, backtest_scheduler, sweep_manager, reconciler
 
     # Initialize Docker manager
-    docker_manager = DockerManager()
+    started = time.monotonic()
+    docker_manager = DockerManager(metrics_store=metrics_store)
     await docker_manager.initialize()
+    startup_timings['docker_manager'] = time.monotonic() - started
+
+    backtest_scheduler = BacktestScheduler(docker_manager)
+    backtest_scheduler.start()
+    sweep_manager = SweepManager(backtest_scheduler)
 
     # Initialize MQTT bridge with current event loop
+    phase_started = time.monotonic()
     loop = asyncio.get_running_loop()
-    mqtt_bridge = MQTTBridge(docker_manager, loop)
+    desired_state = DesiredStateStore()
+    mqtt_bridge = MQTTBridge(docker_manager, loop, metrics_store=metrics_store, desired_state=desired_state)
     await mqtt_bridge.start()
+    startup_timings['mqtt_bridge'] = time.monotonic() - phase_started
+    startup_timings['total'] = time.monotonic() - started
+
+    # Republish statuses and repair drift in the background; commands are served meanwhile
+    reconciler = StartupReconciler(docker_manager, mqtt_bridge, desired_state)
+    reconcile_task = loop.create_task(reconciler.run())
+    loop_watch_task = loop.create_task(telemetry.watch_event_loop(float(os.getenv('EVENT_LOOP_LAG_INTERVAL', '0.25'))))
 
     yield
 
     # Cleanup
+    reconcile_task.cancel()
+    loop_watch_task.cancel()
+    if backtest_scheduler:
+        await backtest_scheduler.stop()
     if mqtt_bridge:
         await mqtt_bridge.stop()
     if docker_manager:
         await docker_manager.cleanup()
+    desired_state.close()
 
 
 app = FastAPI(
@@ -61,46 +95,214 @@ async def health_check():
     }
 
 
+@app.get('/metrics', response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Gateway metrics in the Prometheus text format"""
+    telemetry.ASYNCIO_TASKS.set(len(asyncio.all_tasks()))
+    telemetry.METRICS_STORE_BYTES.set(metrics_store.metrics()['bytes'])
+    if mqtt_bridge:
+        telemetry.BOT_ACTORS.set(len(mqtt_bridge.actors))
+        for key, value in mqtt_bridge.cluster.metrics().items():
+            if key == 'members':
+                value = len(value)
+            if isinstance(value, (bool, int, float)):
+                telemetry.CLUSTER.set(float(value), key)
+    if docker_manager:
+        telemetry.CONTAINERS.clear()
+        for state in docker_manager.index.by_name.values():
+            telemetry.CONTAINERS.inc(state.kind, state.status)
+        for key, value in docker_manager.placement.metrics().items():
+            telemetry.BOT_PACKING.set(float(value), key)
+        for key, value in docker_manager.admission.metrics().items():
+            telemetry.HOST_MEMORY.set(value, key)
+    if backtest_scheduler:
+        scheduler_metrics = backtest_scheduler.metrics()
+        cache_metrics = scheduler_metrics.pop('cache', {})
+        scheduler_metrics.update({f'cache_{key}': value for key, value in cache_metrics.items()})
+        for key, value in scheduler_metrics.items():
+            if isinstance(value, (int, float)):
+                telemetry.BACKTESTS.set(value, key)
+    return PlainTextResponse(telemetry.render(), media_type='text/plain; version=0.0.4')
+
+
+@app.get('/cluster')
+async def cluster_info(bot_id: Optional[str] = None):
+    """Gateway nodes this node sees, what it owns, and optionally which node owns a bot"""
+    if not mqtt_bridge:
+        raise HTTPException(status_code=503, detail='MQTT bridge not initialized')
+    cluster = mqtt_bridge.cluster
+    info = cluster.metrics()
+    if bot_id is not None:
+        info['bot'] = {'bot_id': bot_id, 'owner': cluster.holder(bot_id) if cluster.enabled else cluster.node_id}
+    return info
+
+
+@app.get('/startup')
+async def startup_info():
+    """Startup phase timings (seconds) and bot image build state"""
+    return {
+        'phases': startup_timings,
+        'docker_phases': docker_manager.startup_timings if docker_manager else {},
+        'image': docker_manager.image_status if docker_manager else None,
+        'reconciliation': reconciler.result if reconciler else None,
+    }
+
+
 @app.get('/containers')
-async def list_containers():
-    """List all Hummingbot containers"""
+async def list_containers(
+    status: Optional[str] = None,
+    kind: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+):
+    """List Hummingbot bot and backtest containers"""
     if not docker_manager:
         return {'error': 'Docker manager not initialized'}
-    containers = await docker_manager.list_containers()
-    return {'containers': containers}
+    containers, total = await docker_manager.list_containers(status=status, kind=kind, limit=limit, offset=offset)
+    return {'containers': containers, 'total': total, 'limit': limit, 'offset': offset}
+
+
+@app.get('/bots/{bot_id}/metrics')
+async def get_bot_metrics(
+    bot_id: str,
+    start: Optional[float] = Query(None, alias='from', description='Unix seconds, defaults to an hour ago'),
+    end: Optional[float] = Query(None, alias='to', description='Unix seconds, defaults to now'),
+    resolution: Optional[str] = Query(None, pattern='^(' + '|'.join(RESOLUTIONS) + ')$'),
+    fields: Optional[str] = Query(None, description='Comma-separated field names, all fields when omitted'),
+):
+    """Rolled-up metrics of a bot from the gateway's in-memory store"""
+    end = end if end is not None else time.time()
+    start = start if start is not None else end - 3600
+    if start > end:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    result = metrics_store.query(
+        bot_id,
+        start,
+        end,
+        resolution=resolution,
+        fields=fields.split(',') if fields else None,
+    )
+    if result is None:
+        raise HTTPException(status_code=404, detail='No metrics for this bot')
+    return result
+
+
+@app.get('/bots/{bot_id}/resources')
+async def get_bot_resources(bot_id: str):
+    """Resource plan the bot would start with now, and the host's admission state"""
+    if not docker_manager:
+        raise HTTPException(status_code=503, detail='Docker manager not initialized')
+    document = await docker_manager.current_config(bot_id)
+    if document is None:
+        raise HTTPException(status_code=404, detail='No config known for this bot')
+    return {
+        'bot_id': bot_id,
+        'plan': docker_manager.sizer.plan(bot_id, document['config']).to_dict(),
+        'host': docker_manager.admission.metrics(),
+    }
 
 
 class BacktestRequest(BaseModel):
     config: dict
     start_date: str
     end_date: str
+    owner_id: Optional[str] = None
+    priority: int = 0
 
 
 @app.post('/bots/{bot_id}/backtest')
 async def run_bot_backtest(bot_id: str, request: BacktestRequest):
-    """Run a backtest for a bot"""
-    if not docker_manager:
-        return {'error': 'Docker manager not initialized', 'success': False}
-    
+    """Queue a backtest for a bot"""
+    if not backtest_scheduler:
+        return {'error': 'Backtest scheduler not initialized', 'success': False}
+
     try:
-        container_id = await docker_manager.run_backtest(
-            bot_id, 
-            request.config, 
-            request.start_date, 
-            request.end_date
+        job = backtest_scheduler.submit(
+            bot_id,
+            request.config,
+            request.start_date,
+            request.end_date,
+            owner_id=request.owner_id,
+            priority=request.priority,
         )
+        return {**job.to_dict(), 'success': True}
+    except BacktestQueueFull as e:
         return {
-            'status': 'started', 
-            'container_id': container_id,
-            'success': True
+            'error': str(e),
+            'success': False
         }
-    except Exception as e:
+
+
+class SweepRequest(BaseModel):
+    config: dict
+    grid: Dict[str, List[Any]]
+    start_date: str
+    end_date: str
+    rank_by: str = 'net_quote'
+    owner_id: Optional[str] = None
+    priority: int = 0
+
+
+@app.post('/bots/{bot_id}/backtest/sweep')
+async def run_bot_sweep(bot_id: str, request: SweepRequest):
+    """Backtest every combination of a parameter grid in one or a few containers"""
+    if not sweep_manager:
+        return {'error': 'Backtest scheduler not initialized', 'success': False}
+
+    try:
+        sweep = await sweep_manager.submit(
+            bot_id,
+            request.config,
+            request.grid,
+            request.start_date,
+            request.end_date,
+            rank_by=request.rank_by,
+            owner_id=request.owner_id,
+            priority=request.priority,
+        )
+        return {**sweep_manager.to_dict(sweep), 'success': True}
+    except (BacktestQueueFull, SweepTooLarge) as e:
         return {
             'error': str(e),
             'success': False
         }
 
 
+@app.get('/sweeps/{sweep_id}')
+async def get_sweep(sweep_id: str):
+    """Status and ranked results of a parameter sweep"""
+    sweep = sweep_manager.get(sweep_id) if sweep_manager else None
+    if sweep is None:
+        raise HTTPException(status_code=404, detail='Sweep not found')
+    return sweep_manager.to_dict(sweep)
+
+
+@app.get('/backtests/metrics')
+async def backtest_metrics():
+    """Backtest queue depth, capacity usage and wait times"""
+    if not backtest_scheduler:
+        return {'error': 'Backtest scheduler not initialized'}
+    return backtest_scheduler.metrics()
+
+
+@app.get('/backtests/{job_id}')
+async def get_backtest(job_id: str):
+    """Status of a backtest job"""
+    job = backtest_scheduler.get(job_id) if backtest_scheduler else None
+    if job is None:
+        raise HTTPException(status_code=404, detail='Backtest job not found')
+    return job.to_dict()
+
+
+@app.delete('/backtests/{job_id}')
+async def cancel_backtest(job_id: str):
+    """Cancel a queued or running backtest job"""
+    job = await backtest_scheduler.cancel(job_id) if backtest_scheduler else None
+    if job is None:
+        raise HTTPException(status_code=404, detail='Backtest job not found')
+    return job.to_dict()
+
+
 if __name__ == '__main__':
     import uvicorn
 
@@ -0,0 +1,277 @@
+"""
+Market Data Store for Hummingbot Gateway
+Append-only columnar store of historical candles and trades, read zero-copy through mmap
+"""
+
+import bisect
+import csv
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import time
+import urllib.parse
+import urllib.request
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Column name -> struct/memoryview format; every dataset starts with an int64 millisecond timestamp
+SCHEMAS: Dict[str, Tuple[Tuple[str, str], ...]] = {
+    'candles': (('timestamp', 'q'), ('open', 'd'), ('high', 'd'), ('low', 'd'), ('close', 'd'), ('volume', 'd')),
+    'trades': (('timestamp', 'q'), ('price', 'd'), ('amount', 'd'), ('side', 'b')),
+}
+
+INTERVAL_MS = {'1m': 60_000, '5m': 300_000, '15m': 900_000, '1h': 3_600_000, '1d': 86_400_000}
+
+
+def dataset_name(kind: str, interval: Optional[str] = None) -> str:
+    return f'candles_{interval}' if kind == 'candles' else kind
+
+
+def parse_date_ms(value: str) -> int:
+    """Milliseconds since epoch for an ISO date or datetime (UTC when no zone is given)"""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000)
+
+
+class SeriesView:
+    """Read-only, memory-mapped view over one dataset; slices are memoryviews, nothing is copied"""
+
+    def __init__(self, path: str, kind: str):
+        with open(os.path.join(path, 'meta.json'), 'r') as f:
+            self.meta = json.load(f)
+        self.rows = self.meta['rows']
+        self.maps: List[mmap.mmap] = []
+        self.columns: Dict[str, memoryview] = {}
+        for name, fmt in SCHEMAS[kind]:
+            size = self.rows * struct.calcsize(fmt)
+            if size == 0:
+                self.columns[name] = memoryview(b'').cast(fmt)
+                continue
+            with open(os.path.join(path, f'{name}.col'), 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+            self.maps.append(mapped)
+            self.columns[name] = memoryview(mapped).cast(fmt)
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def range(self, start_ms: int, end_ms: int) -> Dict[str, memoryview]:
+        """Columns restricted to start_ms <= timestamp < end_ms"""
+        timestamps = self.columns['timestamp']
+        lo = bisect.bisect_left(timestamps, start_ms)
+        hi = bisect.bisect_left(timestamps, end_ms)
+        return {name: column[lo:hi] for name, column in self.columns.items()}
+
+    def close(self):
+        for column in self.columns.values():
+            column.release()
+        for mapped in self.maps:
+            mapped.close()
+
+
+class MarketDataStore:
+    def __init__(self, root: str):
+        self.root = root
+
+    def series_path(self, exchange: str, pair: str, kind: str, interval: Optional[str] = None) -> str:
+        return os.path.join(self.root, exchange, pair, dataset_name(kind, interval))
+
+    def read_meta(self, path: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(path, 'meta.json'), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def open(self, exchange: str, pair: str, kind: str = 'candles', interval: Optional[str] = '1m') -> Optional[SeriesView]:
+        path = self.series_path(exchange, pair, kind, interval)
+        if self.read_meta(path) is None:
+            return None
+        return SeriesView(path, kind)
+
+    def coverage(self, exchange: str, pair: str, kind: str = 'candles', interval: Optional[str] = '1m') -> Optional[Tuple[int, int]]:
+        meta = self.read_meta(self.series_path(exchange, pair, kind, interval))
+        if not meta or not meta['rows']:
+            return None
+        return meta['first'], meta['last']
+
+    def append(self, path: str, kind: str, rows: Sequence[tuple]) -> int:
+        """Append rows newer than the last stored timestamp; the row count in meta.json is the commit point"""
+        meta = self.read_meta(path) or {'kind': kind, 'rows': 0, 'first': None, 'last': None}
+        last = meta['last']
+        rows = sorted((row for row in rows if last is None or row[0] > last), key=lambda row: row[0])
+        if not rows:
+            return 0
+
+        os.makedirs(path, exist_ok=True)
+        for index, (name, fmt) in enumerate(SCHEMAS[kind]):
+            packed = struct.pack(f'<{len(rows)}{fmt}', *(row[index] for row in rows))
+            with open(os.path.join(path, f'{name}.col'), 'r+b' if meta['rows'] else 'wb') as f:
+                # Drop any tail left behind by an interrupted append before writing
+                f.truncate(meta['rows'] * struct.calcsize(fmt))
+                f.seek(0, os.SEEK_END)
+                f.write(packed)
+                f.flush()
+                os.fsync(f.fileno())
+
+        meta.update({
+            'rows': meta['rows'] + len(rows),
+            'first': meta['first'] if meta['first'] is not None else rows[0][0],
+            'last': rows[-1][0],
+            'updated_at': time.time(),
+        })
+        tmp_path = os.path.join(path, 'meta.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(path, 'meta.json'))
+        return len(rows)
+
+    def prepend(self, path: str, kind: str, rows: Sequence[tuple]) -> int:
+        """Backfill older rows by writing a new generation of the dataset and swapping it in"""
+        view = SeriesView(path, kind)
+        try:
+            first = view.meta['first']
+            older = [row for row in rows if row[0] < first]
+            if not older:
+                return 0
+            existing = list(zip(*(view.columns[name] for name, _ in SCHEMAS[kind])))
+        finally:
+            view.close()
+
+        staging = f'{path}.staging'
+        shutil.rmtree(staging, ignore_errors=True)
+        self.append(staging, kind, sorted(older, key=lambda row: row[0]) + existing)
+        # Readers holding the old mmaps keep the previous files alive until they close them
+        retired = f'{path}.retired'
+        shutil.rmtree(retired, ignore_errors=True)
+        os.replace(path, retired)
+        os.replace(staging, path)
+        shutil.rmtree(retired, ignore_errors=True)
+        return len(older)
+
+    def ensure_range(
+        self,
+        fetcher: 'Fetcher',
+        exchange: str,
+        pair: str,
+        start_ms: int,
+        end_ms: int,
+        kind: str = 'candles',
+        interval: Optional[str] = '1m',
+    ) -> int:
+        """Fetch only the parts of [start_ms, end_ms) that are not stored yet; returns rows added"""
+        path = self.series_path(exchange, pair, kind, interval)
+        covered = self.coverage(exchange, pair, kind, interval)
+        step = INTERVAL_MS.get(interval, 1) if kind == 'candles' else 1
+        added = 0
+        if covered is None:
+            return self.append(path, kind, fetcher.fetch(exchange, pair, kind, interval, start_ms, end_ms))
+        first, last = covered
+        if start_ms < first:
+            added += self.prepend(path, kind, fetcher.fetch(exchange, pair, kind, interval, start_ms, first))
+        if end_ms > last + step:
+            added += self.append(path, kind, fetcher.fetch(exchange, pair, kind, interval, last + step, end_ms))
+        return added
+
+
+class Fetcher:
+    """Source of historical rows, in the column order of SCHEMAS[kind]"""
+
+    def fetch(self, exchange: str, pair: str, kind: str, interval: Optional[str], start_ms: int, end_ms: int) -> List[tuple]:
+        raise NotImplementedError
+
+
+class CsvFixtureFetcher(Fetcher):
+    """Offline fetcher reading {root}/{exchange}/{pair}/{dataset}.csv with a header row"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def fetch(self, exchange, pair, kind, interval, start_ms, end_ms):
+        path = os.path.join(self.root, exchange, pair, f'{dataset_name(kind, interval)}.csv')
+        if not os.path.exists(path):
+            return []
+        casts = [int if fmt in ('q', 'b') else float for _, fmt in SCHEMAS[kind]]
+        rows = []
+        with open(path, 'r', newline='') as f:
+            for record in csv.DictReader(f):
+                row = tuple(cast(record[name]) for cast, (name, _) in zip(casts, SCHEMAS[kind]))
+                if start_ms <= row[0] < end_ms:
+                    rows.append(row)
+        return rows
+
+
+class BinanceFetcher(Fetcher):
+    """Public Binance spot REST endpoints; pairs use the Hummingbot BASE-QUOTE notation"""
+
+    base_url = 'https://api.binance.com/api/v3'
+
+    def get(self, endpoint: str, params: dict) -> list:
+        url = f'{self.base_url}/{endpoint}?{urllib.parse.urlencode(params)}'
+        with urllib.request.urlopen(url, timeout=30) as response:
+            return json.loads(response.read())
+
+    def fetch(self, exchange, pair, kind, interval, start_ms, end_ms):
+        symbol = pair.replace('-', '').upper()
+        rows = []
+        cursor = start_ms
+        if kind == 'candles':
+            while cursor < end_ms:
+                batch = self.get('klines', {'symbol': symbol, 'interval': interval, 'startTime': cursor, 'endTime': end_ms - 1, 'limit': 1000})
+                if not batch:
+                    break
+                rows.extend((int(k[0]), float(k[1]), float(k[2]), float(k[3]), float(k[4]), float(k[5])) for k in batch)
+                cursor = int(batch[-1][0]) + INTERVAL_MS[interval]
+        else:
+            # aggTrades accepts at most one hour per request
+            while cursor < end_ms:
+                window_end = min(cursor + 3_600_000, end_ms)
+                batch = self.get('aggTrades', {'symbol': symbol, 'startTime': cursor, 'endTime': window_end - 1, 'limit': 1000})
+                rows.extend((int(t['T']), float(t['p']), float(t['q']), -1 if t['m'] else 1) for t in batch)
+                cursor = int(batch[-1]['T']) + 1 if len(batch) == 1000 else window_end
+        return rows
+
+
+def fetcher_from_env() -> Fetcher:
+    """MARKET_DATA_FETCHER=binance (default) or fixture:<path> for offline use"""
+    spec = os.getenv('MARKET_DATA_FETCHER', 'binance')
+    if spec.startswith('fixture:'):
+        return CsvFixtureFetcher(spec[len('fixture:'):])
+    return BinanceFetcher()
+
+
+def backtest_series(config: dict) -> List[Tuple[str, str]]:
+    """(exchange, pair) pairs a backtest config trades, for PMM and V2 controller configs"""
+    series = []
+    if config.get('strategy_type') == 'v2':
+        controllers = config.get('controllers', '{"controllers": []}')
+        if isinstance(controllers, str):
+            controllers = json.loads(controllers)
+        for controller in controllers.get('controllers', []):
+            exchange = controller.get('connector_name') or controller.get('exchange')
+            pair = controller.get('trading_pair') or controller.get('market')
+            if exchange and pair:
+                series.append((exchange, pair))
+    else:
+        series.append((config.get('exchange', 'binance'), config.get('market', 'BTC-USDT')))
+    return sorted(set(series))
+
+
+if __name__ == '__main__':
+    # Offline check: python market_data_store.py <store> <fixture_dir> <exchange> <pair> <start> <end>
+    store_root, fixture_root, exchange, pair, start, end = sys.argv[1:7]
+    store = MarketDataStore(store_root)
+    fetcher = CsvFixtureFetcher(fixture_root)
+    start_ms, end_ms = parse_date_ms(start), parse_date_ms(end)
+    for kind, interval in (('candles', '1m'), ('trades', None)):
+        added = store.ensure_range(fetcher, exchange, pair, start_ms, end_ms, kind=kind, interval=interval)
+        view = store.open(exchange, pair, kind, interval)
+        rows = len(view.range(start_ms, end_ms)['timestamp']) if view else 0
+        print(f'{dataset_name(kind, interval)}: added {added} rows, {rows} rows in range')
+        if view:
+            view.close()
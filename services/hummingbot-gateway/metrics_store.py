@@ -0,0 +1,245 @@
+"""
+Metrics Store for Hummingbot Gateway
+Per-bot in-memory rollups of published metrics at 1s/1m/1h resolution, in array-backed ring buffers that grow as buckets fill
+"""
+
+import os
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+from warm_pool import parse_memory
+
+# Resolution name -> bucket width in seconds
+RESOLUTIONS = {'1s': 1, '1m': 60, '1h': 3600}
+# Buckets a new ring has room for before it first grows
+INITIAL_SLOTS = 8
+
+
+def flatten_numeric(payload: dict, prefix: str = '') -> Dict[str, float]:
+    """Numeric leaves of a nested metrics payload as dotted field names"""
+    fields = {}
+    for key, value in payload.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, bool):
+            continue
+        if isinstance(value, (int, float)):
+            fields[name] = float(value)
+        elif isinstance(value, dict):
+            fields.update(flatten_numeric(value, f'{name}.'))
+    return fields
+
+
+class RollupRing:
+    """
+    min/max/sum/count/last per bucket for one field at one resolution, oldest bucket first. Only buckets that
+    received a value take a slot and expire by time, so a field published every 10s holds ~90 one-second
+    buckets rather than 900. Slots start small and double as buckets fill, up to the retention span.
+    """
+
+    __slots__ = ('width', 'span', 'start', 'size', 'keys', 'mins', 'maxs', 'sums', 'lasts', 'counts')
+
+    def __init__(self, width: int, span: int):
+        self.width = width
+        # Buckets of retention
+        self.span = span
+        # Slot of the oldest bucket, and buckets held
+        self.start = 0
+        self.size = 0
+        capacity = min(INITIAL_SLOTS, span)
+        self.keys = array('q', [-1]) * capacity
+        self.mins = array('d', bytes(8 * capacity))
+        self.maxs = array('d', bytes(8 * capacity))
+        self.sums = array('d', bytes(8 * capacity))
+        self.lasts = array('d', bytes(8 * capacity))
+        self.counts = array('I', bytes(4 * capacity))
+
+    @property
+    def capacity(self) -> int:
+        return len(self.keys)
+
+    def slot(self, index: int) -> int:
+        return (self.start + index) % len(self.keys)
+
+    def grow(self, capacity: int):
+        """Reallocate with room for capacity buckets, oldest first"""
+        order = [self.slot(index) for index in range(self.size)]
+        padding = capacity - self.size
+        self.keys = array('q', [self.keys[slot] for slot in order]) + array('q', [-1]) * padding
+        self.mins = array('d', [self.mins[slot] for slot in order]) + array('d', bytes(8 * padding))
+        self.maxs = array('d', [self.maxs[slot] for slot in order]) + array('d', bytes(8 * padding))
+        self.sums = array('d', [self.sums[slot] for slot in order]) + array('d', bytes(8 * padding))
+        self.lasts = array('d', [self.lasts[slot] for slot in order]) + array('d', bytes(8 * padding))
+        self.counts = array('I', [self.counts[slot] for slot in order]) + array('I', bytes(4 * padding))
+        self.start = 0
+
+    def lower_bound(self, bucket: int) -> int:
+        """Index of the oldest held bucket >= bucket"""
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if self.keys[self.slot(middle)] < bucket:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def update(self, slot: int, value: float):
+        if value < self.mins[slot]:
+            self.mins[slot] = value
+        if value > self.maxs[slot]:
+            self.maxs[slot] = value
+        self.sums[slot] += value
+        self.lasts[slot] = value
+        self.counts[slot] += 1
+
+    def add(self, timestamp: float, value: float) -> int:
+        """Record a value; returns the bytes the ring grew by"""
+        bucket = int(timestamp // self.width)
+        if self.size:
+            newest = self.keys[self.slot(self.size - 1)]
+            if bucket == newest:
+                self.update(self.slot(self.size - 1), value)
+                return 0
+            if bucket < newest:
+                # Late value: only merged into a bucket that is still held
+                index = self.lower_bound(bucket)
+                if index < self.size and self.keys[self.slot(index)] == bucket:
+                    self.update(self.slot(index), value)
+                return 0
+        while self.size and self.keys[self.start] <= bucket - self.span:
+            self.start = (self.start + 1) % len(self.keys)
+            self.size -= 1
+        grown = 0
+        if self.size == len(self.keys):
+            if len(self.keys) < self.span:
+                before = self.nbytes
+                self.grow(min(2 * len(self.keys), self.span))
+                grown = self.nbytes - before
+            else:
+                self.start = (self.start + 1) % len(self.keys)
+                self.size -= 1
+        slot = self.slot(self.size)
+        self.size += 1
+        self.keys[slot] = bucket
+        self.mins[slot] = self.maxs[slot] = self.sums[slot] = self.lasts[slot] = value
+        self.counts[slot] = 1
+        return grown
+
+    def query(self, start: float, end: float) -> dict:
+        """Columnar buckets within [start, end], oldest first"""
+        last = int(end // self.width)
+        first = max(int(start // self.width), last - self.span + 1)
+        columns = {'t': [], 'min': [], 'max': [], 'avg': [], 'last': [], 'count': []}
+        for index in range(self.lower_bound(first), self.size):
+            slot = self.slot(index)
+            bucket = self.keys[slot]
+            if bucket > last:
+                break
+            columns['t'].append(bucket * self.width)
+            columns['min'].append(self.mins[slot])
+            columns['max'].append(self.maxs[slot])
+            columns['avg'].append(self.sums[slot] / self.counts[slot])
+            columns['last'].append(self.lasts[slot])
+            columns['count'].append(self.counts[slot])
+        return columns
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.itemsize * len(column) for column in (self.keys, self.mins, self.maxs, self.sums, self.lasts, self.counts))
+
+
+class MetricsStore:
+    def __init__(self):
+        # Retention in buckets per resolution: 15 minutes of seconds, a day of minutes, a week of hours by default
+        self.capacities = {
+            '1s': int(os.getenv('METRICS_RETAIN_1S', '900')),
+            '1m': int(os.getenv('METRICS_RETAIN_1M', '1440')),
+            '1h': int(os.getenv('METRICS_RETAIN_1H', '168')),
+        }
+        self.max_bytes = parse_memory(os.getenv('METRICS_STORE_MAX_BYTES', '256m'))
+        self.max_fields = int(os.getenv('METRICS_STORE_MAX_FIELDS', '64'))
+        # bot_id -> field -> resolution -> ring, least recently written bot first; ingested and queried on the
+        # event loop only, so there is no locking
+        self.bots: 'OrderedDict[str, Dict[str, Dict[str, RollupRing]]]' = OrderedDict()
+        self.bot_bytes: Dict[str, int] = {}
+        self.total_bytes = 0
+
+    def ingest(self, bot_id: str, payload: dict, timestamp: Optional[float] = None):
+        fields = flatten_numeric(payload)
+        if not fields:
+            return
+        timestamp = time.time() if timestamp is None else timestamp
+        series = self.bots.get(bot_id)
+        if series is None:
+            series = self.bots[bot_id] = {}
+            self.bot_bytes[bot_id] = 0
+        else:
+            self.bots.move_to_end(bot_id)
+        for name, value in fields.items():
+            rings = series.get(name)
+            if rings is None:
+                # Caps memory per bot when a payload carries unexpectedly many fields
+                if len(series) >= self.max_fields:
+                    continue
+                rings = series[name] = {
+                    resolution: RollupRing(width, self.capacities[resolution])
+                    for resolution, width in RESOLUTIONS.items()
+                }
+                size = sum(ring.nbytes for ring in rings.values())
+                self.bot_bytes[bot_id] += size
+                self.total_bytes += size
+            grown = 0
+            for ring in rings.values():
+                grown += ring.add(timestamp, value)
+            if grown:
+                self.bot_bytes[bot_id] += grown
+                self.total_bytes += grown
+        self.evict(keep=bot_id)
+
+    def evict(self, keep: str):
+        """Drop the least recently written bots until the store fits its memory budget"""
+        while self.total_bytes > self.max_bytes and len(self.bots) > 1:
+            bot_id = next(iter(self.bots))
+            if bot_id == keep:
+                break
+            del self.bots[bot_id]
+            self.total_bytes -= self.bot_bytes.pop(bot_id)
+
+    def pick_resolution(self, start: float, end: float) -> str:
+        """Finest resolution whose retention still reaches back to start"""
+        now = time.time()
+        for resolution, width in RESOLUTIONS.items():
+            if now - start <= width * self.capacities[resolution]:
+                return resolution
+        return '1h'
+
+    def query(
+        self,
+        bot_id: str,
+        start: float,
+        end: float,
+        resolution: Optional[str] = None,
+        fields: Optional[Iterable[str]] = None,
+    ) -> Optional[dict]:
+        resolution = resolution or self.pick_resolution(start, end)
+        series = self.bots.get(bot_id)
+        if series is None:
+            return None
+        names: List[str] = sorted(series) if fields is None else [name for name in fields if name in series]
+        return {
+            'bot_id': bot_id,
+            'resolution': resolution,
+            'from': start,
+            'to': end,
+            'fields': {name: series[name][resolution].query(start, end) for name in names},
+        }
+
+    def metrics(self) -> dict:
+        return {
+            'bots': len(self.bots),
+            'fields': sum(len(series) for series in self.bots.values()),
+            'bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+        }
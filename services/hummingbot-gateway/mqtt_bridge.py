@@ -6,12 +6,22 @@ Subscribes to commands and publishes metrics/status updates
 import json
 import os
 import asyncio
-from typing import Optional
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
 
-import paho.mqtt.client as mqtt
 from pydantic import BaseModel
 
+from bot_actor import BotCommandActor
+from cluster import CLUSTER_TOPIC, GatewayCluster
+from desired_state import DesiredStateStore
+from container_index import ContainerState
 from docker_manager import DockerManager
+from metrics_store import MetricsStore
+from mqtt_transport import MQTTTransport, topic_family
+from payload_codec import encode, decode
+from resources import AdmissionRejected
+from telemetry import MQTT_COMMAND_QUEUE, MQTT_COMMANDS_INFLIGHT, MQTT_MESSAGES_RECEIVED, MQTT_PUBLISHED, MQTT_PUBLISHED_BYTES
 
 
 class StartCommand(BaseModel):
@@ -26,108 +36,270 @@ class StopCommand(BaseModel):
 
 
 class MQTTBridge:
-    def __init__(self, docker_manager: DockerManager, loop: asyncio.AbstractEventLoop):
+    def __init__(
+        self,
+        docker_manager: DockerManager,
+        loop: asyncio.AbstractEventLoop,
+        metrics_store: Optional[MetricsStore] = None,
+        desired_state: Optional[DesiredStateStore] = None,
+    ):
         self.docker_manager = docker_manager
         self.loop = loop
-        self.client: Optional[mqtt.Client] = None
-        self.mqtt_broker = os.getenv('MQTT_BROKER_URL', 'localhost')
-        self.mqtt_port = int(os.getenv('MQTT_PORT', '1883'))
-        self.mqtt_username = os.getenv('MQTT_USERNAME', 'admin')
-        self.mqtt_password = os.getenv('MQTT_PASSWORD', 'public')
-        self.is_connected_flag = False
-
-    def on_connect(self, client, userdata, flags, rc):
-        """Callback for when the client receives a CONNACK response from the server"""
-        if rc == 0:
-            self.is_connected_flag = True
-            print('MQTT Bridge: Connected to broker', flush=True)
-            # Subscribe to command topics
-            client.subscribe('hbot/+/start')
-            client.subscribe('hbot/+/stop')
-            client.subscribe('hbot/+/config/update')
-            print('MQTT Bridge: Subscribed to topics: hbot/+/start, hbot/+/stop, hbot/+/config/update', flush=True)
-        else:
-            print(f'MQTT Bridge: Failed to connect, return code {rc}', flush=True)
-
-    def on_disconnect(self, client, userdata, rc):
-        """Callback for when the client disconnects from the server"""
-        self.is_connected_flag = False
-        print('MQTT Bridge: Disconnected from broker')
+        self.metrics_store = metrics_store
+        # What each bot was last asked to be, for reconciliation after a gateway restart
+        self.desired_state = desired_state
+
+        # One serialized command queue per bot, plus a global cap on accepted-but-unfinished commands
+        self.actors: Dict[str, BotCommandActor] = {}
+        self.max_inflight_commands = int(os.getenv('MQTT_MAX_INFLIGHT_COMMANDS', '256'))
+        self.inflight = asyncio.BoundedSemaphore(self.max_inflight_commands)
+        # Commands received while every slot is taken wait here, so the inbound reader never waits for a slot
+        # and cluster and metrics messages keep flowing; only a full command queue pauses socket reads
+        self.command_queue: Deque[Tuple[str, str, dict, float]] = deque()
+        self.command_queue_limit = int(os.getenv('MQTT_COMMAND_QUEUE', '10000'))
+        self.command_ready = asyncio.Event()
+        self.command_task: Optional[asyncio.Task] = None
+
+        # Publish container transitions (crashes, OOM kills, restart loops) as they happen
+        self.docker_manager.index.add_listener(self.on_container_status)
+        # Starts queued for host memory report 'queued' and then 'starting'
+        self.docker_manager.admission.add_listener(self.publish_status)
+
+        # Opt-in sharding across gateway nodes: each bot's commands, statuses and metrics are handled by its owner only
+        self.cluster = GatewayCluster(
+            publish=self.publish,
+            dispatch=self.dispatch_command,
+            release=self.release_command_slots,
+            resume=self.resume_bot,
+            on_lost=self.on_bot_lost,
+        )
+        client_id = f'hummingbot_gateway_{self.cluster.node_id}' if self.cluster.enabled else f'hummingbot_gateway_{os.getpid()}'
+        self.transport = MQTTTransport(loop, client_id, on_connect=self.on_connect, on_message=self.on_message)
+
+    def on_connect(self):
+        """Called on every (re)connect, after the transport re-subscribed our topics"""
+        print('MQTT Bridge: Connected to broker', flush=True)
+
+    def on_message(self, topic: str, payload: bytes):
+        """Handle a received message on the event loop"""
+        received_at = time.perf_counter()
+        MQTT_MESSAGES_RECEIVED.inc(topic_family(topic))
+        if topic.startswith(f'{CLUSTER_TOPIC}/'):
+            self.cluster.on_message(topic, payload)
+            return
+        # Metrics are high-volume and only feed the rollup store, so they skip command handling and logging
+        if self.metrics_store and topic_family(topic) == 'metrics':
+            bot_id = topic.split('/')[1]
+            if not self.cluster.owns(bot_id):
+                return
+            try:
+                self.metrics_store.ingest(bot_id, decode(topic, payload)[1])
+            except (ValueError, TypeError, AttributeError):
+                pass
+            return
 
-    def on_message(self, client, userdata, msg):
-        """Callback for when a PUBLISH message is received from the server"""
-        print(f'MQTT Bridge: Received message on {msg.topic}: {msg.payload.decode()}', flush=True)
-        topic_parts = msg.topic.split('/')
+        print(f'MQTT Bridge: Received message on {topic}: {payload.decode()}', flush=True)
+        topic_parts = topic.split('/')
         if len(topic_parts) < 3:
-            print(f'MQTT Bridge: Invalid topic structure: {msg.topic}', flush=True)
+            print(f'MQTT Bridge: Invalid topic structure: {topic}', flush=True)
             return
 
         bot_id = topic_parts[1]
         command = topic_parts[2]
 
         try:
-            payload = json.loads(msg.payload.decode())
+            command_payload = json.loads(payload.decode())
         except json.JSONDecodeError:
-            print(f'MQTT Bridge: Invalid JSON in message from {msg.topic}', flush=True)
+            print(f'MQTT Bridge: Invalid JSON in message from {topic}', flush=True)
             return
 
-        # Handle command asynchronously and thread-safely
-        asyncio.run_coroutine_threadsafe(self.handle_command(bot_id, command, payload), self.loop)
+        self.command_queue.append((bot_id, command, command_payload, received_at))
+        MQTT_COMMAND_QUEUE.set(len(self.command_queue))
+        self.command_ready.set()
+        if len(self.command_queue) >= self.command_queue_limit:
+            # The broker holds the backlog until commands drain
+            self.transport.hold_reading(True)
+
+    async def pump_commands(self):
+        """Hand queued commands on as in-flight slots free up"""
+        while True:
+            if not self.command_queue:
+                self.command_ready.clear()
+                await self.command_ready.wait()
+                continue
+            await self.inflight.acquire()
+            MQTT_COMMANDS_INFLIGHT.inc()
+            bot_id, command, payload, received_at = self.command_queue.popleft()
+            MQTT_COMMAND_QUEUE.set(len(self.command_queue))
+            if self.transport.reading_held and len(self.command_queue) < self.command_queue_limit // 2:
+                self.transport.hold_reading(False)
+            try:
+                self.route_command(bot_id, command, payload, received_at)
+            except Exception as e:
+                print(f'MQTT Bridge: Error routing command {command} for bot {bot_id}: {e}', flush=True)
+                self.release_command_slots(1)
+
+    def route_command(self, bot_id: str, command: str, payload: dict, received_at: float):
+        """Dispatch commands for bots this node owns; another node handles the rest"""
+        route = self.cluster.route(bot_id, command, payload, received_at)
+        if route == 'own':
+            self.dispatch_command(bot_id, command, payload, received_at)
+        elif route == 'foreign':
+            self.release_command_slots(1)
+
+    def dispatch_command(self, bot_id: str, command: str, payload: dict, received_at: Optional[float] = None):
+        """Route a command to the bot's actor, creating it on demand"""
+        if command == 'stop':
+            # A stop makes a start still waiting for host memory pointless
+            self.docker_manager.admission.cancel(bot_id)
+        actor = self.actors.get(bot_id)
+        if actor is None:
+            actor = BotCommandActor(bot_id, self.handle_command, self.release_command_slots, self.on_actor_idle)
+            self.actors[bot_id] = actor
+        actor.submit(command, payload, received_at)
+
+    def release_command_slots(self, count: int):
+        """Return in-flight slots for finished or coalesced commands"""
+        for _ in range(count):
+            self.inflight.release()
+        MQTT_COMMANDS_INFLIGHT.inc(amount=-count)
+
+    def on_actor_idle(self, bot_id: str):
+        """Forget actors with nothing left to do"""
+        actor = self.actors.get(bot_id)
+        if actor is not None and not actor.pending:
+            del self.actors[bot_id]
+
+    async def submit_command(self, bot_id: str, command: str, payload: dict):
+        """Queue a command originating in the gateway itself, waiting for an in-flight slot"""
+        await self.inflight.acquire()
+        MQTT_COMMANDS_INFLIGHT.inc()
+        self.dispatch_command(bot_id, command, payload)
+
+    def resume_bot(self, bot_id: str, record: dict):
+        """Start a running bot taken over from a node that died, with the config it last ran"""
+        config = (record.get('document') or {}).get('config', {})
+        print(f'MQTT Bridge: Resuming bot {bot_id} after takeover from node {record.get("previous") or "unknown"}', flush=True)
+        self.loop.create_task(self.submit_command(bot_id, 'start', {'config': config}))
+
+    def on_bot_lost(self, bot_id: str):
+        """Another node owns the bot now; with a Docker host per node our copy has to go"""
+        actor = self.actors.get(bot_id)
+        if actor is not None:
+            actor.clear()
+        if self.cluster.docker_scope == 'node':
+            self.loop.create_task(self.stop_lost_bot(bot_id))
+
+    async def stop_lost_bot(self, bot_id: str):
+        try:
+            await self.docker_manager.stop_bot(bot_id)
+        except Exception as e:
+            print(f'MQTT Bridge: Could not stop bot {bot_id} after losing it: {e}', flush=True)
 
     async def handle_command(self, bot_id: str, command: str, payload: dict):
         """Handle incoming MQTT commands"""
         print(f'MQTT Bridge: Handling command {command} for bot {bot_id}', flush=True)
+        accepted = False
         try:
             if command == 'start':
-                await self.handle_start(bot_id, payload)
+                accepted = await self.handle_start(bot_id, payload)
             elif command == 'stop':
-                await self.handle_stop(bot_id, payload)
+                accepted = await self.handle_stop(bot_id, payload)
             elif command == 'config':
-                await self.handle_config_update(bot_id, payload)
+                accepted = await self.handle_config_update(bot_id, payload)
         except Exception as e:
             print(f'MQTT Bridge: Error handling command {command} for bot {bot_id}: {e}', flush=True)
+        # Reconciliation must not retry a start or config that failed or was rejected; a stop is
+        # recorded regardless, so a bot whose stop failed is not brought back after a restart
+        if accepted or command == 'stop':
+            self.record_desired(bot_id, command)
+
+    def record_desired(self, bot_id: str, command: str):
+        """Remember what the bot was asked to be, locally and, in a cluster, with its lease so a successor can resume it"""
+        desired = {'start': 'running', 'stop': 'stopped'}.get(command)
+        document = self.docker_manager.bot_configs.get(bot_id) if command != 'stop' else None
+        if desired is None and document is None:
+            return
+        if self.desired_state is not None:
+            try:
+                self.desired_state.set(bot_id, desired=desired, document=document)
+            except Exception as e:
+                print(f'MQTT Bridge: Could not record desired state of bot {bot_id}: {e}', flush=True)
+        self.cluster.update_record(bot_id, desired=desired, document=document)
 
-    async def handle_start(self, bot_id: str, payload: dict):
+    async def handle_start(self, bot_id: str, payload: dict) -> bool:
         """Handle start command"""
         try:
             start_cmd = StartCommand(**payload)
             await self.docker_manager.start_bot(bot_id, start_cmd.config)
             self.publish_status(bot_id, 'running')
+            return True
+        except AdmissionRejected as e:
+            print(f'MQTT Bridge: {e}', flush=True)
+            self.publish_status(bot_id, 'rejected', e.metadata)
         except Exception as e:
             print(f'MQTT Bridge: Error starting bot {bot_id}: {e}')
             self.publish_status(bot_id, 'error', {'error': str(e)})
+        return False
 
-    async def handle_stop(self, bot_id: str, payload: dict):
+    async def handle_stop(self, bot_id: str, payload: dict) -> bool:
         """Handle stop command"""
         try:
             stop_cmd = StopCommand(**payload)
             await self.docker_manager.stop_bot(bot_id, stop_cmd.skip_order_cancellation)
             self.publish_status(bot_id, 'stopped')
+            return True
         except Exception as e:
             print(f'MQTT Bridge: Error stopping bot {bot_id}: {e}')
             self.publish_status(bot_id, 'error', {'error': str(e)})
+        return False
 
-    async def handle_config_update(self, bot_id: str, payload: dict):
+    async def handle_config_update(self, bot_id: str, payload: dict) -> bool:
         """Handle config update command"""
         try:
-            # If payload has remote_reload=True, we don't restart the container
-            # as the internal bridge client will handle it on the fly.
+            # Unchanged configs are no-ops and log settings are applied live by the in-container bridge;
+            # controller changes skip the restart only with remote_reload=True
             skip_restart = payload.get('remote_reload', False)
-            await self.docker_manager.update_bot_config(bot_id, payload, skip_restart=skip_restart)
-            self.publish_status(bot_id, 'running')
+            change = await self.docker_manager.update_bot_config(bot_id, payload, skip_restart=skip_restart)
+            self.publish_status(bot_id, 'running', {'config_change': change})
+            return True
         except Exception as e:
             print(f'MQTT Bridge: Error updating config for bot {bot_id}: {e}')
+        return False
+
+    def on_container_status(self, state: ContainerState, status: str, metadata: dict):
+        """Forward status transitions of bot containers seen on the Docker events stream"""
+        if state.kind == 'bot':
+            bot_ids = [state.bot_id]
+        elif state.kind == 'pack':
+            # A pack container crashing or restarting takes all of its bots with it
+            pack = self.docker_manager.placement.packs.get(state.bot_id)
+            bot_ids = list(pack.bots) if pack else []
+        else:
+            return
+        # Nodes sharing a Docker daemon all see the event; only the owner reports it
+        for bot_id in filter(self.cluster.owns, bot_ids):
+            self.publish_status(bot_id, status, {
+                **metadata,
+                'restart_count': state.restart_count,
+                'source': 'docker',
+            })
+
+    def publish(self, topic: str, payload, qos: int = 0, retain: bool = False) -> asyncio.Future:
+        """Queue a publish on the transport, counting messages and bytes per topic family"""
+        family = topic_family(topic)
+        MQTT_PUBLISHED.inc(family)
+        MQTT_PUBLISHED_BYTES.inc(family, amount=len(payload))
+        return self.transport.publish_nowait(topic, payload, qos=qos, retain=retain)
 
     def publish_status(self, bot_id: str, status: str, metadata: dict = None):
         """Publish bot status update"""
-        if not self.client or not self.is_connected_flag:
-            return
-
         message = {'status': status, 'timestamp': asyncio.get_event_loop().time()}
         if metadata:
             message.update(metadata)
 
-        self.client.publish(
+        # QoS 1 publishes queue while disconnected and go out after reconnecting
+        self.publish(
             f'hbot/{bot_id}/status',
             json.dumps(message),
             qos=1,
@@ -136,67 +308,50 @@ class MQTTBridge:
 
     def publish_metrics(self, bot_id: str, metrics: dict):
         """Publish bot metrics"""
-        if not self.client or not self.is_connected_flag:
-            return
-
-        self.client.publish(
-            f'hbot/{bot_id}/metrics',
-            json.dumps(metrics),
-            qos=0,
-        )
+        self.publish(*encode(f'hbot/{bot_id}/metrics', metrics), qos=0)
 
     def publish_order(self, bot_id: str, order_type: str, order_data: dict):
         """Publish order event"""
-        if not self.client or not self.is_connected_flag:
-            return
-
-        topic = f'hbot/{bot_id}/orders/{order_type}'
-        self.client.publish(topic, json.dumps(order_data), qos=1)
+        self.publish(*encode(f'hbot/{bot_id}/orders/{order_type}', order_data), qos=1)
 
     def publish_log(self, bot_id: str, level: str, message: str, metadata: dict = None):
         """Publish log message"""
-        if not self.client or not self.is_connected_flag:
-            return
-
         log_data = {'level': level, 'message': message}
         if metadata:
             log_data['metadata'] = metadata
 
-        topic = f'hbot/{bot_id}/logs/{level}'
-        self.client.publish(topic, json.dumps(log_data), qos=0)
+        self.publish(*encode(f'hbot/{bot_id}/logs/{level}', log_data), qos=0)
 
     async def start(self):
-        """Start MQTT bridge with retry logic"""
-        self.client = mqtt.Client(client_id=f'hummingbot_gateway_{os.getpid()}')
-        self.client.username_pw_set(self.mqtt_username, self.mqtt_password)
-        self.client.on_connect = self.on_connect
-        self.client.on_disconnect = self.on_disconnect
-        self.client.on_message = self.on_message
-
-        max_retries = 10
-        retry_delay = 5
-        
-        for attempt in range(1, max_retries + 1):
-            try:
-                print(f'MQTT Bridge: Connection attempt {attempt}/{max_retries} to {self.mqtt_broker}:{self.mqtt_port}', flush=True)
-                self.client.connect(self.mqtt_broker, self.mqtt_port, 60)
-                self.client.loop_start()
-                print('MQTT Bridge: Loop started', flush=True)
-                return
-            except Exception as e:
-                print(f'MQTT Bridge: Connection attempt {attempt} failed: {e}', flush=True)
-                if attempt < max_retries:
-                    await asyncio.sleep(retry_delay)
-                else:
-                    print('MQTT Bridge: Max retries reached, failed to start', flush=True)
+        """Start the MQTT transport; it connects and reconnects in the background"""
+        if self.cluster.enabled:
+            # The broker clears our lease if we vanish without saying goodbye
+            self.transport.will_set(self.cluster.node_topic(), b'', qos=1, retain=True)
+        self.transport.subscribe('hbot/+/start')
+        self.transport.subscribe('hbot/+/stop')
+        self.transport.subscribe('hbot/+/config/update')
+        if self.metrics_store:
+            # Also matches the MessagePack topics, hbot/{bot_id}/metrics/mp{version}
+            self.transport.subscribe('hbot/+/metrics/#')
+        if self.cluster.enabled:
+            self.transport.subscribe(f'{CLUSTER_TOPIC}/#', qos=1)
+        print('MQTT Bridge: Subscribing to topics: hbot/+/start, hbot/+/stop, hbot/+/config/update', flush=True)
+        self.command_task = self.loop.create_task(self.pump_commands())
+        self.transport.start()
+        self.cluster.start()
 
     async def stop(self):
         """Stop MQTT bridge"""
-        if self.client:
-            self.client.loop_stop()
-            self.client.disconnect()
-            print('MQTT Bridge: Stopped')
+        if self.is_connected():
+            await self.cluster.leave(self.docker_manager.stop_bot)
+        if self.command_task:
+            self.command_task.cancel()
+        for actor in list(self.actors.values()):
+            actor.cancel()
+        self.actors.clear()
+        await self.transport.stop()
+        print('MQTT Bridge: Stopped')
 
     def is_connected(self) -> bool:
         """Check if MQTT client is connected"""
-        return self.is_connected_flag
+        return self.transport.is_connected()
@@ -5,13 +5,33 @@ Runs inside Hummingbot containers to capture logs and run real Hummingbot proces
 
 import json
 import os
+import re
+import shutil
+import socket
 import time
+import sqlite3
 import subprocess
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import paho.mqtt.client as mqtt
 from datetime import datetime
 import yaml
 
+from bot_config import (
+    CONFIG_DOCUMENT_PATH,
+    LOG_KEYS,
+    PACK_MANIFEST_PATH,
+    build_config_document,
+    config_hash,
+    diff_documents,
+    normalize_config,
+)
+from container_metrics import ContainerMetrics
+from log_pipeline import ANSI_ESCAPE, LogLimiter, LogPipeline
+from payload_codec import PAYLOAD_ENCODING, encode
+from trade_exporter import FileWatcher, TradeExporter
+
 # Configuration from environment
 BOT_ID = os.getenv('BOT_ID', 'default')
 MQTT_BROKER = os.getenv('MQTT_BROKER', 'emqx')
@@ -19,6 +39,243 @@ MQTT_PORT = int(os.getenv('MQTT_PORT', '1883'))
 MQTT_USERNAME = os.getenv('MQTT_USERNAME', 'admin')
 MQTT_PASSWORD = os.getenv('MQTT_PASSWORD', 'public')
 
+# Warm pool containers start without a bot and wait for the gateway to drop this file in
+WARM_POOL = os.getenv('WARM_POOL', 'false').lower() == 'true'
+ASSIGNMENT_PATH = '/hummingbot/conf/assignment.json'
+# Pack containers host several V2 bots as controller groups of one Hummingbot process
+PACK_ID = os.getenv('PACK_ID')
+
+TRADES_DB_PATH = '/home/hummingbot/data/hummingbot_trades.sqlite'
+# Last trade id the broker acknowledged, so a bridge restart resumes instead of republishing history
+TRADE_CURSOR_PATH = '/home/hummingbot/data/trade_export_cursor.json'
+# Which packed bot placed each order, written by the V2 executor
+ORDER_GROUPS_PATH = os.getenv('ORDER_GROUPS_DB', '/home/hummingbot/data/pack_order_groups.sqlite')
+# Where the V2 generic executor accepts pushed controller config updates
+EXECUTOR_CONTROL_SOCKET = os.getenv('EXECUTOR_CONTROL_SOCKET', '/tmp/v2_generic_executor.sock')
+# Collected by the gateway when a backtest container exits
+BACKTEST_RESULT_PATH = '/hummingbot/data/backtest_result.json'
+
+
+def load_config_document():
+    """The typed config document the gateway delivered, or None for containers configured through env vars"""
+    try:
+        with open(CONFIG_DOCUMENT_PATH, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def save_config_document(document):
+    global CONFIG_DOCUMENT
+    tmp_path = f'{CONFIG_DOCUMENT_PATH}.tmp'
+    os.makedirs(os.path.dirname(CONFIG_DOCUMENT_PATH), exist_ok=True)
+    with open(tmp_path, 'w') as f:
+        json.dump(document, f)
+    os.replace(tmp_path, CONFIG_DOCUMENT_PATH)
+    CONFIG_DOCUMENT = document
+
+
+CONFIG_DOCUMENT = load_config_document()
+
+
+def get_config_value(key, default=None):
+    """Typed bot config value from the config document, falling back to CONFIG_* environment variables"""
+    if CONFIG_DOCUMENT is not None and key in CONFIG_DOCUMENT['config']:
+        return CONFIG_DOCUMENT['config'][key]
+    return os.getenv(f'CONFIG_{key.upper()}', default)
+
+
+def get_config(key, default=""):
+    """Bot config value as a string, the way CONFIG_* environment variables deliver it"""
+    value = get_config_value(key, default)
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+def load_pack_manifest():
+    """The bots a pack container hosts, as written by the gateway"""
+    try:
+        with open(PACK_MANIFEST_PATH, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        # Missing, or caught halfway through a gateway write
+        return None
+
+
+def wait_for_assignment():
+    """Block a warm pool container until the gateway assigns it a bot"""
+    global BOT_ID
+    print("MQTT Bridge Client: Warm and waiting for a bot assignment...", flush=True)
+    while True:
+        try:
+            with open(ASSIGNMENT_PATH, 'r') as f:
+                assignment = json.load(f)
+            break
+        except (FileNotFoundError, json.JSONDecodeError):
+            # Not delivered yet, or still being written
+            time.sleep(0.1)
+
+    BOT_ID = assignment['bot_id']
+    os.environ['BOT_ID'] = BOT_ID
+    save_config_document(assignment.get('document') or build_config_document(BOT_ID, assignment.get('config', {})))
+    print(f"MQTT Bridge Client: Assigned to bot {BOT_ID}", flush=True)
+
+
+# A standard Hummingbot log record; the first one means the app is past its startup screens
+HUMMINGBOT_LOG_RECORD = re.compile(r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3} - \d+ - ')
+
+
+class WelcomeScreenFeeder:
+    """
+    Sends Enters to a starting Hummingbot process to skip the "Ok" and "Welcome" screens. When its output is
+    observed, an Enter goes out as soon as a screen has finished drawing and feeding stops at the first log record;
+    otherwise Enters follow the fixed schedule (5s, then every 2s).
+    """
+
+    FIRST_DELAY = 5
+    INTERVAL = 2
+    # Quiet time after which a screen counts as drawn
+    SETTLE = 0.3
+    MAX_ENTERS = 5
+
+    def __init__(self, process):
+        self.process = process
+        self.output = threading.Event()
+        self.ready = threading.Event()
+        self.last_output = 0.0
+
+    def observe(self, line):
+        if self.ready.is_set():
+            return
+        if HUMMINGBOT_LOG_RECORD.match(ANSI_ESCAPE.sub('', line)):
+            self.ready.set()
+        self.last_output = time.monotonic()
+        self.output.set()
+
+    def run(self):
+        for sent in range(self.MAX_ENTERS):
+            if self.output.wait(self.FIRST_DELAY if sent == 0 else self.INTERVAL):
+                while time.monotonic() - self.last_output < self.SETTLE and not self.ready.is_set():
+                    time.sleep(0.05)
+                self.output.clear()
+            if self.ready.is_set() or not self.process or self.process.poll() is not None:
+                return
+            try:
+                self.process.stdin.write("\n")
+                self.process.stdin.flush()
+            except Exception:
+                return
+
+
+def summarize_trades(config_file_path=None):
+    """Aggregate fills from the Hummingbot trades DB, optionally for a single strategy config"""
+    summary = {
+        'trades': 0,
+        'buys': 0,
+        'sells': 0,
+        'base_volume': 0.0,
+        'quote_volume': 0.0,
+        'net_base': 0.0,
+        'net_quote': 0.0,
+    }
+    if not os.path.exists(TRADES_DB_PATH):
+        return summary
+    query = "SELECT trade_type, price, amount FROM trades"
+    params = ()
+    if config_file_path:
+        query += " WHERE config_file_path = ?"
+        params = (config_file_path,)
+    conn = sqlite3.connect(TRADES_DB_PATH)
+    try:
+        for trade_type, price, amount in conn.execute(query, params):
+            price, amount = float(price), float(amount)
+            is_buy = str(trade_type).upper() == 'BUY'
+            summary['trades'] += 1
+            summary['buys' if is_buy else 'sells'] += 1
+            summary['base_volume'] += amount
+            summary['quote_volume'] += amount * price
+            summary['net_base'] += amount if is_buy else -amount
+            summary['net_quote'] += -amount * price if is_buy else amount * price
+    finally:
+        conn.close()
+    return summary
+
+
+def apply_controller_overrides(controllers_config, overrides):
+    """Apply sweep overrides keyed '<controller_id>.<field>' ('*' targets every controller)"""
+    for key, value in overrides.items():
+        controller_id, _, field_name = key.partition('.')
+        if not field_name:
+            continue
+        for controller in controllers_config.get('controllers', []):
+            if controller_id == '*' or str(controller.get('id')) == controller_id:
+                controller[field_name] = value
+    return controllers_config
+
+
+class LogBatcher:
+    """Buffers log entries and publishes them as one framed message per batch"""
+
+    def __init__(self, client, bot_id, max_delay_ms=250, max_bytes=32 * 1024, compress=False, encoding='json'):
+        self.client = client
+        self.bot_id = bot_id
+        self.max_delay = max_delay_ms / 1000
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.encoding = encoding
+        self.lock = threading.Lock()
+        self.entries = []
+        self.size = 0
+        self.seq = 0
+        # Lets consumers tell a bridge restart (new epoch, seq from 0) apart from lost batches
+        self.epoch = int(time.time() * 1000)
+        self.flusher = threading.Thread(target=self.flush_periodically, daemon=True)
+        self.flusher.start()
+
+    def add(self, log_data):
+        with self.lock:
+            self.entries.append(log_data)
+            self.size += len(log_data['message']) + 64
+            if self.size < self.max_bytes:
+                return
+            seq, batch = self.take()
+        self.publish(seq, batch)
+
+    def take(self):
+        """Detach the buffered entries; the sequence number is assigned under the same lock"""
+        batch, self.entries, self.size = self.entries, [], 0
+        seq = self.seq
+        if batch:
+            self.seq += 1
+        return seq, batch
+
+    def flush(self):
+        with self.lock:
+            seq, batch = self.take()
+        self.publish(seq, batch)
+
+    def flush_periodically(self):
+        while True:
+            time.sleep(self.max_delay)
+            self.flush()
+
+    def publish(self, seq, batch):
+        if not batch:
+            return
+        frame = {
+            'v': 1,
+            'epoch': self.epoch,
+            'seq': seq,
+            'count': len(batch),
+            'lines': batch,
+        }
+        topic = f"hbot/{self.bot_id}/logs/{'batchz' if self.compress else 'batch'}"
+        self.client.publish(*encode(topic, frame, self.encoding), qos=0)
+
+
 class HummingbotMQTTBridge:
     def __init__(self):
         self.client = mqtt.Client(client_id=f'hummingbot_bridge_{BOT_ID}')
@@ -27,6 +284,67 @@ class HummingbotMQTTBridge:
         self.client.on_message = self.on_message
         self.is_connected = False
         self.process = None
+        self.log_pipeline = LogPipeline.default(get_config('log_drop'))
+        self.log_limiter = LogLimiter(
+            limits=json.loads(get_config('log_limits', '{}')),
+            sample_every=int(get_config('log_sample_every', '10')),
+        )
+        self.log_stats_interval = float(get_config('log_stats_interval', '30'))
+        self.log_stats_thread = threading.Thread(target=self.report_log_drops, daemon=True)
+        self.log_stats_thread.start()
+
+        # Optional batched log mode; per-line publishing stays the default
+        self.log_batchers = {}
+        self.log_batch_settings = None
+        if get_config('log_batch', 'false').lower() == 'true':
+            self.log_batch_settings = {
+                'max_delay_ms': int(get_config('log_batch_ms', '250')),
+                'max_bytes': int(get_config('log_batch_kb', '32')) * 1024,
+                'compress': get_config('log_batch_compress', 'false').lower() == 'true',
+            }
+        # 'msgpack' publishes metrics, logs and trades in the compact binary schema of payload_codec
+        self.payload_encoding = get_config('payload_encoding', PAYLOAD_ENCODING)
+
+        # Pack mode: the gateway's manifest says which bots this container hosts
+        self.pack = load_pack_manifest() if PACK_ID else None
+        # Guards self.pack between the MQTT thread and the manifest watcher
+        self.pack_lock = threading.RLock()
+        # Packed bots whose controller group still has to be pushed into the executor
+        self.unapplied = set()
+        # Controller id -> packed bot for ids only one packed bot uses, and a pattern finding them in log lines
+        self.controller_owners = {}
+        self.controller_pattern = None
+
+    def bot_ids(self):
+        """Bots whose topics this bridge serves"""
+        if self.pack is None:
+            return [BOT_ID]
+        with self.pack_lock:
+            return list(self.pack['bots'])
+
+    def current_document(self, bot_id):
+        if self.pack is None:
+            return CONFIG_DOCUMENT
+        with self.pack_lock:
+            return self.pack['bots'].get(bot_id)
+
+    def store_document(self, bot_id, document):
+        """Record the config a bot now runs with; packed bots keep it in memory, the gateway owns the manifest"""
+        if self.pack is None:
+            save_config_document(document)
+            return
+        with self.pack_lock:
+            if bot_id in self.pack['bots']:
+                self.pack['bots'][bot_id] = document
+                self.write_pack_controllers()
+
+    def log_batcher(self, bot_id):
+        batcher = self.log_batchers.get(bot_id)
+        if batcher is None:
+            batcher = self.log_batchers[bot_id] = LogBatcher(
+                self.client, bot_id, encoding=self.payload_encoding, **self.log_batch_settings,
+            )
+        return batcher
 
     def on_connect(self, client, userdata, flags, rc):
         if rc == 0:
@@ -34,8 +352,9 @@ class HummingbotMQTTBridge:
             self.is_connected = True
             self.publish_status('running')
             # Subscribe to remote config updates
-            self.client.subscribe(f'hbot/{BOT_ID}/config/update')
-            print(f'MQTT Bridge Client: Subscribed to hbot/{BOT_ID}/config/update', flush=True)
+            for bot_id in self.bot_ids():
+                self.client.subscribe(f'hbot/{bot_id}/config/update')
+                print(f'MQTT Bridge Client: Subscribed to hbot/{bot_id}/config/update', flush=True)
         else:
             print(f'MQTT Bridge Client: Failed to connect, return code {rc}', flush=True)
 
@@ -45,83 +364,141 @@ class HummingbotMQTTBridge:
             print(f"MQTT Bridge Client: Received message on {msg.topic}", flush=True)
             if msg.topic.endswith('/config/update'):
                 payload = json.loads(msg.payload.decode())
-                self.handle_remote_config(payload)
+                self.handle_remote_config(payload, msg.topic.split('/')[1])
         except Exception as e:
             print(f"MQTT Bridge Client: Error handling message: {e}", flush=True)
 
-    def handle_remote_config(self, config: dict):
+    def handle_remote_config(self, config: dict, bot_id=None):
         """Handle on-the-fly configuration updates"""
-        print(f"MQTT Bridge Client: Applying remote config update: {config}", flush=True)
+        bot_id = bot_id or BOT_ID
+        print(f"MQTT Bridge Client: Applying remote config update for {bot_id}: {config}", flush=True)
+        # Packed bots share the process output; the tag routes these lines to the bot's own log topics
+        tag = f"[{bot_id}] " if self.pack is not None else ""
         try:
-            # For V2, we save to a special 'remote_config.yml'
-            # The executor script can watch this file or we can send a signal
-            with open('/hummingbot/conf/remote_config.yml', 'w') as f:
-                yaml.dump(config, f)
-            
-            # Also update the persistent config for the next restart
-            # (Note: In a real prod environment, we'd be more careful here)
-            if os.path.exists('/hummingbot/conf/controllers_config.yml'):
-                with open('/hummingbot/conf/controllers_config.yml', 'w') as f:
-                    yaml.dump(config, f)
-            
-            self.publish_log("info", "Remote configuration updated successfully.")
+            normalized = normalize_config(config)
+            document = self.current_document(bot_id)
+            current = document['config'] if document else None
+            merged = {**(current or {}), **normalized}
+            if current is not None and config_hash(merged) == document['hash']:
+                # Retried or duplicate update: nothing to write and nothing to push into the executor
+                self.client.publish(f'hbot/{bot_id}/config/applied', json.dumps({'ok': True, 'noop': True}), qos=1)
+                return
+            if LOG_KEYS & normalized.keys():
+                # Applied by the bridge from the merged config, so a partial update keeps the saved settings
+                self.configure_log_limiter(merged)
+                self.publish_log("info", f"{tag}Log limits updated.")
+            if 'controllers' not in normalized:
+                self.store_document(bot_id, build_config_document(bot_id, merged))
+                if normalized.keys() - LOG_KEYS:
+                    self.publish_log("info", f"{tag}Remote configuration saved; it takes effect on the next restart.")
+                return
+            controllers = normalized['controllers']
+
+            if self.pack is None:
+                # Persist first so a restarted executor starts from the latest config
+                with open('/hummingbot/conf/remote_config.yml', 'w') as f:
+                    yaml.dump(controllers, f)
+                
+                # Also update the persistent config for the next restart
+                # (Note: In a real prod environment, we'd be more careful here)
+                if os.path.exists('/hummingbot/conf/controllers_config.yml'):
+                    with open('/hummingbot/conf/controllers_config.yml', 'w') as f:
+                        yaml.dump(controllers, f)
+
+            result = self.push_controller_config(controllers, group=bot_id if self.pack is not None else None)
+            self.client.publish(f'hbot/{bot_id}/config/applied', json.dumps(result), qos=1)
+            if result.get('ok'):
+                # Only a config the executor actually runs counts as current; a failed push is retried in full
+                self.store_document(bot_id, build_config_document(bot_id, merged))
+                self.publish_log("info", f"{tag}Remote configuration updated successfully.")
+            else:
+                self.publish_log("warning", f"{tag}Remote configuration saved but not applied live: {result.get('error')}")
         except Exception as e:
-            self.publish_log("error", f"Failed to apply remote config: {e}")
+            self.publish_log("error", f"{tag}Failed to apply remote config: {e}")
+
+    def configure_log_limiter(self, config: dict):
+        limits = config.get('log_limits')
+        if isinstance(limits, str):
+            limits = json.loads(limits) if limits.strip() else None
+        sample_every = config.get('log_sample_every')
+        self.log_limiter.configure(limits, int(sample_every) if sample_every is not None else None)
 
-    def publish_status(self, status: str):
+    def push_controller_config(self, config: dict, group=None) -> dict:
+        """Send a controllers config to the running V2 executor and wait until it has been applied"""
+        started = time.perf_counter()
+        result = {'timestamp': time.time()}
+        request = {'config': config}
+        if group:
+            request['group'] = group
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+                connection.settimeout(35)
+                connection.connect(EXECUTOR_CONTROL_SOCKET)
+                connection.sendall((json.dumps(request) + "\n").encode())
+                result.update(json.loads(connection.makefile('r').readline()))
+        except (OSError, ValueError) as e:
+            # No V2 executor listening (PMM strategy, or Hummingbot still starting)
+            result.update({'ok': False, 'error': f'Executor not reachable: {e}'})
+        result['latency_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        return result
+
+    def publish_status(self, status: str, bot_id=None):
+        """Publish a status for one bot, or for every bot this container hosts"""
         if not self.is_connected: return
-        self.client.publish(
-            f'hbot/{BOT_ID}/status',
-            json.dumps({'status': status, 'timestamp': time.time()}),
-            qos=1,
-            retain=True,
-        )
+        for target in [bot_id] if bot_id else self.bot_ids():
+            self.client.publish(
+                f'hbot/{target}/status',
+                json.dumps({'status': status, 'timestamp': time.time()}),
+                qos=1,
+                retain=True,
+            )
 
-    def publish_log(self, level: str, message: str):
+    def publish_log(self, level, message: str):
+        """Publish one log line; a level of None lets the pipeline classify raw process output"""
         if not self.is_connected: return
-        
-        # Strip ANSI escape codes (colors, etc.)
-        import re
-        ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-        clean_message = ansi_escape.sub('', message).strip()
-        
-        if not clean_message: return
+        log_data = self.log_pipeline.process(message, level)
+        if log_data is None: return
+        for record in self.log_limiter.admit(log_data):
+            self.emit_log(record)
 
-        # Filter out ASCII art and box drawing (Welcome screen noise)
-        if any(c in clean_message for c in '█╗╝╚═║╔╝'):
-            return
-        
-        # Filter out shell error messages that we know are harmless (from yes | script)
-        if 'Broken pipe' in clean_message and 'yes' in clean_message:
-            return
-        if '/bin/bash:' in clean_message:
-            return
+    def log_targets(self, message: str):
+        """
+        Packed bots get the lines tagged with their group or naming one of their controllers; other process
+        output concerns all of them
+        """
+        bot_ids = self.bot_ids()
+        if self.pack is None:
+            return bot_ids
+        tagged = [bot_id for bot_id in bot_ids if f'[{bot_id}]' in message]
+        if not tagged and self.controller_pattern is not None:
+            tagged = list({self.controller_owners[controller_id] for controller_id in self.controller_pattern.findall(message)})
+        return tagged or bot_ids
 
-        # Try to parse if message is already JSON
-        try:
-            if clean_message.startswith('{') and clean_message.endswith('}'):
-                data = json.loads(clean_message)
-                if isinstance(data, dict):
-                    msg = data.get('message', '').strip()
-                    if msg:
-                        clean_message = msg
-                    if 'level' in data:
-                        level = data['level'].lower()
-        except:
-            pass
-
-        if not clean_message or len(clean_message) < 2: return
-
-        log_data = {
-            'level': level,
-            'message': clean_message,
-            'timestamp': datetime.utcnow().isoformat()
-        }
-        self.client.publish(
-            f'hbot/{BOT_ID}/logs/{level}',
-            json.dumps(log_data),
-            qos=0
-        )
+    def emit_log(self, log_data):
+        for bot_id in self.log_targets(log_data['message']):
+            if self.log_batch_settings:
+                self.log_batcher(bot_id).add(log_data)
+                continue
+            self.client.publish(*encode(f'hbot/{bot_id}/logs/{log_data["level"]}', log_data, self.payload_encoding), qos=0)
+
+    def report_log_drops(self):
+        """Publish repeat summaries and what the log limiter suppressed, so the loss is visible"""
+        while True:
+            time.sleep(self.log_stats_interval)
+            if not self.is_connected:
+                continue
+            summary, counters = self.log_limiter.flush()
+            if summary:
+                self.emit_log(summary)
+            dropped = sum(counters['dropped'].values())
+            if dropped or counters['collapsed']:
+                self.emit_log({
+                    'level': 'warning',
+                    'message': f"Log limiter dropped {dropped} line(s) and collapsed {counters['collapsed']} repeat(s) "
+                               f"in the last {self.log_stats_interval:g}s",
+                    'timestamp': self.log_pipeline.timestamp(),
+                    'metadata': counters,
+                })
 
     def start_mqtt(self):
         try:
@@ -130,55 +507,122 @@ class HummingbotMQTTBridge:
         except Exception as e:
             print(f'MQTT Bridge Client: Failed to connect to broker: {e}', flush=True)
 
+    def build_controllers_config(self):
+        """V2 controllers config; env-configured containers deliver it JSON-encoded in CONFIG_CONTROLLERS"""
+        controllers = get_config_value('controllers', {'controllers': []})
+        return json.loads(controllers) if isinstance(controllers, str) else controllers
+
+    def build_pmm_config(self):
+        """Basic PMM configuration (legacy/fallback)"""
+        return {
+            'template_version': 10,
+            'strategy': 'pure_market_making',
+            'exchange': get_config('exchange', 'binance'),
+            'market': get_config('market', 'BTC-USDT'),
+            'bid_spread': float(get_config('bid_spread', '0.1')),
+            'ask_spread': float(get_config('ask_spread', '0.1')),
+            'order_amount': float(get_config('order_amount', '0.01')),
+            'order_refresh_time': 30,
+            'max_order_age': 1800,
+            'order_refresh_tolerance_pct': 0,
+            'filled_order_delay': 10,
+            'inventory_skew_enabled': False,
+            'inventory_target_base_pct': 50,
+            'inventory_range_multiplier': 1,
+            'filled_order_replenish_wait_time': 10,
+            'enable_order_filled_stop_cancellation': False,
+            'order_optimization_enabled': False,
+            'ask_order_optimization_depth': 0,
+            'bid_order_optimization_depth': 0,
+            'add_transaction_costs': False,
+            'kill_switch_enabled': False,
+            'kill_switch_rate': -100,
+            'ping_pong_enabled': False,
+            'ping_pong_stop_threshold': 0,
+        }
+
+    def write_pack_controllers(self):
+        """One controller group per packed bot, read by the V2 executor when it (re)starts"""
+        groups = {
+            bot_id: document['config'].get('controllers', {'controllers': []})
+            for bot_id, document in self.pack['bots'].items()
+        }
+        with open('/hummingbot/conf/controllers_config.yml', 'w') as f:
+            yaml.dump({'groups': groups}, f)
+        owners = {}
+        for bot_id, controllers in groups.items():
+            for controller in controllers.get('controllers', []):
+                # Generated ids (controller_0, ...) repeat across bots and say nothing about the owner
+                controller_id = controller.get('id') or controller.get('controller_id')
+                if controller_id:
+                    owners.setdefault(str(controller_id), set()).add(bot_id)
+        self.controller_owners = {controller_id: bots.pop() for controller_id, bots in owners.items() if len(bots) == 1}
+        # Longest first, so an id is not matched as the prefix of a longer one
+        alternatives = '|'.join(re.escape(controller_id) for controller_id in sorted(self.controller_owners, key=len, reverse=True))
+        self.controller_pattern = re.compile(rf'(?<![\w-])(?:{alternatives})(?![\w-])') if alternatives else None
+
+    def sync_pack(self, manifest):
+        """Bring the hosted bots in line with a new gateway manifest"""
+        with self.pack_lock:
+            diff = diff_documents(self.pack['bots'], manifest['bots'])
+            self.pack = manifest
+            if not any(diff.values()):
+                return
+            print(f"MQTT Bridge Client: Pack changed: {diff}", flush=True)
+            self.write_pack_controllers()
+            for bot_id in diff['removed']:
+                self.client.unsubscribe(f'hbot/{bot_id}/config/update')
+            for bot_id in diff['added']:
+                self.client.subscribe(f'hbot/{bot_id}/config/update')
+            self.unapplied.update(diff['added'], diff['removed'], diff['changed'])
+        self.push_groups()
+
+    def push_groups(self):
+        """Push pending controller groups into the executor; a group of a removed bot is pushed empty"""
+        for bot_id in sorted(self.unapplied):
+            document = self.current_document(bot_id)
+            controllers = document['config'].get('controllers', {'controllers': []}) if document else {'controllers': []}
+            result = self.push_controller_config(controllers, group=bot_id)
+            if not result.get('ok'):
+                # Executor still starting or busy; retried on the next manifest check
+                continue
+            self.unapplied.discard(bot_id)
+            self.publish_status('running' if document else 'stopped', bot_id)
+            if document:
+                self.client.publish(f'hbot/{bot_id}/config/applied', json.dumps(result), qos=1)
+
+    def watch_pack(self):
+        """Follow gateway manifest writes for the lifetime of the Hummingbot process"""
+        watcher = FileWatcher(os.path.dirname(PACK_MANIFEST_PATH), [os.path.basename(PACK_MANIFEST_PATH)])
+        while self.process and self.process.poll() is None:
+            if watcher.wait(5):
+                manifest = load_pack_manifest()
+                if manifest is not None:
+                    self.sync_pack(manifest)
+            elif self.unapplied:
+                self.push_groups()
+
     def generate_config(self):
         """Generate Hummingbot configuration files based on environment variables"""
         print("MQTT Bridge Client: Generating configuration files...", flush=True)
-        
-        # Helper to get config from ENV
-        def get_config(key, default=""):
-            return os.getenv(f'CONFIG_{key.upper()}', default)
 
-        strategy_type = get_config('strategy_type', 'pure_market_making')
+        strategy_type = 'v2' if self.pack is not None else get_config('strategy_type', 'pure_market_making')
         os.makedirs('/hummingbot/conf', exist_ok=True)
 
-        if strategy_type == 'v2':
+        if self.pack is not None:
+            self.write_pack_controllers()
+            print(f"MQTT Bridge Client: Pack config generated for {len(self.pack['bots'])} bot(s)", flush=True)
+        elif strategy_type == 'v2':
             # V2 Controller-based configuration
-            controllers_json = get_config('controllers', '{"controllers": []}')
             try:
-                controllers_config = json.loads(controllers_json)
+                controllers_config = self.build_controllers_config()
                 with open('/hummingbot/conf/controllers_config.yml', 'w') as f:
                     yaml.dump(controllers_config, f)
                 print("MQTT Bridge Client: V2 Controllers config generated", flush=True)
             except Exception as e:
                 print(f"MQTT Bridge Client: Error parsing V2 controllers JSON: {e}", flush=True)
         else:
-            # Basic PMM configuration (legacy/fallback)
-            strategy_config = {
-                'template_version': 10,
-                'strategy': 'pure_market_making',
-                'exchange': get_config('exchange', 'binance'),
-                'market': get_config('market', 'BTC-USDT'),
-                'bid_spread': float(get_config('bid_spread', '0.1')),
-                'ask_spread': float(get_config('ask_spread', '0.1')),
-                'order_amount': float(get_config('order_amount', '0.01')),
-                'order_refresh_time': 30,
-                'max_order_age': 1800,
-                'order_refresh_tolerance_pct': 0,
-                'filled_order_delay': 10,
-                'inventory_skew_enabled': False,
-                'inventory_target_base_pct': 50,
-                'inventory_range_multiplier': 1,
-                'filled_order_replenish_wait_time': 10,
-                'enable_order_filled_stop_cancellation': False,
-                'order_optimization_enabled': False,
-                'ask_order_optimization_depth': 0,
-                'bid_order_optimization_depth': 0,
-                'add_transaction_costs': False,
-                'kill_switch_enabled': False,
-                'kill_switch_rate': -100,
-                'ping_pong_enabled': False,
-                'ping_pong_stop_threshold': 0,
-            }
+            strategy_config = self.build_pmm_config()
             with open('/hummingbot/conf/conf_strategy.yml', 'w') as f:
                 yaml.dump(strategy_config, f)
             print("MQTT Bridge Client: PMM strategy config generated", flush=True)
@@ -204,7 +648,7 @@ class HummingbotMQTTBridge:
         password = "admin"
         os.environ['HUMMINGBOT_PASSPHRASE'] = password
         
-        strategy_type = os.getenv('CONFIG_STRATEGY_TYPE', 'pure_market_making')
+        strategy_type = 'v2' if self.pack is not None else get_config('strategy_type', 'pure_market_making')
         
         is_backtest = get_config('backtest', 'false').lower() == 'true'
         
@@ -212,6 +656,10 @@ class HummingbotMQTTBridge:
             # Backtest mode
             start_date = get_config('backtest_start', '2023-01-01')
             end_date = get_config('backtest_end', '2023-01-02')
+            if get_config('sweep'):
+                self.run_sweep(strategy_type, password, start_date, end_date)
+                self.publish_status('stopped')
+                return
             if strategy_type == 'v2':
                 # V2 Backtest (requires special script or native support)
                 hbot_cmd = f"/opt/conda/envs/hummingbot/bin/python /home/hummingbot/bin/hummingbot.py --password {password} --script v2_generic_executor.py --backtest --start_date {start_date} --end_date {end_date}"
@@ -239,81 +687,55 @@ class HummingbotMQTTBridge:
                 cwd="/hummingbot"
             )
 
-            # Thread to send initial Enters to skip "Ok" and "Welcome" screens
-            import threading
-            import sqlite3
-            import psutil
-            
-            def feeder():
-                # Wait for bot to initialize
-                time.sleep(5)
-                # Send 5 Enters with intervals to pass welcome screens
-                for i in range(5):
-                    if self.process and self.process.poll() is None:
-                        try:
-                            self.process.stdin.write("\n")
-                            self.process.stdin.flush()
-                        except:
-                            break
-                        time.sleep(2)
-            
+            # Thread to send initial Enters to skip "Ok" and "Welcome" screens, paced by the output it sees
+            welcome_feeder = WelcomeScreenFeeder(self.process)
+
             def metrics_reporter():
-                last_trade_id = 0
-                db_path = "/home/hummingbot/data/hummingbot_trades.sqlite"
-                
+                container_metrics = ContainerMetrics()
+                interval = float(get_config('metrics_interval', '10'))
                 while self.process and self.process.poll() is None:
                     try:
-                        # 1. Report System Metrics
-                        cpu_pct = psutil.cpu_percent()
-                        mem = psutil.virtual_memory()
-                        self.publish_log("metrics", json.dumps({
-                            "cpu_pct": cpu_pct,
-                            "mem_pct": mem.percent,
-                            "timestamp": datetime.utcnow().isoformat()
-                        }))
-                        
-                        # 2. Scrape Trades from DB (if exists)
-                        if os.path.exists(db_path):
-                            conn = sqlite3.connect(db_path)
-                            c = conn.cursor()
-                            # Fetch new trades
-                            c.execute("SELECT id, market, symbol, base_asset, quote_asset, \
-                                       order_type, trade_type, price, amount, timestamp \
-                                       FROM trades WHERE id > ? ORDER BY id ASC", (last_trade_id,))
-                            trades = c.fetchall()
-                            for t in trades:
-                                trade_data = {
-                                    "id": t[0], "market": t[1], "symbol": t[2],
-                                    "base": t[3], "quote": t[4], "order_type": t[5],
-                                    "trade_type": t[6], "price": t[7], "amount": t[8],
-                                    "ts": t[9]
-                                }
-                                self.client.publish(f"hbot/{BOT_ID}/trades", json.dumps(trade_data))
-                                last_trade_id = t[0]
-                            conn.close()
+                        payload = container_metrics.sample(self.process.pid)
+                        payload['timestamp'] = datetime.utcnow().isoformat()
+                        bot_ids = self.bot_ids()
+                        if self.pack is not None:
+                            # Resources of a pack are shared; consumers can divide by the bot count
+                            payload['pack'] = {'pack_id': PACK_ID, 'bots': len(bot_ids)}
+                        if self.is_connected:
+                            # Encoded once; packed bots only differ in the topic
+                            topic, message = encode('hbot/%s/metrics', payload, self.payload_encoding)
+                            for bot_id in bot_ids:
+                                self.client.publish(topic % bot_id, message, qos=0)
                     except Exception as e:
-                        print(f"Metrics/Trades error: {e}")
-                    
-                    time.sleep(10)
+                        print(f"Metrics error: {e}")
+                    time.sleep(interval)
 
-            self.feeder_thread = threading.Thread(target=feeder, daemon=True)
+            self.feeder_thread = threading.Thread(target=welcome_feeder.run, daemon=True)
             self.feeder_thread.start()
             
             self.metrics_thread = threading.Thread(target=metrics_reporter, daemon=True)
             self.metrics_thread.start()
 
+            if self.pack is not None:
+                self.pack_thread = threading.Thread(target=self.watch_pack, daemon=True)
+                self.pack_thread.start()
+
+            trade_exporter = TradeExporter(
+                self.client, BOT_ID, TRADES_DB_PATH, TRADE_CURSOR_PATH, encoding=self.payload_encoding,
+                order_groups_path=ORDER_GROUPS_PATH if self.pack is not None else None,
+            )
+            trade_exporter.start()
+
             for line in self.process.stdout:
+                welcome_feeder.observe(line)
                 sys.stdout.write(line)
                 sys.stdout.flush()
-                # Determine log level
-                level = 'info'
-                line_lower = line.lower()
-                if 'error' in line_lower: level = 'error'
-                elif 'warning' in line_lower: level = 'warning'
-                
-                self.publish_log(level, line)
+                self.publish_log(None, line)
 
             self.process.wait()
+            trade_exporter.stop()
+            if is_backtest:
+                self.write_backtest_result(self.process.returncode, start_date, end_date)
             self.publish_status('stopped')
             print(f"MQTT Bridge Client: Bot process exited with code {self.process.returncode}", flush=True)
         except Exception as e:
@@ -322,14 +744,105 @@ class HummingbotMQTTBridge:
             self.publish_log('error', error_msg)
             self.publish_status('failed')
 
+    def write_backtest_result(self, exit_code, start_date, end_date):
+        """Summarize the trades of a finished backtest for the gateway to collect"""
+        try:
+            result = {
+                'bot_id': BOT_ID,
+                'exit_code': exit_code,
+                'start_date': start_date,
+                'end_date': end_date,
+                **summarize_trades(),
+            }
+            self.write_result_file(result)
+            print(f"MQTT Bridge Client: Backtest result written ({result['trades']} trades)", flush=True)
+        except Exception as e:
+            print(f"MQTT Bridge Client: Failed to write backtest result: {e}", flush=True)
+
+    def write_result_file(self, result):
+        os.makedirs(os.path.dirname(BACKTEST_RESULT_PATH), exist_ok=True)
+        with open(BACKTEST_RESULT_PATH, 'w') as f:
+            json.dump(result, f)
+
+    def run_sweep(self, strategy_type, password, start_date, end_date):
+        """Backtest every point of a parameter sweep in parallel, inside this one container"""
+        # Each point is its own Hummingbot process and loads the history itself: the points
+        # share the container and its startup, not the loaded data. Running them as
+        # controllers of one process would make them trade against one paper balance.
+        points = json.loads(get_config('sweep', '[]'))
+        workers = max(1, int(get_config('sweep_workers', str(os.cpu_count() or 1))))
+        point_timeout = float(get_config('sweep_point_timeout', '3600'))
+        print(f"MQTT Bridge Client: Running sweep of {len(points)} points on {workers} workers", flush=True)
+
+        def run_point(index, params):
+            env = dict(os.environ)
+            if strategy_type == 'v2':
+                config_path = f'/hummingbot/conf/controllers_config_{index}.yml'
+                with open(config_path, 'w') as f:
+                    yaml.dump(apply_controller_overrides(self.build_controllers_config(), params), f)
+                # Trades are attributed by strategy file, so each point runs its own copy of the script
+                config_file = f'v2_sweep_{index}.py'
+                shutil.copyfile('/hummingbot/scripts/v2_generic_executor.py', f'/hummingbot/scripts/{config_file}')
+                env['CONTROLLERS_CONFIG_PATH'] = config_path
+                # Sweep points never receive live updates, and must not fight over the control socket
+                env['EXECUTOR_CONTROL_SOCKET'] = ''
+                hbot_cmd = f"/opt/conda/envs/hummingbot/bin/python /home/hummingbot/bin/hummingbot.py --password {password} --script {config_file} --backtest --start_date {start_date} --end_date {end_date}"
+            else:
+                config_file = f'conf_strategy_{index}.yml'
+                with open(f'/hummingbot/conf/{config_file}', 'w') as f:
+                    yaml.dump({**self.build_pmm_config(), **params}, f)
+                hbot_cmd = f"/opt/conda/envs/hummingbot/bin/python /home/hummingbot/bin/hummingbot.py --password {password} --strategy pure_market_making --config {config_file} --backtest --start_date {start_date} --end_date {end_date}"
+
+            with open(f'/hummingbot/logs/sweep_{index}.log', 'w') as log_file:
+                process = subprocess.Popen(
+                    ["script", "-q", "-e", "-c", hbot_cmd, "/dev/null"],
+                    stdout=log_file,
+                    stderr=subprocess.STDOUT,
+                    stdin=subprocess.PIPE,
+                    text=True,
+                    cwd="/hummingbot",
+                    env=env,
+                )
+                # Output goes to the point's log file, so the screens are passed on the fixed schedule
+                WelcomeScreenFeeder(process).run()
+                try:
+                    process.wait(timeout=point_timeout)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                    process.wait()
+
+            try:
+                summary = summarize_trades(config_file)
+            except Exception as e:
+                summary = {'error': str(e)}
+            self.publish_log('info', f"Sweep point {index + 1}/{len(points)} finished with exit code {process.returncode}")
+            return {'index': index, 'params': params, 'exit_code': process.returncode, 'result': summary}
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(lambda item: run_point(*item), enumerate(points)))
+
+        self.write_result_file({
+            'bot_id': BOT_ID,
+            'sweep': True,
+            'start_date': start_date,
+            'end_date': end_date,
+            'points': results,
+        })
+        print(f"MQTT Bridge Client: Sweep finished ({len(results)} points)", flush=True)
+
     def stop(self):
         if self.process:
             self.process.terminate()
+        for batcher in list(self.log_batchers.values()):
+            batcher.flush()
         self.publish_status('stopped')
         self.client.loop_stop()
         self.client.disconnect()
 
 if __name__ == '__main__':
+    if WARM_POOL:
+        wait_for_assignment()
+
     bridge = HummingbotMQTTBridge()
     bridge.start_mqtt()
     
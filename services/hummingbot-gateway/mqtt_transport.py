@@ -0,0 +1,364 @@
+"""
+MQTT Transport for Hummingbot Gateway
+Drives the paho MQTT client from the asyncio event loop, with bounded queues, awaitable publishes and jittered reconnects
+"""
+
+import asyncio
+import functools
+import os
+import random
+import socket
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+import paho.mqtt.client as mqtt
+
+from telemetry import MQTT_DROPPED, MQTT_OUTBOUND_QUEUE, MQTT_RECONNECTS
+
+
+def topic_family(topic: str) -> str:
+    """The message type segment of hbot/{bot_id}/{family}/..."""
+    parts = topic.split('/', 3)
+    return parts[2] if len(parts) > 2 else 'other'
+
+
+# (topic, payload, qos, retain, completion)
+OutboundMessage = Tuple[str, bytes, int, bool, asyncio.Future]
+
+
+class MQTTTransport:
+    """
+    paho does the protocol work; its socket is registered with the event loop instead of a network thread, so
+    callbacks run on the loop. Publishes queue in a bounded outbound buffer and complete once written (QoS 0) or
+    acknowledged (QoS 1). Inbound messages go through a bounded queue; while it is full the socket is not read,
+    which pushes back on the broker rather than growing memory.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        client_id: str,
+        on_connect: Callable[[], None],
+        on_message: Callable[[str, bytes], None],
+    ):
+        self.loop = loop
+        self.host = os.getenv('MQTT_BROKER_URL', 'localhost')
+        self.port = int(os.getenv('MQTT_PORT', '1883'))
+        self.keepalive = int(os.getenv('MQTT_KEEPALIVE', '60'))
+        self.outbound_limit = int(os.getenv('MQTT_OUTBOUND_QUEUE', '10000'))
+        self.inbound_limit = int(os.getenv('MQTT_INBOUND_QUEUE', '10000'))
+        # Publishes handed to paho and not yet written or acknowledged
+        self.max_inflight = int(os.getenv('MQTT_MAX_INFLIGHT_PUBLISHES', '1000'))
+        self.reconnect_min = float(os.getenv('MQTT_RECONNECT_MIN', '0.5'))
+        self.reconnect_max = float(os.getenv('MQTT_RECONNECT_MAX', '30'))
+        self.handle_connect = on_connect
+        self.handle_message = on_message
+
+        self.client = mqtt.Client(client_id=client_id)
+        self.client.username_pw_set(os.getenv('MQTT_USERNAME', 'admin'), os.getenv('MQTT_PASSWORD', 'public'))
+        self.client.max_inflight_messages_set(min(self.max_inflight, 65535))
+        self.client.on_connect = self.on_connect
+        self.client.on_disconnect = self.on_disconnect
+        self.client.on_message = self.on_message
+        self.client.on_publish = self.on_publish
+        self.client.on_socket_open = self.on_socket_open
+        self.client.on_socket_close = self.on_socket_close
+        self.client.on_socket_register_write = self.on_socket_register_write
+        self.client.on_socket_unregister_write = self.on_socket_unregister_write
+
+        # topic filter -> QoS, re-subscribed on every connect
+        self.subscriptions: Dict[str, int] = {}
+        self.outbound: Deque[OutboundMessage] = deque()
+        self.outbound_ready = asyncio.Event()
+        self.outbound_space = asyncio.Event()
+        self.outbound_space.set()
+        self.window = asyncio.Semaphore(self.max_inflight)
+        # mid -> (completion, QoS) of publishes paho has not finished
+        self.pending: Dict[int, Tuple[asyncio.Future, int]] = {}
+        self.inbound: Deque[Tuple[str, bytes]] = deque()
+        self.inbound_ready = asyncio.Event()
+
+        self.sock: Optional[socket.socket] = None
+        self.fd = -1
+        self.reading_paused = False
+        # Set by a consumer whose own queue is full; reads stay paused until it lets go
+        self.reading_held = False
+        self.connected = asyncio.Event()
+        self.disconnected = asyncio.Event()
+        self.closing = False
+        self.tasks: list = []
+        self.reconnects = 0
+
+    def is_connected(self) -> bool:
+        return self.connected.is_set()
+
+    # Socket plumbing. paho calls these on the loop, except while connect() runs in the executor.
+
+    def call_on_loop(self, callback, *args):
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            # Right away: paho closes the socket as soon as on_socket_close returns
+            callback(*args)
+        else:
+            self.loop.call_soon_threadsafe(callback, *args)
+
+    def on_socket_open(self, client, userdata, sock):
+        self.call_on_loop(self.add_socket, sock)
+
+    def on_socket_close(self, client, userdata, sock):
+        self.call_on_loop(self.remove_socket, sock)
+
+    def on_socket_register_write(self, client, userdata, sock):
+        self.call_on_loop(self.add_writer, sock)
+
+    def on_socket_unregister_write(self, client, userdata, sock):
+        self.call_on_loop(self.remove_writer, sock)
+
+    def add_socket(self, sock: socket.socket):
+        if sock.fileno() < 0:
+            return
+        self.sock = sock
+        self.fd = sock.fileno()
+        self.reading_paused = self.reading_held
+        if not self.reading_held:
+            self.loop.add_reader(self.fd, self.on_readable)
+
+    def remove_socket(self, sock: socket.socket):
+        if self.sock is not sock:
+            return
+        # By descriptor, the socket object may already be closed when this runs off the executor thread
+        self.loop.remove_reader(self.fd)
+        self.loop.remove_writer(self.fd)
+        self.sock = None
+        self.fd = -1
+
+    def add_writer(self, sock: socket.socket):
+        if self.sock is sock:
+            self.loop.add_writer(self.fd, self.on_writable)
+
+    def remove_writer(self, sock: socket.socket):
+        if self.sock is sock:
+            self.loop.remove_writer(self.fd)
+
+    def on_readable(self):
+        self.client.loop_read()
+
+    def on_writable(self):
+        self.client.loop_write()
+
+    def pause_reading(self):
+        if self.sock is not None and not self.reading_paused:
+            self.loop.remove_reader(self.fd)
+            self.reading_paused = True
+
+    def resume_reading(self):
+        if self.sock is not None and self.reading_paused and not self.reading_held:
+            self.loop.add_reader(self.fd, self.on_readable)
+            self.reading_paused = False
+
+    def hold_reading(self, held: bool):
+        """Pause socket reads for a consumer that cannot take more messages, or let them resume"""
+        self.reading_held = held
+        if held:
+            self.pause_reading()
+        elif len(self.inbound) < self.inbound_limit // 2:
+            self.resume_reading()
+
+    # paho callbacks, all on the event loop
+
+    def on_connect(self, client, userdata, flags, rc):
+        if rc != 0:
+            print(f'MQTT Transport: Connection refused, return code {rc}', flush=True)
+            return
+        self.disconnected.clear()
+        self.connected.set()
+        if self.subscriptions:
+            client.subscribe(list(self.subscriptions.items()))
+        self.outbound_ready.set()
+        self.handle_connect()
+
+    def on_disconnect(self, client, userdata, rc):
+        self.connected.clear()
+        self.disconnected.set()
+        # Unwritten QoS 0 packets are discarded by paho; QoS 1 messages are resent after reconnecting
+        for mid, (future, qos) in list(self.pending.items()):
+            if qos == 0:
+                self.complete(mid, dropped=True)
+        if not self.closing:
+            print(f'MQTT Transport: Disconnected from broker (rc {rc})', flush=True)
+
+    def on_message(self, client, userdata, msg):
+        self.inbound.append((msg.topic, msg.payload))
+        self.inbound_ready.set()
+        if len(self.inbound) >= self.inbound_limit:
+            self.pause_reading()
+
+    def on_publish(self, client, userdata, mid):
+        self.complete(mid)
+
+    def complete(self, mid: int, dropped: bool = False):
+        entry = self.pending.pop(mid, None)
+        if entry is None:
+            return
+        future, qos = entry
+        self.window.release()
+        if dropped:
+            MQTT_DROPPED.inc('outbound', 'disconnected')
+        if not future.done():
+            future.set_result(not dropped)
+
+    # Publishing
+
+    def publish_nowait(self, topic: str, payload, qos: int = 0, retain: bool = False) -> asyncio.Future:
+        """Queue a publish without waiting; QoS 0 messages are dropped while the outbound queue is full"""
+        future = self.loop.create_future()
+        if isinstance(payload, str):
+            payload = payload.encode()
+        if len(self.outbound) >= self.outbound_limit and qos == 0:
+            MQTT_DROPPED.inc('outbound', topic_family(topic))
+            future.set_result(False)
+            return future
+        # QoS 1 messages (statuses, cluster leases) are never dropped, the queue may run over its limit for them
+        self.outbound.append((topic, payload, qos, retain, future))
+        MQTT_OUTBOUND_QUEUE.set(len(self.outbound))
+        self.outbound_ready.set()
+        if len(self.outbound) >= self.outbound_limit:
+            self.outbound_space.clear()
+        return future
+
+    async def publish(self, topic: str, payload, qos: int = 0, retain: bool = False, wait: bool = False) -> bool:
+        """Queue a publish, waiting for room in the outbound queue; with wait=True also until it is delivered"""
+        while len(self.outbound) >= self.outbound_limit:
+            await self.outbound_space.wait()
+        future = self.publish_nowait(topic, payload, qos, retain)
+        return await future if wait else True
+
+    async def drain(self):
+        """Wait until the outbound queue is below half its limit"""
+        while len(self.outbound) >= self.outbound_limit // 2:
+            self.outbound_space.clear()
+            await self.outbound_space.wait()
+
+    async def write_outbound(self):
+        """Hand queued publishes to paho while connected, keeping at most max_inflight unfinished"""
+        while True:
+            if not self.outbound or not self.connected.is_set():
+                self.outbound_ready.clear()
+                await self.outbound_ready.wait()
+                continue
+            await self.window.acquire()
+            if not self.outbound or not self.connected.is_set():
+                self.window.release()
+                continue
+            topic, payload, qos, retain, future = self.outbound.popleft()
+            MQTT_OUTBOUND_QUEUE.set(len(self.outbound))
+            if len(self.outbound) < self.outbound_limit // 2:
+                self.outbound_space.set()
+            info = self.client.publish(topic, payload, qos=qos, retain=retain)
+            if info.rc == mqtt.MQTT_ERR_NO_CONN and qos == 0:
+                self.window.release()
+                MQTT_DROPPED.inc('outbound', 'disconnected')
+                future.set_result(False)
+                continue
+            if info.is_published():
+                # Written synchronously before we could register it
+                self.window.release()
+                future.set_result(True)
+                continue
+            self.pending[info.mid] = (future, qos)
+
+    # Inbound
+
+    async def read_inbound(self):
+        """Feed received messages to the handler, resuming socket reads once the queue has drained"""
+        while True:
+            if not self.inbound:
+                self.inbound_ready.clear()
+                await self.inbound_ready.wait()
+                continue
+            topic, payload = self.inbound.popleft()
+            if self.reading_paused and len(self.inbound) < self.inbound_limit // 2:
+                self.resume_reading()
+            try:
+                result = self.handle_message(topic, payload)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                print(f'MQTT Transport: Error handling message on {topic}: {e}', flush=True)
+
+    # Connection lifecycle
+
+    def subscribe(self, topic_filter: str, qos: int = 0):
+        self.subscriptions[topic_filter] = qos
+        if self.connected.is_set():
+            self.client.subscribe(topic_filter, qos)
+
+    def will_set(self, topic: str, payload: bytes, qos: int = 0, retain: bool = False):
+        self.client.will_set(topic, payload, qos=qos, retain=retain)
+
+    async def maintain_connection(self):
+        """Connect, and reconnect with jittered exponential backoff whenever the connection drops"""
+        delay = self.reconnect_min
+        while not self.closing:
+            try:
+                print(f'MQTT Transport: Connecting to {self.host}:{self.port}', flush=True)
+                # DNS and the TCP handshake block, so they run off the loop; everything after is non-blocking
+                await self.loop.run_in_executor(None, functools.partial(self.client.connect, self.host, self.port, self.keepalive))
+                await asyncio.wait_for(self.connected.wait(), self.keepalive)
+                delay = self.reconnect_min
+                await self.disconnected.wait()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f'MQTT Transport: Connection failed: {e}', flush=True)
+                if self.sock is not None:
+                    self.client.disconnect()
+            if self.closing:
+                break
+            self.reconnects += 1
+            MQTT_RECONNECTS.inc()
+            # Equal jitter: gateways that lost the broker together don't all come back in the same instant
+            wait = random.uniform(delay / 2, delay)
+            print(f'MQTT Transport: Reconnecting in {wait:.1f}s', flush=True)
+            await asyncio.sleep(wait)
+            delay = min(delay * 2, self.reconnect_max)
+
+    async def keep_alive(self):
+        """paho's housekeeping: keepalive pings and retries of unacknowledged QoS 1 messages"""
+        while True:
+            await asyncio.sleep(1)
+            if self.sock is not None:
+                self.client.loop_misc()
+
+    def start(self):
+        for coroutine in (self.maintain_connection(), self.keep_alive(), self.write_outbound(), self.read_inbound()):
+            self.tasks.append(self.loop.create_task(coroutine))
+
+    async def wait_connected(self, timeout: Optional[float] = None) -> bool:
+        try:
+            await asyncio.wait_for(self.connected.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def flush(self, timeout: float = 5):
+        """Wait for queued and unfinished publishes, e.g. before disconnecting"""
+        futures = [entry[4] for entry in self.outbound] + [future for future, _ in self.pending.values()]
+        if futures:
+            await asyncio.wait(futures, timeout=timeout)
+
+    async def stop(self):
+        self.closing = True
+        if self.connected.is_set():
+            await self.flush()
+            self.client.disconnect()
+            # Let the DISCONNECT packet go out before the socket is dropped
+            await asyncio.sleep(0)
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        if self.sock is not None:
+            self.remove_socket(self.sock)
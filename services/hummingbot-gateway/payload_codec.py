@@ -0,0 +1,194 @@
+"""
+Payload Codec for Hummingbot Gateway
+Opt-in MessagePack encoding of the high-volume bridge topics, advertised by a topic suffix so JSON consumers keep working
+"""
+
+import json
+import os
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+import msgpack
+
+# 'json' (default) or 'msgpack'; consumers tell the encoding from the topic, so bots may differ
+PAYLOAD_ENCODING = os.getenv('MQTT_PAYLOAD_ENCODING', 'json')
+
+# Binary schema version per topic family. A MessagePack payload is published on its JSON topic plus a
+# 'mp{version}' level, e.g. hbot/{bot_id}/metrics/mp1; subscribers of hbot/+/metrics/# receive both.
+SCHEMA_VERSIONS = {'metrics': 1, 'orders': 1, 'logs': 1, 'trades': 1}
+SUFFIX_PREFIX = 'mp'
+
+# Schema v1 carries these ISO timestamps as integer epoch milliseconds under '{field}_ms'
+TIMESTAMP_FIELDS = {
+    'metrics': ('timestamp',),
+    'orders': ('timestamp', 'exchange_timestamp'),
+    'logs': ('timestamp',),
+}
+# Trades go as rows under a column list instead of one map per trade; log batch lines as
+# [level, message, timestamp_ms, metadata] rows, plus the parsed message of JSON lines
+TRADE_COLUMNS = ('uid', 'id', 'market', 'symbol', 'base', 'quote', 'order_type', 'trade_type', 'price', 'amount', 'ts')
+EPOCH = datetime(1970, 1, 1)
+MILLISECOND = timedelta(milliseconds=1)
+
+
+def topic_parts(topic: str) -> Tuple[str, str]:
+    """(family, leaf) of hbot/{bot_id}/{family}/{leaf}"""
+    parts = topic.split('/')
+    return (parts[2] if len(parts) > 2 else '', parts[3] if len(parts) > 3 else '')
+
+
+class SecondCache:
+    """Log lines mostly share their second, so its conversion is done once rather than once per line"""
+
+    def __init__(self):
+        self.key = None
+        self.value = None
+
+
+_TO_MILLIS = SecondCache()
+_TO_ISO = SecondCache()
+
+
+def iso_to_millis(value):
+    """Naive ISO timestamps are UTC, as the bridges write them; anything else passes through unchanged"""
+    if not isinstance(value, str):
+        return value
+    fraction = value[20:]
+    if value[19:20] == '.' and fraction.isdigit():
+        # The bridges' 'YYYY-MM-DDTHH:MM:SS.fff[fff]' form
+        if value[:19] != _TO_MILLIS.key:
+            try:
+                _TO_MILLIS.value = (datetime.fromisoformat(value[:19]) - EPOCH) // MILLISECOND
+            except ValueError:
+                return value
+            _TO_MILLIS.key = value[:19]
+        return _TO_MILLIS.value + int(fraction[:3].ljust(3, '0'))
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return value
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return (parsed - EPOCH) // MILLISECOND
+
+
+def millis_to_iso(value):
+    """Back to the naive UTC ISO form the bridges write"""
+    if not isinstance(value, int):
+        return value
+    second, millis = divmod(value, 1000)
+    if second != _TO_ISO.key:
+        _TO_ISO.key = second
+        _TO_ISO.value = (EPOCH + timedelta(seconds=second)).isoformat()
+    return f'{_TO_ISO.value}.{millis:03d}'
+
+
+def json_object(message):
+    """The parsed message of lines that are themselves JSON objects, else None"""
+    if isinstance(message, str) and message[:1] == '{' and message[-1:] == '}':
+        try:
+            data = json.loads(message)
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return None
+
+
+def compact_log(line: dict) -> dict:
+    """A message that is itself a JSON object travels as a map instead of an escaped string"""
+    data = json_object(line.get('message'))
+    if data is None:
+        return line
+    line = dict(line)
+    del line['message']
+    line['data'] = data
+    return line
+
+
+def expand_log(line: dict) -> dict:
+    if 'data' in line and 'message' not in line:
+        line['message'] = json.dumps(line.pop('data'))
+    return line
+
+
+def to_wire(family: str, leaf: str, payload: dict) -> dict:
+    """JSON payload -> schema v1"""
+    payload = dict(payload)
+    for field in TIMESTAMP_FIELDS.get(family, ()):
+        value = payload.get(field)
+        millis = iso_to_millis(value)
+        if isinstance(value, str) and isinstance(millis, int):
+            del payload[field]
+            payload[f'{field}_ms'] = millis
+    if family == 'trades' and 'trades' in payload:
+        payload['columns'] = TRADE_COLUMNS
+        payload['rows'] = [[trade.get(column) for column in TRADE_COLUMNS] for trade in payload.pop('trades')]
+    elif family == 'logs' and leaf in ('batch', 'batchz'):
+        rows = []
+        for line in payload.pop('lines'):
+            message = line.get('message')
+            row = [line.get('level'), message, iso_to_millis(line.get('timestamp')), line.get('metadata')]
+            data = json_object(message)
+            if data is not None:
+                row[1] = None
+                row.append(data)
+            rows.append(row)
+        payload['rows'] = rows
+    elif family == 'logs':
+        payload = compact_log(payload)
+    return payload
+
+
+def from_wire(family: str, leaf: str, payload: dict) -> dict:
+    """Schema v1 -> the JSON payload"""
+    for field in TIMESTAMP_FIELDS.get(family, ()):
+        if f'{field}_ms' in payload:
+            payload[field] = millis_to_iso(payload.pop(f'{field}_ms'))
+    if family == 'trades' and 'rows' in payload:
+        columns = payload.pop('columns', TRADE_COLUMNS)
+        payload['trades'] = [dict(zip(columns, row)) for row in payload.pop('rows')]
+    elif family == 'logs' and leaf in ('batch', 'batchz'):
+        lines = []
+        for row in payload.pop('rows'):
+            line = {'level': row[0], 'timestamp': millis_to_iso(row[2])}
+            if len(row) > 4:
+                line['data'] = row[4]
+            else:
+                line['message'] = row[1]
+            if row[3] is not None:
+                line['metadata'] = row[3]
+            lines.append(expand_log(line))
+        payload['lines'] = lines
+    elif family == 'logs':
+        payload = expand_log(payload)
+    return payload
+
+
+def encode(topic: str, payload: dict, encoding: Optional[str] = None) -> Tuple[str, bytes]:
+    """(topic, payload bytes) to publish; families without a binary schema stay JSON. logs/batchz is zlib-deflated."""
+    encoding = encoding or PAYLOAD_ENCODING
+    family, leaf = topic_parts(topic)
+    if encoding == 'msgpack' and family in SCHEMA_VERSIONS:
+        topic = f'{topic}/{SUFFIX_PREFIX}{SCHEMA_VERSIONS[family]}'
+        data = msgpack.packb(to_wire(family, leaf, payload), use_bin_type=True)
+    elif leaf in ('batch', 'batchz'):
+        data = json.dumps(payload, separators=(',', ':')).encode()
+    else:
+        data = json.dumps(payload).encode()
+    return topic, zlib.compress(data) if leaf == 'batchz' else data
+
+
+def decode(topic: str, data: bytes) -> Tuple[str, dict]:
+    """(topic without the encoding suffix, JSON-shaped payload) of a received message"""
+    base, _, last = topic.rpartition('/')
+    binary = last.startswith(SUFFIX_PREFIX) and last[len(SUFFIX_PREFIX):].isdigit()
+    family, leaf = topic_parts(base if binary else topic)
+    if leaf == 'batchz':
+        data = zlib.decompress(data)
+    if not binary:
+        return topic, json.loads(data)
+    version = int(last[len(SUFFIX_PREFIX):])
+    if version != SCHEMA_VERSIONS.get(family):
+        raise ValueError(f'Unsupported {family} schema version {version}')
+    return base, from_wire(family, leaf, msgpack.unpackb(data, raw=False))
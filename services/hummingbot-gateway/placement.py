@@ -0,0 +1,112 @@
+"""
+Bot Placement for Hummingbot Gateway
+Decides which small V2 bots share a packed Hummingbot container instead of each booting its own
+"""
+
+import asyncio
+import os
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from warm_pool import parse_memory
+
+PACK_MANIFEST_VERSION = 1
+PACK_KEY_LABEL = 'io.janym.pack-key'
+
+
+def pack_key(config: dict) -> Optional[str]:
+    """Bots may only share a container when they trade through the same account and connectors; None means dedicated"""
+    if config.get('strategy_type') != 'v2' or config.get('dedicated') or str(config.get('backtest', '')).lower() == 'true':
+        return None
+    if config.get('pack_key'):
+        return str(config['pack_key'])
+    controllers = (config.get('controllers') or {}).get('controllers', [])
+    connectors = sorted({str(controller.get('connector_name', '')) for controller in controllers})
+    account = config.get('account') or config.get('tenant') or 'default'
+    return f"{account}|{','.join(connectors)}"
+
+
+@dataclass
+class Pack:
+    pack_id: str
+    key: str
+    # bot_id -> config document, in the order the bots were placed
+    bots: Dict[str, dict] = field(default_factory=dict)
+    container_id: Optional[str] = None
+    # Serializes container creation and manifest writes for this pack
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False)
+
+    def manifest(self) -> dict:
+        return {'version': PACK_MANIFEST_VERSION, 'pack_id': self.pack_id, 'key': self.key, 'bots': self.bots}
+
+
+class PlacementPolicy:
+    """Best-fit packing: a bot joins the fullest pack with its key that still has room, else opens a new one"""
+
+    def __init__(self):
+        self.enabled = os.getenv('BOT_PACKING', 'false').lower() == 'true'
+        self.mem_limit = os.getenv('PACK_MEM_LIMIT', '4g')
+        # One interpreter and one set of connectors per pack, plus a reservation per hosted bot
+        self.base_memory = parse_memory(os.getenv('PACK_BASE_MEMORY', '1g'))
+        self.bot_memory = parse_memory(os.getenv('PACK_BOT_MEMORY', '256m'))
+        self.max_bots = int(os.getenv('PACK_MAX_BOTS', '8'))
+        # A pack runs several live bots, so it outweighs a single bot when the CPU is contended
+        self.cpu_shares = int(os.getenv('PACK_CPU_SHARES', '2048'))
+        self.packs: Dict[str, Pack] = {}
+        self.bot_packs: Dict[str, str] = {}
+
+    @property
+    def capacity(self) -> int:
+        """Bots per pack, limited by the pack's memory and PACK_MAX_BOTS"""
+        by_memory = (parse_memory(self.mem_limit) - self.base_memory) // self.bot_memory
+        return max(1, min(self.max_bots, by_memory))
+
+    def pack_of(self, bot_id: str) -> Optional[Pack]:
+        pack_id = self.bot_packs.get(bot_id)
+        return self.packs.get(pack_id) if pack_id else None
+
+    def place(self, bot_id: str, key: str) -> Pack:
+        """Reserve a slot for a bot; a new pack has no container until the first manifest write creates it"""
+        candidates = [
+            pack for pack in self.packs.values()
+            if pack.key == key and len(pack.bots) < self.capacity
+        ]
+        if candidates:
+            pack = max(candidates, key=lambda candidate: (len(candidate.bots), candidate.pack_id))
+        else:
+            pack = Pack(pack_id=uuid.uuid4().hex[:12], key=key)
+            self.packs[pack.pack_id] = pack
+        # Hold the slot right away so concurrent starts see it taken
+        pack.bots[bot_id] = {}
+        self.bot_packs[bot_id] = pack.pack_id
+        return pack
+
+    def release(self, bot_id: str) -> Optional[Pack]:
+        """Free a bot's slot; returns the pack it was in"""
+        pack = self.pack_of(bot_id)
+        self.bot_packs.pop(bot_id, None)
+        if pack is not None:
+            pack.bots.pop(bot_id, None)
+        return pack
+
+    def forget(self, pack: Pack):
+        """Drop a pack whose container is gone"""
+        self.packs.pop(pack.pack_id, None)
+        for bot_id in pack.bots:
+            self.bot_packs.pop(bot_id, None)
+
+    def restore(self, container_id: str, manifest: dict):
+        """Rebuild a pack from the manifest of a running pack container"""
+        pack = Pack(pack_id=manifest['pack_id'], key=manifest['key'], bots=manifest.get('bots', {}), container_id=container_id)
+        self.packs[pack.pack_id] = pack
+        for bot_id in pack.bots:
+            self.bot_packs[bot_id] = pack.pack_id
+
+    def metrics(self) -> dict:
+        return {
+            'enabled': self.enabled,
+            'packs': len(self.packs),
+            'packed_bots': len(self.bot_packs),
+            'capacity': self.capacity,
+        }
@@ -0,0 +1,138 @@
+"""
+Startup Reconciliation for Hummingbot Gateway
+Compares the containers found after a gateway restart with the stored desired state, republishes statuses and repairs drift
+"""
+
+import asyncio
+import os
+import time
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+from desired_state import DesiredStateStore
+
+if TYPE_CHECKING:
+    from docker_manager import DockerManager
+    from mqtt_bridge import MQTTBridge
+
+
+class StartupReconciler:
+    def __init__(self, docker_manager: 'DockerManager', bridge: 'MQTTBridge', store: DesiredStateStore):
+        self.docker_manager = docker_manager
+        self.bridge = bridge
+        self.store = store
+        # Retained statuses republished per second, so thousands of bots don't flood the broker at once
+        self.publish_rate = float(os.getenv('RECONCILE_PUBLISH_RATE', '500'))
+        self.timeout = float(os.getenv('RECONCILE_TIMEOUT', '300'))
+        # Bot containers without a desired state: 'remove', 'stop' or 'keep'
+        self.orphans = os.getenv('RECONCILE_ORPHANS', 'remove')
+        self.result: dict = {'status': 'pending'}
+
+    async def run(self):
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self.reconcile(), self.timeout)
+        except asyncio.TimeoutError:
+            self.result['status'] = 'timeout'
+            print(f'Startup Reconciliation: Gave up after {self.timeout:g}s: {self.result}', flush=True)
+        except Exception as e:
+            self.result.update({'status': 'failed', 'error': str(e)})
+            print(f'Startup Reconciliation: Failed: {e}', flush=True)
+        self.result['duration'] = round(time.monotonic() - started, 3)
+
+    def actual_states(self) -> Dict[str, str]:
+        """Container status per bot from the index, with packed bots taking their pack's status"""
+        actual = {}
+        for state in list(self.docker_manager.index.by_name.values()):
+            if state.kind == 'bot':
+                actual[state.bot_id] = state.status
+            elif state.kind == 'pack':
+                pack = self.docker_manager.placement.packs.get(state.bot_id)
+                for bot_id in (pack.bots if pack else {}):
+                    actual[bot_id] = state.status
+        return actual
+
+    async def reconcile(self):
+        if self.bridge.cluster.enabled:
+            # Cluster nodes resume their bots from the ownership records on the broker instead
+            self.result['status'] = 'skipped'
+            return
+        self.result['status'] = 'waiting'
+        # The index is seeded from a single list call before the events stream goes live
+        while not self.docker_manager.index.is_live or not self.bridge.is_connected():
+            await asyncio.sleep(0.1)
+        self.result['status'] = 'running'
+        await self.docker_manager.load_packs()
+
+        actual = self.actual_states()
+        if not self.store.initialized:
+            # First start with a desired state store: adopt whatever runs now instead of treating it all as orphans
+            self.store.set_many({bot_id: 'running' if status == 'running' else 'stopped' for bot_id, status in actual.items()})
+            self.store.mark_initialized()
+            print(f'Startup Reconciliation: Adopted {len(actual)} existing bot(s) as desired state', flush=True)
+        desired = self.store.all()
+
+        statuses: List[Tuple[str, str, dict]] = []
+        restarts, stops = [], []
+        for bot_id, state in desired.items():
+            status = actual.get(bot_id)
+            if state.desired == 'running':
+                if status == 'running':
+                    statuses.append((bot_id, 'running', {}))
+                else:
+                    statuses.append((bot_id, 'starting', {'reason': 'reconcile'}))
+                    restarts.append((bot_id, state.document))
+            elif status == 'running':
+                stops.append(bot_id)
+            else:
+                statuses.append((bot_id, 'stopped', {}))
+        orphans = sorted(set(actual) - set(desired))
+        for bot_id in orphans:
+            statuses.append((bot_id, 'stopped', {'reason': 'orphan'}) if self.orphans != 'keep' else (bot_id, actual[bot_id], {}))
+
+        self.result.update({
+            'containers': len(actual),
+            'desired': len(desired),
+            'republished': len(statuses),
+            'restarted': len(restarts),
+            'stopped': len(stops),
+            'orphans': len(orphans),
+        })
+        print(f'Startup Reconciliation: {self.result}', flush=True)
+
+        await self.publish_statuses(statuses)
+        # Restarts and stops go through the bot actors, so commands arriving meanwhile stay ordered with them
+        for bot_id, document in restarts:
+            if document is None:
+                # Adopted bots have no stored document; an exited container still has its own
+                document = await self.docker_manager.current_config(bot_id)
+            if document is None:
+                self.bridge.publish_status(bot_id, 'error', {'error': 'No stored config to restart the bot with', 'source': 'reconcile'})
+                continue
+            await self.bridge.submit_command(bot_id, 'start', {'config': document.get('config', {})})
+        for bot_id in stops:
+            await self.bridge.submit_command(bot_id, 'stop', {})
+        if self.orphans != 'keep':
+            await asyncio.gather(*(self.remove_orphan(bot_id) for bot_id in orphans))
+        self.result['status'] = 'done'
+
+    async def publish_statuses(self, statuses: List[Tuple[str, str, dict]]):
+        """Republish retained statuses in batches paced to publish_rate"""
+        batch = max(1, int(self.publish_rate / 10))
+        for offset in range(0, len(statuses), batch):
+            for bot_id, status, metadata in statuses[offset:offset + batch]:
+                self.bridge.publish_status(bot_id, status, {**metadata, 'source': 'reconcile'})
+            # Slow down further if the broker can't keep up with the pace
+            await asyncio.gather(asyncio.sleep(batch / self.publish_rate), self.bridge.transport.drain())
+
+    async def remove_orphan(self, bot_id: str):
+        if bot_id in self.bridge.actors or self.store.get(bot_id) is not None:
+            # Started by a command while we were reconciling
+            return
+        try:
+            if self.orphans == 'stop':
+                await self.docker_manager.stop_bot(bot_id)
+            else:
+                await self.docker_manager.remove_bot(bot_id)
+            print(f"Startup Reconciliation: {'Stopped' if self.orphans == 'stop' else 'Removed'} orphaned bot {bot_id}", flush=True)
+        except Exception as e:
+            print(f'Startup Reconciliation: Could not {self.orphans} orphaned bot {bot_id}: {e}', flush=True)
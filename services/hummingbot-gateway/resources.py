@@ -0,0 +1,269 @@
+"""
+Resource Sizing for Hummingbot Gateway
+Per-strategy resource profiles, right-sizing from observed memory usage and host memory admission for bot starts
+"""
+
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+from warm_pool import parse_memory
+
+if TYPE_CHECKING:
+    from container_index import ContainerIndex
+    from metrics_store import MetricsStore
+
+# Memory sizes are rounded up to this step so small usage changes don't produce a new size every start
+MEMORY_STEP = 64 * 1024 ** 2
+
+DEFAULT_PROFILES = {
+    'pmm': {'memory': '1g', 'min_memory': '512m', 'max_memory': '2g', 'cpu_shares': 1024, 'cpus': None},
+    'v2': {'memory': '1536m', 'min_memory': '768m', 'max_memory': '3g', 'cpu_shares': 1024, 'cpus': None},
+    'v2_heavy': {'memory': '2g', 'min_memory': '1g', 'max_memory': '4g', 'cpu_shares': 2048, 'cpus': None},
+}
+
+# Container states that hold on to their memory limit
+COMMITTED_STATUSES = frozenset({'created', 'running', 'restarting', 'paused'})
+
+# Listener signature: (bot_id, status, metadata)
+AdmissionListener = Callable[[str, str, dict], None]
+
+
+def load_profiles() -> Dict[str, dict]:
+    """Built-in profiles, with per-profile overrides from RESOURCE_PROFILES (JSON)"""
+    profiles = {name: dict(profile) for name, profile in DEFAULT_PROFILES.items()}
+    for name, overrides in json.loads(os.getenv('RESOURCE_PROFILES', '{}')).items():
+        profiles[name] = {**profiles.get(name, profiles['v2']), **overrides}
+    return profiles
+
+
+def round_memory(value: float) -> int:
+    return int(-(-value // MEMORY_STEP) * MEMORY_STEP)
+
+
+@dataclass
+class ResourcePlan:
+    profile: str
+    memory: int
+    cpu_shares: int
+    cpus: Optional[float] = None
+    # 'profile', 'history' or 'config'
+    source: str = 'profile'
+    observed_peak: Optional[int] = None
+
+    def container_kwargs(self) -> dict:
+        return {
+            'mem_limit': self.memory,
+            'cpu_shares': self.cpu_shares,
+            'nano_cpus': int(self.cpus * 1e9) if self.cpus else None,
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            'profile': self.profile,
+            'memory': self.memory,
+            'cpu_shares': self.cpu_shares,
+            'cpus': self.cpus,
+            'source': self.source,
+            'observed_peak': self.observed_peak,
+        }
+
+
+class ResourceSizer:
+    """Picks a profile per bot and sizes its memory from the peak the metrics store has seen"""
+
+    def __init__(self, metrics_store: Optional['MetricsStore'] = None):
+        self.metrics_store = metrics_store
+        self.profiles = load_profiles()
+        self.heavy_controllers = int(os.getenv('RESOURCE_HEAVY_CONTROLLERS', '4'))
+        self.rightsize = os.getenv('RIGHTSIZE_ENABLED', 'true').lower() == 'true'
+        self.headroom = float(os.getenv('RIGHTSIZE_HEADROOM', '1.3'))
+        self.lookback = float(os.getenv('RIGHTSIZE_LOOKBACK', str(7 * 86400)))
+        # Samples needed before history overrides the profile; 30 is five minutes at the default interval
+        self.min_samples = int(os.getenv('RIGHTSIZE_MIN_SAMPLES', '30'))
+
+    def profile_name(self, config: dict) -> str:
+        if config.get('resource_profile') in self.profiles:
+            return config['resource_profile']
+        if config.get('strategy_type') != 'v2':
+            return 'pmm'
+        controllers = (config.get('controllers') or {}).get('controllers', [])
+        return 'v2_heavy' if len(controllers) > self.heavy_controllers else 'v2'
+
+    def observed_peak(self, bot_id: str) -> Optional[int]:
+        """Highest container memory the bot reported within the lookback, if there are enough samples"""
+        if self.metrics_store is None:
+            return None
+        now = time.time()
+        fields = ('container.memory.peak', 'container.memory.current')
+        result = self.metrics_store.query(bot_id, now - self.lookback, now, resolution='1h', fields=fields)
+        if result is None:
+            return None
+        peak, samples = None, 0
+        for series in result['fields'].values():
+            if series['max']:
+                peak = max(peak or 0, max(series['max']))
+                samples = max(samples, sum(series['count']))
+        return int(peak) if peak is not None and samples >= self.min_samples else None
+
+    def plan(self, bot_id: str, config: dict) -> ResourcePlan:
+        name = self.profile_name(config)
+        profile = self.profiles[name]
+        plan = ResourcePlan(
+            profile=name,
+            memory=parse_memory(str(profile['memory'])),
+            cpu_shares=int(profile['cpu_shares']),
+            cpus=profile.get('cpus'),
+        )
+        if config.get('mem_limit'):
+            plan.memory, plan.source = parse_memory(str(config['mem_limit'])), 'config'
+            return plan
+        if self.rightsize:
+            plan.observed_peak = self.observed_peak(bot_id)
+            if plan.observed_peak is not None:
+                sized = round_memory(plan.observed_peak * self.headroom)
+                plan.memory = min(max(sized, parse_memory(str(profile['min_memory']))), parse_memory(str(profile['max_memory'])))
+                plan.source = 'history'
+        return plan
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, bot_id: str, reason: str, metadata: dict):
+        super().__init__(f'Start of bot {bot_id} rejected: {reason}')
+        self.reason = reason
+        self.metadata = {'reason': reason, **metadata}
+
+
+@dataclass
+class AdmissionWaiter:
+    bot_id: str
+    name: str
+    memory: int
+    queued_at: float = field(default_factory=time.monotonic)
+    cancelled: bool = False
+
+
+class HostAdmission:
+    """Keeps the memory limits of all gateway containers within a host budget; starts that don't fit queue or are rejected"""
+
+    def __init__(self, index: 'ContainerIndex'):
+        self.index = index
+        budget = os.getenv('HOST_MEMORY_BUDGET')
+        self.budget: Optional[int] = parse_memory(budget) if budget else None
+        # Share of host memory committed when no explicit budget is set
+        self.commit_ratio = float(os.getenv('HOST_MEMORY_COMMIT_RATIO', '0.85'))
+        self.mode = os.getenv('ADMISSION_MODE', 'queue')
+        self.queue_timeout = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', '900'))
+        # Containers created before memory labels ran with the old fixed limit
+        self.unlabeled_memory = parse_memory(os.getenv('ADMISSION_UNLABELED_MEMORY', '2g'))
+        self.waiters: List[AdmissionWaiter] = []
+        # Container name -> (bytes, expiry): memory of starts the index has not seen yet
+        self.reservations: Dict[str, Tuple[int, float]] = {}
+        self.changed = asyncio.Event()
+        self.listeners: List[AdmissionListener] = []
+        # Exited containers free their memory
+        index.add_listener(lambda state, status, metadata: self.wake())
+
+    def add_listener(self, listener: AdmissionListener):
+        self.listeners.append(listener)
+
+    def configure_host(self, host_memory: int):
+        if self.budget is None and host_memory:
+            self.budget = int(host_memory * self.commit_ratio)
+            print(f'Host Admission: Memory budget {self.budget / 1024 ** 3:.1f} GiB of {host_memory / 1024 ** 3:.1f} GiB', flush=True)
+
+    def committed(self) -> int:
+        now = time.monotonic()
+        committed = [state for state in self.index.by_name.values() if state.status in COMMITTED_STATUSES]
+        seen = {state.name for state in committed}
+        for name, (_, expires_at) in list(self.reservations.items()):
+            if expires_at < now or name in seen:
+                del self.reservations[name]
+        indexed = sum(state.memory or self.unlabeled_memory for state in committed)
+        return indexed + sum(memory for memory, _ in self.reservations.values())
+
+    def available(self) -> Optional[int]:
+        return None if self.budget is None else self.budget - self.committed()
+
+    def admissible(self, waiter: AdmissionWaiter) -> bool:
+        """Fits alongside everything queued before it, so big starts are not overtaken forever"""
+        ahead = 0
+        for queued in self.waiters:
+            if queued is waiter:
+                break
+            ahead += queued.memory
+        return self.committed() + ahead + waiter.memory <= self.budget
+
+    def wake(self):
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    def notify(self, bot_id: str, status: str, metadata: dict):
+        for listener in self.listeners:
+            try:
+                listener(bot_id, status, metadata)
+            except Exception as e:
+                print(f'Host Admission: Listener error for {bot_id}: {e}', flush=True)
+
+    async def admit(self, bot_id: str, name: str, memory: int):
+        """Reserve memory for a container about to be created, queueing until it fits"""
+        if self.budget is None:
+            return
+        details = {'required': memory, 'budget': self.budget}
+        if memory > self.budget:
+            raise AdmissionRejected(bot_id, 'exceeds_budget', details)
+        waiter = AdmissionWaiter(bot_id, name, memory)
+        self.waiters.append(waiter)
+        try:
+            if not self.admissible(waiter):
+                if self.mode != 'queue':
+                    raise AdmissionRejected(bot_id, 'host_memory', {**details, 'available': self.available()})
+                self.notify(bot_id, 'queued', {
+                    **details,
+                    'reason': 'host_memory',
+                    'available': self.available(),
+                    'position': self.waiters.index(waiter) + 1,
+                })
+                print(f'Host Admission: Queued start of bot {bot_id} ({memory} bytes, {self.available()} available)', flush=True)
+                deadline = waiter.queued_at + self.queue_timeout
+                while not self.admissible(waiter):
+                    if waiter.cancelled:
+                        raise AdmissionRejected(bot_id, 'cancelled', details)
+                    if time.monotonic() >= deadline:
+                        raise AdmissionRejected(bot_id, 'queue_timeout', {**details, 'available': self.available()})
+                    try:
+                        # Re-checked on container exits and finished starts, and periodically for expired reservations
+                        await asyncio.wait_for(self.changed.wait(), 5)
+                    except asyncio.TimeoutError:
+                        pass
+                if waiter.cancelled:
+                    # Cancelled while the wakeup that made it fit was pending
+                    raise AdmissionRejected(bot_id, 'cancelled', details)
+                self.notify(bot_id, 'starting', {'queued_for': round(time.monotonic() - waiter.queued_at, 3)})
+            self.reservations[name] = (memory, time.monotonic() + 60)
+        finally:
+            self.waiters.remove(waiter)
+            self.wake()
+
+    def release(self, name: str):
+        """Drop the reservation of a start that failed"""
+        if self.reservations.pop(name, None) is not None:
+            self.wake()
+
+    def cancel(self, bot_id: str):
+        """Give up queued starts of a bot, e.g. because it was asked to stop"""
+        for waiter in self.waiters:
+            if waiter.bot_id == bot_id:
+                waiter.cancelled = True
+        self.wake()
+
+    def metrics(self) -> dict:
+        return {
+            'budget': self.budget or 0,
+            'committed': self.committed(),
+            'queued': len(self.waiters),
+            'queued_memory': sum(waiter.memory for waiter in self.waiters),
+        }
@@ -0,0 +1,139 @@
+"""
+Telemetry for Hummingbot Gateway
+Minimal Prometheus counters, gauges and histograms, cheap enough to update on every command and Docker call
+"""
+
+import asyncio
+import bisect
+import time
+from typing import Dict, List, Sequence, Tuple
+
+# Seconds; covers sub-millisecond dispatch up to multi-minute image pulls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+LAG_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+
+def format_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric:
+    kind = ''
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        REGISTRY.append(self)
+
+    def render(self) -> List[str]:
+        return [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.kind}', *self.samples()]
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        # Updated without a lock: under the GIL a lost increment is possible but harmless for monitoring
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> List[str]:
+        return [f'{self.name}{format_labels(self.label_names, labels)} {value:g}' for labels, value in sorted(self.values.items())]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value: float, *labels: str):
+        self.values[labels] = value
+
+    def clear(self):
+        self.values = {}
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count], [sum]
+        self.counts: Dict[Tuple[str, ...], List[int]] = {}
+        self.sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, *labels: str):
+        counts = self.counts.get(labels)
+        if counts is None:
+            counts = self.counts[labels] = [0] * (len(self.buckets) + 1)
+            self.sums[labels] = 0.0
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sums[labels] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, counts in sorted(self.counts.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == '+Inf' else f'le="{bound:g}"'
+                lines.append(f'{self.name}_bucket{format_labels(self.label_names, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{format_labels(self.label_names, labels)} {self.sums[labels]:g}')
+            lines.append(f'{self.name}_count{format_labels(self.label_names, labels)} {cumulative}')
+        return lines
+
+
+REGISTRY: List[Metric] = []
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format"""
+    return '\n'.join(line for metric in REGISTRY for line in metric.render()) + '\n'
+
+
+# Hot-path metrics, updated by the MQTT bridge, command actors and the Docker manager
+MQTT_COMMAND_LATENCY = Histogram(
+    'gateway_mqtt_command_seconds', 'Time from MQTT receipt to command handler completion', ('command',))
+EVENT_LOOP_LAG = Histogram(
+    'gateway_event_loop_lag_seconds', 'How late the event loop ran a timer that was due', buckets=LAG_BUCKETS)
+MQTT_COMMAND_QUEUE = Gauge('gateway_mqtt_command_queue', 'Commands received and waiting for an in-flight slot')
+MQTT_COMMANDS_INFLIGHT = Gauge('gateway_mqtt_commands_inflight', 'Commands accepted from MQTT and not finished yet')
+MQTT_MESSAGES_RECEIVED = Counter('gateway_mqtt_messages_received_total', 'MQTT messages received', ('family',))
+MQTT_PUBLISHED = Counter('gateway_mqtt_published_total', 'MQTT messages published', ('family',))
+MQTT_DROPPED = Counter('gateway_mqtt_dropped_total', 'MQTT messages dropped, by direction and topic family or reason', ('direction', 'reason'))
+MQTT_OUTBOUND_QUEUE = Gauge('gateway_mqtt_outbound_queue', 'Publishes waiting for the MQTT connection')
+MQTT_RECONNECTS = Counter('gateway_mqtt_reconnects_total', 'MQTT reconnect attempts')
+MQTT_PUBLISHED_BYTES = Counter('gateway_mqtt_published_bytes_total', 'MQTT payload bytes published', ('family',))
+DOCKER_CALL_LATENCY = Histogram(
+    'gateway_docker_call_seconds', 'Docker API call duration on the executor', ('operation',))
+DOCKER_QUEUE_WAIT = Histogram(
+    'gateway_docker_queue_wait_seconds', 'Time Docker calls waited for a concurrency slot', ('operation',))
+DOCKER_CALLS_INFLIGHT = Gauge('gateway_docker_calls_inflight', 'Docker API calls running on the executor')
+DOCKER_CALL_ERRORS = Counter('gateway_docker_call_errors_total', 'Docker API calls that failed or timed out', ('operation',))
+
+# Sampled when /metrics is scraped
+CONTAINERS = Gauge('gateway_containers', 'Containers known to the gateway by kind and status', ('kind', 'status'))
+BACKTESTS = Gauge('gateway_backtest_scheduler', 'Backtest scheduler queue, capacity and cache state', ('metric',))
+ASYNCIO_TASKS = Gauge('gateway_asyncio_tasks', 'Tasks alive on the gateway event loop')
+BOT_ACTORS = Gauge('gateway_bot_actors', 'Bots with queued or running commands')
+HOST_MEMORY = Gauge('gateway_host_memory', 'Host memory admission budget, committed and queued bytes, and queued starts', ('metric',))
+BOT_PACKING = Gauge('gateway_bot_packing', 'Pack containers, bots hosted in them and bots per pack', ('metric',))
+CLUSTER = Gauge('gateway_cluster', 'Live gateway nodes, bots owned and being acquired by this node, and takeovers', ('metric',))
+METRICS_STORE_BYTES = Gauge('gateway_metrics_store_bytes', 'Memory held by the metrics rollup store')
+
+
+async def watch_event_loop(interval: float):
+    """Sample event loop lag: how much later than asked a sleep returns"""
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, time.perf_counter() - started - interval))
@@ -0,0 +1,268 @@
+"""
+Trade Exporter for Hummingbot containers
+Streams new fills from the Hummingbot trades DB to MQTT in acknowledged batches, resuming from a persisted cursor
+"""
+
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import sqlite3
+import struct
+import threading
+import time
+from typing import Dict, List, Optional
+
+from payload_codec import encode
+
+TRADE_COLUMNS = ('id', 'market', 'symbol', 'base_asset', 'quote_asset', 'order_type', 'trade_type', 'price', 'amount', 'timestamp', 'order_id')
+
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_NONBLOCK = 0o4000
+
+
+class FileWatcher:
+    """Wakes up when files in a directory change, via inotify where available and mtime polling otherwise"""
+
+    def __init__(self, directory: str, names: List[str], poll_interval: float = 0.25):
+        self.directory = directory
+        self.names = names
+        self.poll_interval = poll_interval
+        self.fd = None
+        self.signature = None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK)
+            if fd >= 0:
+                os.makedirs(directory, exist_ok=True)
+                mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+                if libc.inotify_add_watch(fd, directory.encode(), mask) >= 0:
+                    self.fd = fd
+                else:
+                    os.close(fd)
+        except (OSError, AttributeError):
+            self.fd = None
+
+    def stat_signature(self):
+        signature = []
+        for name in self.names:
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return signature
+
+    def wait(self, timeout: float) -> bool:
+        """Block until a watched file changes or the timeout passes; returns whether anything changed"""
+        if self.fd is None:
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                signature = self.stat_signature()
+                if signature != self.signature:
+                    self.signature = signature
+                    return True
+                time.sleep(min(self.poll_interval, max(0.0, deadline - time.monotonic())))
+            return False
+
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        changed = False
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = struct.unpack_from('iIII', data, offset)
+            name = data[offset + 16:offset + 16 + length].rstrip(b'\0').decode(errors='replace')
+            changed = changed or name in self.names
+            offset += 16 + length
+        return changed
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class TradeExporter:
+    """
+    Publishes trades in qos-1 batches and only advances the on-disk cursor once the broker acknowledged them.
+    In a pack container, fills are published under the bot whose controllers placed the order (order_groups_path,
+    written by the V2 executor); fills of orders nobody claimed stay under the container's own id.
+    """
+
+    def __init__(
+        self,
+        client,
+        bot_id: str,
+        db_path: str,
+        cursor_path: str,
+        batch_size: int = 500,
+        wait_interval: float = 1.0,
+        encoding: str = 'json',
+        order_groups_path: Optional[str] = None,
+    ):
+        self.client = client
+        self.bot_id = bot_id
+        self.encoding = encoding
+        self.db_path = db_path
+        self.cursor_path = cursor_path
+        self.batch_size = batch_size
+        self.wait_interval = wait_interval
+        self.conn: Optional[sqlite3.Connection] = None
+        self.order_groups_path = order_groups_path
+        self.order_groups: Optional[sqlite3.Connection] = None
+        self.db_inode = None
+        self.last_id = self.load_cursor()
+        self.stopping = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        # The DB only changes through its WAL (or the main file without WAL), so those are the files we watch
+        name = os.path.basename(db_path)
+        self.watcher = FileWatcher(os.path.dirname(db_path), [name, f'{name}-wal'])
+
+    def load_cursor(self) -> int:
+        try:
+            with open(self.cursor_path, 'r') as f:
+                return int(json.load(f)['last_id'])
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            return 0
+
+    def save_cursor(self):
+        tmp_path = f'{self.cursor_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'last_id': self.last_id, 'updated_at': time.time()}, f)
+        os.replace(tmp_path, self.cursor_path)
+
+    def connect(self) -> Optional[sqlite3.Connection]:
+        """The shared read-only connection, reopened when Hummingbot recreates the DB file"""
+        try:
+            inode = os.stat(self.db_path).st_ino
+        except FileNotFoundError:
+            self.close_connection()
+            return None
+        if self.conn is not None and inode == self.db_inode:
+            return self.conn
+        self.close_connection()
+        # Autocommit, so no read transaction stays open between polls and blocks WAL checkpoints
+        self.conn = sqlite3.connect(f'file:{self.db_path}?mode=ro', uri=True, isolation_level=None, check_same_thread=False)
+        self.db_inode = inode
+        max_id = self.conn.execute('SELECT COALESCE(MAX(id), 0) FROM trades').fetchone()[0]
+        if max_id < self.last_id:
+            print(f"Trade Exporter: Trades DB was recreated, resetting cursor from {self.last_id}", flush=True)
+            self.last_id = 0
+            self.save_cursor()
+        return self.conn
+
+    def close_connection(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+            self.db_inode = None
+        if self.order_groups is not None:
+            self.order_groups.close()
+            self.order_groups = None
+
+    def bots_of_orders(self, order_ids: List[str]) -> Dict[str, str]:
+        """Packed bot per order id, for the orders the executor attributed"""
+        if not self.order_groups_path or not os.path.exists(self.order_groups_path):
+            return {}
+        if self.order_groups is None:
+            self.order_groups = sqlite3.connect(
+                f'file:{self.order_groups_path}?mode=ro', uri=True, isolation_level=None, check_same_thread=False,
+            )
+        try:
+            placeholders = ', '.join('?' * len(order_ids))
+            return dict(self.order_groups.execute(
+                f'SELECT order_id, bot_id FROM order_groups WHERE order_id IN ({placeholders})', order_ids,
+            ).fetchall())
+        except sqlite3.OperationalError:
+            # Table not created yet: no order has been attributed
+            return {}
+
+    def trade_uid(self, bot_id: str, trade: dict) -> str:
+        """Stable id per fill, so consumers can drop redeliveries"""
+        return f"{bot_id}:{trade['id']}:{trade['timestamp']}"
+
+    def export(self) -> int:
+        """Publish everything after the cursor; returns the number of trades exported"""
+        conn = self.connect()
+        if conn is None:
+            return 0
+        exported = 0
+        while True:
+            rows = conn.execute(
+                f"SELECT {', '.join(TRADE_COLUMNS)} FROM trades WHERE id > ? ORDER BY id ASC LIMIT ?",
+                (self.last_id, self.batch_size),
+            ).fetchall()
+            if not rows:
+                break
+            trades = [dict(zip(TRADE_COLUMNS, row)) for row in rows]
+            owners = self.bots_of_orders([trade['order_id'] for trade in trades]) if self.order_groups_path else {}
+            by_bot: Dict[str, List[dict]] = {}
+            for trade in trades:
+                bot_id = owners.get(trade['order_id'], self.bot_id)
+                by_bot.setdefault(bot_id, []).append({
+                    'uid': self.trade_uid(bot_id, trade),
+                    'id': trade['id'], 'market': trade['market'], 'symbol': trade['symbol'],
+                    'base': trade['base_asset'], 'quote': trade['quote_asset'], 'order_type': trade['order_type'],
+                    'trade_type': trade['trade_type'], 'price': trade['price'], 'amount': trade['amount'],
+                    'ts': trade['timestamp'],
+                })
+            if not all(self.publish_batch(bot_id, bot_trades) for bot_id, bot_trades in by_bot.items()):
+                # Not acknowledged: keep the cursor and retry the same rows on the next wake-up
+                break
+            self.last_id = trades[-1]['id']
+            self.save_cursor()
+            exported += len(trades)
+        return exported
+
+    def publish_batch(self, bot_id: str, trades: List[dict]) -> bool:
+        """Publish one bot's trades and wait for the broker's acknowledgement"""
+        batch = {
+            'batch_id': f"{bot_id}:{trades[0]['id']}-{trades[-1]['id']}",
+            'bot_id': bot_id,
+            'count': len(trades),
+            'trades': trades,
+        }
+        info = self.client.publish(*encode(f'hbot/{bot_id}/trades', batch, self.encoding), qos=1)
+        try:
+            info.wait_for_publish(timeout=10)
+        except (RuntimeError, ValueError):
+            # Raised while disconnected; paho still delivers the queued message after reconnecting
+            pass
+        if not info.is_published():
+            print(f"Trade Exporter: Batch {batch['batch_id']} not acknowledged, will retry", flush=True)
+            return False
+        return True
+
+    def run(self):
+        while True:
+            try:
+                self.export()
+            except sqlite3.Error as e:
+                # Typically a DB that is still being created; start over with a fresh connection
+                print(f"Trade Exporter: Error reading trades: {e}", flush=True)
+                self.close_connection()
+            # One last export after stop() so fills from the final seconds are not left behind
+            if self.stopping.is_set():
+                break
+            self.watcher.wait(self.wait_interval)
+        self.close_connection()
+        self.watcher.close()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 15):
+        """Export whatever is left, then stop watching"""
+        self.stopping.set()
+        if self.thread:
+            self.thread.join(timeout)
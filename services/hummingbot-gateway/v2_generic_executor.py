@@ -1,31 +1,121 @@
+import json
 import os
+import queue
+import socket
+import sqlite3
+import threading
+import time
 import yaml
 from hummingbot.strategy.script_strategy_base import ScriptStrategyBase
 from hummingbot.smart_components.v2_with_controllers import V2WithControllers
 from hummingbot.smart_components.models.executor_actions import ExecutorAction
 from hummingbot.client.hummingbot_application import HummingbotApplication
 
+
+class PendingUpdate:
+    """A config push waiting for the strategy tick; it is either applied or, once its requester gave up, skipped"""
+
+    def __init__(self, request: dict):
+        self.request = request
+        self.reply = queue.Queue(maxsize=1)
+        self.lock = threading.Lock()
+        self.state = "pending"
+
+    def take(self) -> bool:
+        """Claim the update for applying, unless its requester already gave up on it"""
+        with self.lock:
+            if self.state == "stale":
+                return False
+            self.state = "applying"
+            return True
+
+    def abandon(self) -> bool:
+        """Mark the update stale, unless the strategy is already applying it"""
+        with self.lock:
+            if self.state == "applying":
+                return False
+            self.state = "stale"
+            return True
+
+
+class GroupStrategy:
+    """The strategy as one packed bot's controllers see it; orders they place are attributed to that bot"""
+
+    def __init__(self, strategy, group: str):
+        self.strategy = strategy
+        self.group = group
+
+    def __getattr__(self, name):
+        return getattr(self.strategy, name)
+
+    def buy(self, *args, **kwargs):
+        order_id = self.strategy.buy(*args, **kwargs)
+        self.strategy.record_order_group(order_id, self.group)
+        return order_id
+
+    def sell(self, *args, **kwargs):
+        order_id = self.strategy.sell(*args, **kwargs)
+        self.strategy.record_order_group(order_id, self.group)
+        return order_id
+
+
+def controller_key(controller: dict, index: int) -> str:
+    """Identity of a controller config across updates"""
+    return str(controller.get("id") or controller.get("controller_id") or f"controller_{index}")
+
+
+def scoped_key(group, key: str) -> str:
+    """Controllers of packed bots are namespaced by their bot's group"""
+    return f"{group}/{key}" if group else key
+
+
+def canonical(controller: dict) -> str:
+    return json.dumps(controller, sort_keys=True, default=str)
+
+
+def diff_controllers(old: dict, new: dict) -> dict:
+    """Controller ids added, removed, updated and unchanged between two {id: config} maps"""
+    return {
+        "added": sorted(key for key in new if key not in old),
+        "removed": sorted(key for key in old if key not in new),
+        "updated": sorted(key for key in new if key in old and canonical(new[key]) != canonical(old[key])),
+        "unchanged": sorted(key for key in new if key in old and canonical(new[key]) == canonical(old[key])),
+    }
+
+
 class V2GenericExecutor(ScriptStrategyBase):
     """
     A generic V2 strategy executor that loads controller configurations from a YAML file.
-    The YAML file path is expected at /hummingbot/conf/controllers_config.yml.
+    The YAML file path is expected at /hummingbot/conf/controllers_config.yml (or CONTROLLERS_CONFIG_PATH).
+    Updates are pushed by the in-container bridge over a Unix socket (EXECUTOR_CONTROL_SOCKET) and applied
+    per controller: only added, removed or changed controllers are touched.
+    In a pack container the config holds one controller group per hosted bot ({"groups": {bot_id: {...}}});
+    updates then carry a "group" and only ever touch that bot's controllers.
     """
-    
-    config_path = "/hummingbot/conf/controllers_config.yml"
+
+    config_path = os.getenv("CONTROLLERS_CONFIG_PATH", "/hummingbot/conf/controllers_config.yml")
     remote_config_path = "/hummingbot/conf/remote_config.yml"
-    
+    control_socket_path = os.getenv("EXECUTOR_CONTROL_SOCKET", "/tmp/v2_generic_executor.sock")
+    # Order id -> packed bot, read by the bridge's trade exporter to publish each fill under its bot
+    order_groups_path = os.getenv("ORDER_GROUPS_DB", "/home/hummingbot/data/pack_order_groups.sqlite")
+
     def __init__(self, connectors):
         super().__init__(connectors)
-        self.v2_with_controllers = None
-        self.last_config_check = 0
-        self.last_config_mtime = 0
+        # One V2WithControllers per controller id, so a change to one controller leaves the others running
+        self.controllers = {}
+        self.controller_configs = {}
+        # Scoped key -> (group, controller id within the group)
+        self.controller_scopes = {}
+        # PendingUpdates handed over from the socket thread, applied on the strategy's tick
+        self.pending_updates = queue.Queue()
+        self.order_groups = None
         self.initialize_v2()
+        self.start_control_server()
 
     def initialize_v2(self):
         config_to_load = self.config_path
         if os.path.exists(self.remote_config_path):
             config_to_load = self.remote_config_path
-            self.last_config_mtime = os.path.getmtime(self.remote_config_path)
 
         if not os.path.exists(config_to_load):
             self.logger().error(f"Config file not found at {config_to_load}")
@@ -34,61 +124,151 @@ class V2GenericExecutor(ScriptStrategyBase):
         try:
             with open(config_to_load, "r") as f:
                 config = yaml.safe_load(f)
-            
-            self.v2_with_controllers = V2WithControllers(
-                strategy=self,
-                connectors=self.connectors,
-                controller_configs=config.get("controllers", [])
-            )
-            self.logger().info(f"V2 Strategy initialized with {len(config.get('controllers', []))} controllers from {config_to_load}.")
+            if "groups" in config:
+                for group, group_config in config["groups"].items():
+                    self.apply_controllers(group_config.get("controllers", []), group)
+            else:
+                self.apply_controllers(config.get("controllers", []))
+            self.logger().info(f"V2 Strategy initialized with {len(self.controllers)} controllers from {config_to_load}.")
         except Exception as e:
             self.logger().error(f"Error initializing V2 strategy: {e}")
 
-    def on_tick(self):
-        # 1. Check for remote config updates every 10 seconds
-        current_time = self.current_timestamp
-        if current_time - self.last_config_check > 10:
-            self.last_config_check = current_time
-            self.check_for_config_updates()
-
-        # 2. Update controllers
-        if self.v2_with_controllers:
-            self.v2_with_controllers.update_tick()
+    def start_controller(self, key: str, controller: dict, group=None, controller_id=None):
+        self.controllers[key] = V2WithControllers(
+            strategy=GroupStrategy(self, group) if group else self,
+            connectors=self.connectors,
+            controller_configs=[controller]
+        )
+        self.controller_configs[key] = controller
+        self.controller_scopes[key] = (group, controller_id or key)
 
-    def check_for_config_updates(self):
-        if not os.path.exists(self.remote_config_path):
+    def record_order_group(self, order_id, group: str):
+        if not order_id:
             return
+        try:
+            if self.order_groups is None:
+                self.order_groups = sqlite3.connect(self.order_groups_path, isolation_level=None, check_same_thread=False)
+                self.order_groups.execute("PRAGMA journal_mode=WAL")
+                self.order_groups.execute("CREATE TABLE IF NOT EXISTS order_groups (order_id TEXT PRIMARY KEY, bot_id TEXT NOT NULL)")
+            self.order_groups.execute("INSERT OR REPLACE INTO order_groups VALUES (?, ?)", (order_id, group))
+        except sqlite3.Error as e:
+            self.logger().error(f"[{group}] Could not record order {order_id}: {e}")
+
+    def stop_controller(self, key: str):
+        wrapper = self.controllers.pop(key, None)
+        self.controller_configs.pop(key, None)
+        self.controller_scopes.pop(key, None)
+        if wrapper:
+            wrapper.stop()
+
+    def hot_updatable_controller(self, key: str):
+        """The running controller behind a wrapper, if its Hummingbot version can update its config in place"""
+        controllers = getattr(self.controllers[key], "controllers", None)
+        controller = controllers.get(self.controller_scopes[key][1]) if isinstance(controllers, dict) else None
+        return controller if hasattr(controller, "update_config") else None
 
+    def apply_controllers(self, controllers: list, group=None) -> dict:
+        """Bring the running controllers of a group in line with the given configs, touching only what changed"""
+        new = {controller_key(controller, index): controller for index, controller in enumerate(controllers)}
+        current = {
+            self.controller_scopes[key][1]: config
+            for key, config in self.controller_configs.items()
+            if self.controller_scopes[key][0] == group
+        }
+        diff = diff_controllers(current, new)
+        for controller_id in diff["removed"]:
+            self.stop_controller(scoped_key(group, controller_id))
+        for controller_id in diff["updated"]:
+            key = scoped_key(group, controller_id)
+            # Hot-update controllers that support it; otherwise restart just this one
+            controller = self.hot_updatable_controller(key)
+            if controller is not None:
+                controller.update_config(new[controller_id])
+                self.controller_configs[key] = new[controller_id]
+            else:
+                self.stop_controller(key)
+                self.start_controller(key, new[controller_id], group, controller_id)
+        for controller_id in diff["added"]:
+            self.start_controller(scoped_key(group, controller_id), new[controller_id], group, controller_id)
+        return diff
+
+    def start_control_server(self):
+        """Accept config pushes from the bridge; each connection sends one JSON line and gets one back"""
+        if not self.control_socket_path:
+            return
         try:
-            mtime = os.path.getmtime(self.remote_config_path)
-            if mtime > self.last_config_mtime:
-                self.last_config_mtime = mtime
-                self.logger().info("New remote configuration detected! Reloading controllers...")
-                
-                with open(self.remote_config_path, "r") as f:
-                    config = yaml.safe_load(f)
-                
-                # Update existing V2WithControllers if it exists
-                if self.v2_with_controllers:
-                    # Depending on HB version, we might need to recreate or update
-                    # Recreating is safer for complete config changes
-                    self.v2_with_controllers.stop()
-                    self.v2_with_controllers = V2WithControllers(
-                        strategy=self,
-                        connectors=self.connectors,
-                        controller_configs=config.get("controllers", [])
-                    )
-                    self.logger().info(f"Controllers re-initialized with {len(config.get('controllers', []))} controllers.")
-                else:
-                    self.initialize_v2()
-        except Exception as e:
-            self.logger().error(f"Error reloading remote config: {e}")
+            if os.path.exists(self.control_socket_path):
+                os.remove(self.control_socket_path)
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            server.bind(self.control_socket_path)
+            server.listen(4)
+        except OSError as e:
+            self.logger().error(f"Could not open control socket {self.control_socket_path}: {e}")
+            return
+
+        def serve():
+            while True:
+                connection, _ = server.accept()
+                with connection:
+                    try:
+                        update = PendingUpdate(json.loads(connection.makefile("r").readline()))
+                        self.pending_updates.put(update)
+                        # Applied by on_tick; a stalled strategy must not hang the bridge forever
+                        try:
+                            response = update.reply.get(timeout=30)
+                        except queue.Empty:
+                            if update.abandon():
+                                # Reported as not applied, so it must never be applied later
+                                response = {"ok": False, "error": "Timed out waiting for the strategy tick"}
+                            else:
+                                response = update.reply.get()
+                    except Exception as e:
+                        response = {"ok": False, "error": str(e)}
+                    connection.sendall((json.dumps(response) + "\n").encode())
+
+        threading.Thread(target=serve, daemon=True).start()
+
+    def apply_pending_updates(self):
+        while True:
+            try:
+                update = self.pending_updates.get_nowait()
+            except queue.Empty:
+                return
+            if not update.take():
+                self.logger().warning("Skipped a config update whose request timed out before this tick")
+                continue
+            request = update.request
+            started = time.perf_counter()
+            group = request.get("group")
+            # The bridge routes log lines tagged with a group to that bot's log topics
+            tag = f"[{group}] " if group else ""
+            try:
+                diff = self.apply_controllers(request.get("config", {}).get("controllers", []), group)
+                self.logger().info(
+                    f"{tag}Applied config update: {len(diff['added'])} added, {len(diff['removed'])} removed, "
+                    f"{len(diff['updated'])} updated, {len(diff['unchanged'])} unchanged."
+                )
+                response = {"ok": True, "diff": diff}
+            except Exception as e:
+                self.logger().error(f"{tag}Error applying config update: {e}")
+                response = {"ok": False, "error": str(e)}
+            response["apply_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            update.reply.put(response)
+
+    def on_tick(self):
+        # 1. Apply config updates pushed by the bridge since the last tick
+        if not self.pending_updates.empty():
+            self.apply_pending_updates()
+
+        # 2. Update controllers
+        for wrapper in self.controllers.values():
+            wrapper.update_tick()
 
     def on_stop(self):
-        if self.v2_with_controllers:
-            self.v2_with_controllers.stop()
+        for wrapper in self.controllers.values():
+            wrapper.stop()
 
     def format_status(self) -> str:
-        if self.v2_with_controllers:
-            return self.v2_with_controllers.to_format_status()
+        if self.controllers:
+            return "\n".join(wrapper.to_format_status() for wrapper in self.controllers.values())
         return "V2 Strategy not initialized."
@@ -0,0 +1,151 @@
+"""
+Warm Pool for Hummingbot Gateway
+Keeps pre-started bot containers waiting for an assignment so bots start without a cold container boot
+"""
+
+import asyncio
+import json
+import os
+import uuid
+from typing import TYPE_CHECKING, Optional
+
+from container_index import BOT_IMAGE, BOT_PREFIX, MEMORY_LABEL, POOL_PREFIX
+from payload_codec import PAYLOAD_ENCODING
+
+if TYPE_CHECKING:
+    from docker_manager import DockerManager
+
+# Path inside the container where the in-container bridge waits for its bot assignment
+ASSIGNMENT_PATH = '/hummingbot/conf/assignment.json'
+
+MEMORY_UNITS = {'b': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3}
+
+
+def parse_memory(value: str) -> int:
+    """Convert a Docker memory string such as '2g' or '512m' into bytes"""
+    value = value.strip().lower()
+    if value and value[-1] in MEMORY_UNITS:
+        return int(float(value[:-1]) * MEMORY_UNITS[value[-1]])
+    return int(value)
+
+
+class WarmPool:
+    """
+    Warm containers have booted and connected their bridge, which saves the container start on a claim. Hummingbot
+    itself cannot boot before the claim because its command line needs the bot's strategy and config, so a claimed
+    bot still pays Hummingbot's startup, with the welcome screens skipped as soon as they are drawn.
+    """
+
+    def __init__(self, docker_manager: 'DockerManager'):
+        self.docker_manager = docker_manager
+        self.size = int(os.getenv('WARM_POOL_SIZE', '0'))
+        self.mem_limit = os.getenv('WARM_POOL_MEM_LIMIT', '2g')
+        self.memory_budget = parse_memory(os.getenv('WARM_POOL_MEMORY_BUDGET', '8g'))
+        self.refill_interval = float(os.getenv('WARM_POOL_REFILL_INTERVAL', '30'))
+        self.refill_event = asyncio.Event()
+        self.refill_task: Optional[asyncio.Task] = None
+        self.claimed: set = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    @property
+    def target_size(self) -> int:
+        """Pool size, capped so the idle containers stay within the memory budget"""
+        return min(self.size, self.memory_budget // parse_memory(self.mem_limit))
+
+    def idle_containers(self) -> list:
+        pool = self.docker_manager.index.find('pool')
+        # Claims stay reserved until the rename event moves the container out of the pool
+        self.claimed &= {state.id for state in pool}
+        return [state for state in pool if state.status == 'running' and state.id not in self.claimed]
+
+    def start(self):
+        if not self.enabled:
+            return
+        print(f'Warm Pool: Keeping {self.target_size} warm container(s) (requested {self.size})', flush=True)
+        self.refill_task = asyncio.get_running_loop().create_task(self.refill_loop())
+
+    async def stop(self):
+        if self.refill_task:
+            self.refill_task.cancel()
+
+    async def refill_loop(self):
+        """Top the pool up after every claim and periodically, one container at a time"""
+        while True:
+            try:
+                if self.docker_manager.index.is_live and self.docker_manager.image_ready.is_set():
+                    await self.refill()
+            except Exception as e:
+                print(f'Warm Pool: Refill failed: {e}', flush=True)
+            try:
+                await asyncio.wait_for(self.refill_event.wait(), self.refill_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.refill_event.clear()
+
+    async def refill(self):
+        # Warm containers that died while idle are replaced rather than repaired
+        for state in self.docker_manager.index.find('pool', status='exited'):
+            await self.docker_manager._call('remove', self.docker_manager.client.api.remove_container, state.id, force=True)
+
+        # Containers still booting count towards the pool so we never overshoot the budget
+        pool = [
+            state for state in self.docker_manager.index.find('pool')
+            if state.status in ('created', 'running') and state.id not in self.claimed
+        ]
+        missing = self.target_size - len(pool)
+        memory = parse_memory(self.mem_limit)
+        for _ in range(missing):
+            # Idle warm containers must not take host memory that bot starts are waiting for
+            available = self.docker_manager.admission.available()
+            if self.docker_manager.admission.waiters or (available is not None and available < memory):
+                break
+            name = f'{POOL_PREFIX}{uuid.uuid4().hex[:12]}'
+            await self.docker_manager._call(
+                'run',
+                self.docker_manager.client.containers.run,
+                BOT_IMAGE,
+                name=name,
+                detach=True,
+                environment={
+                    'WARM_POOL': 'true',
+                    'MQTT_BROKER': os.getenv('MQTT_BROKER_URL', 'emqx'),
+                    'MQTT_PORT': os.getenv('MQTT_PORT', '1883'),
+                    'MQTT_PAYLOAD_ENCODING': PAYLOAD_ENCODING,
+                },
+                network_mode='janym-network',
+                restart_policy={'Name': 'unless-stopped'},
+                mem_limit=self.mem_limit,
+                labels={MEMORY_LABEL: str(memory)},
+            )
+            print(f'Warm Pool: Started warm container {name}', flush=True)
+
+    async def claim(self, bot_id: str, document: dict) -> Optional[str]:
+        """Hand a warm container to a bot, returning its id, or None when the pool is empty"""
+        if not self.enabled or not self.docker_manager.index.is_live:
+            return None
+        idle = self.idle_containers()
+        if not idle:
+            print(f'Warm Pool: No warm container available for bot {bot_id}', flush=True)
+            return None
+
+        state = idle[0]
+        self.claimed.add(state.id)
+        try:
+            # Rename first so the bot is addressable by its usual name, then deliver the assignment
+            await self.docker_manager._call('rename', self.docker_manager.client.api.rename, state.id, f'{BOT_PREFIX}{bot_id}')
+            assignment = {'bot_id': bot_id, 'document': document}
+            await self.docker_manager.put_file(state.id, ASSIGNMENT_PATH, json.dumps(assignment).encode())
+            print(f'Warm Pool: Assigned warm container {state.name} to bot {bot_id}', flush=True)
+            return state.id
+        except Exception as e:
+            print(f'Warm Pool: Failed to claim {state.name} for bot {bot_id}, discarding it: {e}', flush=True)
+            try:
+                await self.docker_manager._call('remove', self.docker_manager.client.api.remove_container, state.id, force=True)
+            except Exception:
+                pass
+            return None
+        finally:
+            self.refill_event.set()
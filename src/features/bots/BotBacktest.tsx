@@ -198,7 +198,7 @@ export const BotBacktest = ({ bot }: BotBacktestProps) => {
           {result && (
             <div className={`rounded-lg p-4 text-sm ${result.success ? 'bg-green-50 text-green-700' : 'bg-red-50 text-red-700'}`}>
               {result.success
-                ? `Backtest started! Container ID: ${result.container_id?.slice(0, 12)}`
+                ? `Backtest ${result.status ?? 'queued'}! Job ID: ${result.job_id?.slice(0, 12)}`
                 : `Error: ${result.error}`}
             </div>
           )}
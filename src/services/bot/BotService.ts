@@ -194,7 +194,7 @@ export class BotService {
     startDate: string,
     endDate: string,
     configOverride?: Record<string, unknown>,
-  ): Promise<{ success: boolean; containerId?: string; error?: string }> {
+  ): Promise<{ success: boolean; job_id?: string; status?: string; error?: string }> {
     const bot = await this.getBot(botId, organizationId);
     if (!bot) {
       throw new Error('Bot not found or access denied');
@@ -213,6 +213,7 @@ export class BotService {
           config,
           start_date: startDate,
           end_date: endDate,
+          owner_id: organizationId,
         }),
       });
 
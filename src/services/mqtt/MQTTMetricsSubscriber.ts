@@ -1,7 +1,10 @@
 import { metricsService } from '../metrics/MetricsService';
 import { mqttService } from './MQTTService';
+import { decodePayload } from './PayloadCodec';
 
 type MetricsPayload = {
+  // 'resources' payloads carry container/process usage from the bot's cgroup, not trading metrics
+  kind?: 'resources';
   timestamp?: string;
   balance?: {
     total?: number;
@@ -40,26 +43,36 @@ type LogPayload = {
   metadata?: Record<string, unknown>;
 };
 
+type LogBatchPayload = {
+  v: number;
+  epoch: number;
+  seq: number;
+  count: number;
+  lines: LogPayload[];
+};
+
 class MQTTMetricsSubscriber {
   private isSubscribed = false;
+  // Last batch sequence seen per bot, used to detect dropped log batches
+  private logBatchSeq = new Map<string, { epoch: number; seq: number }>();
 
   async start() {
     if (this.isSubscribed) {
       return;
     }
 
-    // Subscribe to metrics
-    await mqttService.subscribe('hbot/+/metrics', (topic, message) => {
+    // Subscribe to metrics; the trailing '#' also matches the MessagePack topics (see PayloadCodec)
+    await mqttService.subscribe('hbot/+/metrics/#', (topic, message) => {
       this.handleMetrics(topic, message);
     });
 
     // Subscribe to orders
-    await mqttService.subscribe('hbot/+/orders/+', (topic, message) => {
+    await mqttService.subscribe('hbot/+/orders/#', (topic, message) => {
       this.handleOrder(topic, message);
     });
 
     // Subscribe to logs
-    await mqttService.subscribe('hbot/+/logs/+', (topic, message) => {
+    await mqttService.subscribe('hbot/+/logs/#', (topic, message) => {
       this.handleLog(topic, message);
     });
 
@@ -71,7 +84,10 @@ class MQTTMetricsSubscriber {
   private async handleMetrics(topic: string, message: Buffer) {
     try {
       const botId = topic.split('/')[1];
-      const payload: MetricsPayload = JSON.parse(message.toString());
+      const payload: MetricsPayload = decodePayload(topic, message).payload;
+      if (payload.kind === 'resources') {
+        return;
+      }
 
       await metricsService.collectMetrics(botId, {
         timestamp: payload.timestamp ? new Date(payload.timestamp) : new Date(),
@@ -90,7 +106,7 @@ class MQTTMetricsSubscriber {
   private async handleOrder(topic: string, message: Buffer) {
     try {
       const botId = topic.split('/')[1];
-      const payload: OrderPayload = JSON.parse(message.toString());
+      const payload: OrderPayload = decodePayload(topic, message).payload;
 
       await metricsService.saveOrder({
         botId,
@@ -113,8 +129,13 @@ class MQTTMetricsSubscriber {
 
   private async handleLog(topic: string, message: Buffer) {
     try {
-      const botId = topic.split('/')[1];
-      const payload: LogPayload = JSON.parse(message.toString());
+      const decoded = decodePayload(topic, message);
+      const [, botId, , level] = decoded.topic.split('/');
+      if (level === 'batch' || level === 'batchz') {
+        await this.handleLogBatch(botId, decoded.payload);
+        return;
+      }
+      const payload: LogPayload = decoded.payload;
 
       await metricsService.saveLog({
         botId,
@@ -127,6 +148,25 @@ class MQTTMetricsSubscriber {
     }
   }
 
+  private async handleLogBatch(botId: string, batch: LogBatchPayload) {
+    const previous = this.logBatchSeq.get(botId);
+    if (previous && previous.epoch === batch.epoch && batch.seq > previous.seq + 1) {
+      console.warn(
+        `MQTT Metrics Subscriber: Missed ${batch.seq - previous.seq - 1} log batch(es) from bot ${botId}`,
+      );
+    }
+    this.logBatchSeq.set(botId, { epoch: batch.epoch, seq: batch.seq });
+
+    for (const line of batch.lines) {
+      await metricsService.saveLog({
+        botId,
+        level: line.level,
+        message: line.message,
+        metadata: line.metadata,
+      });
+    }
+  }
+
   async stop() {
     // Unsubscribe is handled by MQTTService
     this.isSubscribed = false;
@@ -159,6 +159,11 @@ class MQTTService {
       topicIndex += 1;
     }
 
+    if (patternParts[patternIndex] === '#' && patternIndex === patternParts.length - 1) {
+      // A trailing # also matches its parent level: hbot/+/metrics/# matches hbot/bot1/metrics
+      return topicIndex === topicParts.length;
+    }
+
     return patternIndex === patternParts.length && topicIndex === topicParts.length;
   }
 
@@ -0,0 +1,44 @@
+import { decodePayload } from './PayloadCodec';
+
+// Fixtures encoded by services/hummingbot-gateway/payload_codec.py
+const METRICS = '82a3706e6c81a5746f74616ccb4029000000000000ac74696d657374616d705f6d73cf000001a14dcf69e3';
+const LOG_BATCH = '85a17601a565706f636807a373657103a5636f756e7402a4726f77739294a4696e666fa568656c6c6fcf000001a14dcf69e3c095a56572726f72c0cf000001a14dcf69e481a16e0181a4636f64652a';
+const TRADES = '85a862617463685f6964a8626f74313a312d31a6626f745f6964a4626f7431a5636f756e7401a7636f6c756d6e739ba3756964a26964a66d61726b6574a673796d626f6ca462617365a571756f7465aa6f726465725f74797065aa74726164655f74797065a57072696365a6616d6f756e74a27473a4726f7773919bb4626f74313a313a3137363037373038303131323301a762696e616e6365a84254432d55534454a3425443a455534454a54c494d4954a3425559cb40f05b8800000000cb3f847ae147ae147bcf00000199f61e3de3';
+
+describe('PayloadCodec', () => {
+  describe('decodePayload function', () => {
+    it('should parse JSON payloads on plain topics', () => {
+      const decoded = decodePayload('hbot/bot1/metrics', Buffer.from('{"pnl":{"total":1}}'));
+
+      expect(decoded).toEqual({ topic: 'hbot/bot1/metrics', payload: { pnl: { total: 1 } } });
+    });
+
+    it('should decode MessagePack metrics and strip the encoding suffix', () => {
+      const decoded = decodePayload('hbot/bot1/metrics/mp1', Buffer.from(METRICS, 'hex'));
+
+      expect(decoded.topic).toBe('hbot/bot1/metrics');
+      expect(decoded.payload).toEqual({ pnl: { total: 12.5 }, timestamp: '2026-10-18T07:00:01.123Z' });
+    });
+
+    it('should expand log batch rows into lines', () => {
+      const { payload } = decodePayload('hbot/bot1/logs/batch/mp1', Buffer.from(LOG_BATCH, 'hex'));
+
+      expect(payload.seq).toBe(3);
+      expect(payload.lines).toEqual([
+        { level: 'info', message: 'hello', timestamp: '2026-10-18T07:00:01.123Z' },
+        { level: 'error', message: '{"code":42}', metadata: { n: 1 }, timestamp: '2026-10-18T07:00:01.124Z' },
+      ]);
+    });
+
+    it('should expand trade rows into trades', () => {
+      const { payload } = decodePayload('hbot/bot1/trades/mp1', Buffer.from(TRADES, 'hex'));
+
+      expect(payload.trades).toHaveLength(1);
+      expect(payload.trades[0]).toMatchObject({ id: 1, symbol: 'BTC-USDT', price: 67000.5, amount: 0.01 });
+    });
+
+    it('should reject unknown schema versions', () => {
+      expect(() => decodePayload('hbot/bot1/metrics/mp9', Buffer.from(METRICS, 'hex'))).toThrow();
+    });
+  });
+});
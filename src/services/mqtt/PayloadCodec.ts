@@ -0,0 +1,198 @@
+import { inflateSync } from 'node:zlib';
+
+// Decoder side of services/hummingbot-gateway/payload_codec.py. MessagePack payloads arrive on their JSON
+// topic plus an 'mp{version}' level (e.g. hbot/{botId}/metrics/mp1) and decode to the same shape as the JSON ones.
+const SCHEMA_VERSIONS: Record<string, number> = { metrics: 1, orders: 1, logs: 1, trades: 1 };
+const SUFFIX = /^mp(\d+)$/;
+
+// Schema v1 moves these ISO timestamps to integer epoch milliseconds under '{field}_ms'
+const TIMESTAMP_FIELDS: Record<string, string[]> = {
+  metrics: ['timestamp'],
+  orders: ['timestamp', 'exchange_timestamp'],
+  logs: ['timestamp'],
+};
+
+export type DecodedMessage = {
+  // The topic without the encoding suffix
+  topic: string;
+  payload: any;
+};
+
+class MessagePackReader {
+  private offset = 0;
+
+  constructor(private readonly buffer: Buffer) {}
+
+  read(): unknown {
+    const type = this.buffer.readUInt8(this.offset);
+    this.offset += 1;
+    if (type <= 0x7F) {
+      return type;
+    }
+    if (type <= 0x8F) {
+      return this.map(type & 0x0F);
+    }
+    if (type <= 0x9F) {
+      return this.array(type & 0x0F);
+    }
+    if (type <= 0xBF) {
+      return this.string(type & 0x1F);
+    }
+    if (type >= 0xE0) {
+      return type - 0x100;
+    }
+    switch (type) {
+      case 0xC0:
+        return null;
+      case 0xC2:
+        return false;
+      case 0xC3:
+        return true;
+      case 0xC4:
+        return this.bytes(this.uint(1));
+      case 0xC5:
+        return this.bytes(this.uint(2));
+      case 0xC6:
+        return this.bytes(this.uint(4));
+      case 0xCA:
+        return this.number(4, this.buffer.readFloatBE(this.offset));
+      case 0xCB:
+        return this.number(8, this.buffer.readDoubleBE(this.offset));
+      case 0xCC:
+        return this.uint(1);
+      case 0xCD:
+        return this.uint(2);
+      case 0xCE:
+        return this.uint(4);
+      case 0xCF:
+        return this.number(8, Number(this.buffer.readBigUInt64BE(this.offset)));
+      case 0xD0:
+        return this.number(1, this.buffer.readInt8(this.offset));
+      case 0xD1:
+        return this.number(2, this.buffer.readInt16BE(this.offset));
+      case 0xD2:
+        return this.number(4, this.buffer.readInt32BE(this.offset));
+      case 0xD3:
+        return this.number(8, Number(this.buffer.readBigInt64BE(this.offset)));
+      case 0xD9:
+        return this.string(this.uint(1));
+      case 0xDA:
+        return this.string(this.uint(2));
+      case 0xDB:
+        return this.string(this.uint(4));
+      case 0xDC:
+        return this.array(this.uint(2));
+      case 0xDD:
+        return this.array(this.uint(4));
+      case 0xDE:
+        return this.map(this.uint(2));
+      case 0xDF:
+        return this.map(this.uint(4));
+      default:
+        throw new Error(`Unsupported MessagePack type 0x${type.toString(16)}`);
+    }
+  }
+
+  private number(size: number, value: number) {
+    this.offset += size;
+    return value;
+  }
+
+  private uint(size: number) {
+    return this.number(size, this.buffer.readUIntBE(this.offset, size));
+  }
+
+  private bytes(length: number) {
+    const value = this.buffer.subarray(this.offset, this.offset + length);
+    this.offset += length;
+    return value;
+  }
+
+  private string(length: number) {
+    return this.bytes(length).toString('utf8');
+  }
+
+  private array(length: number) {
+    const value: unknown[] = [];
+    for (let index = 0; index < length; index += 1) {
+      value.push(this.read());
+    }
+    return value;
+  }
+
+  private map(length: number) {
+    const value: Record<string, unknown> = {};
+    for (let index = 0; index < length; index += 1) {
+      const key = String(this.read());
+      value[key] = this.read();
+    }
+    return value;
+  }
+}
+
+export function decodeMessagePack(buffer: Buffer): unknown {
+  return new MessagePackReader(buffer).read();
+}
+
+// Unlike the naive ISO strings of the JSON payloads, these carry an explicit UTC offset
+function millisToIso(value: unknown) {
+  return typeof value === 'number' ? new Date(value).toISOString() : value;
+}
+
+function expandLog(line: any) {
+  if ('data' in line && !('message' in line)) {
+    line.message = JSON.stringify(line.data);
+    delete line.data;
+  }
+  return line;
+}
+
+function fromWire(family: string, leaf: string, payload: any) {
+  for (const field of TIMESTAMP_FIELDS[family] ?? []) {
+    if (`${field}_ms` in payload) {
+      payload[field] = millisToIso(payload[`${field}_ms`]);
+      delete payload[`${field}_ms`];
+    }
+  }
+  if (family === 'trades' && Array.isArray(payload.rows)) {
+    const columns: string[] = payload.columns;
+    payload.trades = payload.rows.map((row: unknown[]) =>
+      Object.fromEntries(columns.map((column, index) => [column, row[index]])));
+    delete payload.columns;
+    delete payload.rows;
+  } else if (family === 'logs' && (leaf === 'batch' || leaf === 'batchz')) {
+    // Rows are [level, message, timestamp_ms, metadata] plus the parsed message of JSON lines
+    payload.lines = payload.rows.map((row: any[]) => {
+      const line: any = { level: row[0], timestamp: millisToIso(row[2]) };
+      if (row.length > 4) {
+        line.data = row[4];
+      } else {
+        line.message = row[1];
+      }
+      if (row[3] !== null) {
+        line.metadata = row[3];
+      }
+      return expandLog(line);
+    });
+    delete payload.rows;
+  } else if (family === 'logs') {
+    expandLog(payload);
+  }
+  return payload;
+}
+
+export function decodePayload(topic: string, message: Buffer): DecodedMessage {
+  const levels = topic.split('/');
+  const version = SUFFIX.exec(levels[levels.length - 1] ?? '');
+  const baseLevels = version ? levels.slice(0, -1) : levels;
+  const [, , family = '', leaf = ''] = baseLevels;
+  const data = leaf === 'batchz' ? inflateSync(message) : message;
+
+  if (!version) {
+    return { topic, payload: JSON.parse(data.toString()) };
+  }
+  if (Number(version[1]) !== SCHEMA_VERSIONS[family]) {
+    throw new Error(`Unsupported ${family} schema version ${version[1]}`);
+  }
+  return { topic: baseLevels.join('/'), payload: fromWire(family, leaf, decodeMessagePack(data)) };
+}